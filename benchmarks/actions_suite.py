@@ -0,0 +1,458 @@
+"""
+Замеры всех публичных действий src.service.database.actions на синтетической базе: p50/p95 по каждому.
+Результат сохраняется в JSON, с --compare выводится разница с прошлым прогоном.
+
+    python -m benchmarks.dataset --output media/bench.sqlite3
+    python -m benchmarks.actions_suite --db media/bench.sqlite3 --compare benchmarks/results/actions_20250101_120000.json
+
+Без --db база на 200 врачей и 100k приёмов создаётся во временной папке.
+Изменяющие действия выполняются на копии базы, если не указан --in-place.
+"""
+import argparse
+import asyncio
+import csv
+import inspect
+import json
+import platform
+import random
+import shutil
+import tempfile
+import time as timer
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from sqlalchemy import func, select
+
+from benchmarks.common import BENCH_PASSWORD, make_config, percentile
+from benchmarks.dataset import generate_dataset
+from src.service.database import actions
+from src.service.database.actions import IMPORT_COLUMNS, ScheduleView, SessionContext
+from src.service.database.core.database import dispose_engines, get_read_db
+from src.service.database.core.filling import filling_db
+from src.service.database.models import Appointment, AppointmentStatus, Doctor, Patient, StorageStatus, User
+from src.service.exeptions import ServiceError
+
+_RESULTS_DIR = Path(__file__).parent / "results"
+
+Call = Callable[[], Awaitable]
+
+
+@dataclass
+class _Context:
+    rnd: random.Random
+    tmp: Path
+    doctors: list[tuple[int, str]]  # id и логин
+    patient_logins: list[str]
+    counter: int = 0
+    materialized_weeks: int = 0
+    sessions: dict[str, SessionContext] = field(default_factory=dict)
+
+    def unique(self, prefix: str) -> str:
+        self.counter += 1
+        return f"suite_{prefix}_{int(timer.time())}_{self.counter}"
+
+    def doctor(self) -> tuple[int, str]:
+        return self.rnd.choice(self.doctors)
+
+    async def session(self, login: str) -> SessionContext:
+        if login not in self.sessions:
+            self.sessions[login] = await actions.login_user(login, BENCH_PASSWORD)
+        return self.sessions[login]
+
+
+async def _appointment_ids(doctor_id: int, limit: int) -> list[int]:
+    async with get_read_db() as db:
+        result = await db.execute(
+            select(Appointment.id).where(Appointment.doctor_id == doctor_id).order_by(Appointment.start_ts.desc()).limit(limit)
+        )
+        return list(result.scalars())
+
+
+async def _doctor_with_appointments(ctx: _Context, limit: int = 1) -> tuple[SessionContext, list[int]]:
+    while True:
+        doctor_id, login = ctx.doctor()
+        ids = await _appointment_ids(doctor_id, limit)
+        if ids:
+            return await ctx.session(login), ids
+
+
+async def _consume(iterator) -> int:
+    rows = 0
+    async for chunk in iterator:
+        rows += len(chunk)
+    return rows
+
+
+# подготовка выполняется вне замера и возвращает сам замеряемый вызов
+
+
+async def _login_user(ctx: _Context) -> Call:
+    login = ctx.rnd.choice(ctx.patient_logins)
+    return lambda: actions.login_user(login, BENCH_PASSWORD)
+
+
+async def _register_patient(ctx: _Context) -> Call:
+    login = ctx.unique("patient")
+    return lambda: actions.register_patient(login, BENCH_PASSWORD, "Новый пациент", "+79000000000")
+
+
+async def _get_doctors(ctx: _Context) -> Call:
+    return actions.get_doctors
+
+
+async def _create_doctor(ctx: _Context) -> Call:
+    login = ctx.unique("doctor")
+    return lambda: actions.create_doctor(login, BENCH_PASSWORD, "Новый врач", "Терапевт")
+
+
+async def _update_doctor(ctx: _Context) -> Call:
+    doctor_id, _ = ctx.doctor()
+    return lambda: actions.update_doctor(doctor_id, f"Врач {doctor_id}", "Терапевт")
+
+
+async def _delete_doctor(ctx: _Context) -> Call:
+    login = ctx.unique("doctor")
+    await actions.create_doctor(login, BENCH_PASSWORD, "Удаляемый врач", "Терапевт")
+    async with get_read_db() as db:
+        doctor_id = (
+            await db.execute(select(Doctor.id).join(User, User.id == Doctor.user_id).where(User.login == login))
+        ).scalar_one()
+    return lambda: actions.delete_doctor(doctor_id)
+
+
+async def _create_appointment(ctx: _Context) -> Call:
+    patient = await ctx.session(ctx.rnd.choice(ctx.patient_logins))
+    tomorrow = date.today() + timedelta(days=1)
+    while True:
+        doctor_id, _ = ctx.doctor()
+        slots = await actions.get_free_slots(doctor_id, tomorrow, tomorrow + timedelta(days=13))
+        if slots:
+            start = ctx.rnd.choice(slots)
+            return lambda: actions.create_appointment(patient, doctor_id, start)
+
+
+async def _get_patient_appointments(ctx: _Context) -> Call:
+    patient = await ctx.session(ctx.rnd.choice(ctx.patient_logins))
+    return lambda: actions.get_patient_appointments(patient)
+
+
+async def _get_doctor_appointments(ctx: _Context) -> Call:
+    doctor = await ctx.session(ctx.doctor()[1])
+    return lambda: actions.get_doctor_appointments(doctor)
+
+
+async def _get_appointments_by_doctor_id(ctx: _Context) -> Call:
+    doctor_id, _ = ctx.doctor()
+    return lambda: actions.get_appointments_by_doctor_id(doctor_id)
+
+
+async def _get_appointment_details(ctx: _Context) -> Call:
+    doctor, ids = await _doctor_with_appointments(ctx)
+    return lambda: actions.get_appointment_details(doctor, ids[0])
+
+
+async def _update_appointment_by_doctor(ctx: _Context) -> Call:
+    doctor, ids = await _doctor_with_appointments(ctx)
+    return lambda: actions.update_appointment_by_doctor(
+        doctor, ids[0], "Жалобы", "Состояние", "Заключение", AppointmentStatus.COMPLETED
+    )
+
+
+async def _update_appointments_status(ctx: _Context) -> Call:
+    doctor, ids = await _doctor_with_appointments(ctx, limit=20)
+    return lambda: actions.update_appointments_status(doctor, ids, AppointmentStatus.COMPLETED)
+
+
+async def _get_free_slots(ctx: _Context) -> Call:
+    doctor_id, _ = ctx.doctor()
+    today = date.today()
+    return lambda: actions.get_free_slots(doctor_id, today, today + timedelta(days=13))
+
+
+async def _get_doctor_schedule(ctx: _Context) -> Call:
+    doctor_id, _ = ctx.doctor()
+    return lambda: actions.get_doctor_schedule(doctor_id)
+
+
+async def _set_weekly_schedule(ctx: _Context) -> Call:
+    doctor_id, _ = ctx.doctor()
+    entries = [ScheduleView(weekday, time(9, 0), time(18, 0), 30) for weekday in range(5)]
+    return lambda: actions.set_weekly_schedule(doctor_id, entries)
+
+
+async def _add_schedule_exception(ctx: _Context) -> Call:
+    doctor_id, _ = ctx.doctor()
+    day = date.today() + timedelta(days=ctx.rnd.randrange(1, 60))
+    return lambda: actions.add_schedule_exception(doctor_id, day)
+
+
+async def _materialize_slots(ctx: _Context) -> Call:
+    # каждый повтор нарезает новую неделю, иначе замерялся бы пустой повторный проход
+    ctx.materialized_weeks += 1
+    start = date.today() + timedelta(weeks=ctx.materialized_weeks)
+    return lambda: actions.materialize_slots(1, date_from=start)
+
+
+async def _fetch_appointment_columns(ctx: _Context) -> Call:
+    doctor_id, _ = ctx.doctor()
+    return lambda: actions.fetch_appointment_columns(doctor_id)
+
+
+async def _iter_appointment_columns(ctx: _Context) -> Call:
+    week_start = datetime.combine(date.today() - timedelta(days=ctx.rnd.randrange(7, 365)), time.min)
+    return lambda: _consume(actions.iter_appointment_columns(date_from=week_start, date_to=week_start + timedelta(days=7)))
+
+
+async def _export_appointments(ctx: _Context) -> Call:
+    doctor_id, _ = ctx.doctor()
+    return lambda: actions.export_appointments(ctx.tmp / "export.csv", doctor_id=doctor_id)
+
+
+async def _import_people_csv(ctx: _Context) -> Call:
+    source = ctx.tmp / "import.csv"
+    with source.open("w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(IMPORT_COLUMNS)
+        for _ in range(10):
+            writer.writerow(("patient", ctx.unique("import"), BENCH_PASSWORD, "Пациент", "", "+79000000000"))
+    return lambda: actions.import_people_csv(source)
+
+
+async def _get_calendar_month(ctx: _Context) -> Call:
+    doctor = await ctx.session(ctx.doctor()[1])
+    day = date.today() - timedelta(days=ctx.rnd.randrange(0, 365))
+    return lambda: actions.get_calendar_month(doctor, day.year, day.month)
+
+
+async def _get_calendar_day(ctx: _Context) -> Call:
+    doctor = await ctx.session(ctx.doctor()[1])
+    day = date.today() - timedelta(days=ctx.rnd.randrange(0, 365))
+    return lambda: actions.get_calendar_day(doctor, day)
+
+
+async def _get_doctor_stats_totals(ctx: _Context) -> Call:
+    date_to = date.today() - timedelta(days=ctx.rnd.randrange(0, 365))
+    return lambda: actions.get_doctor_stats_totals(date_to - timedelta(days=30), date_to)
+
+
+async def _get_doctor_daily_stats(ctx: _Context) -> Call:
+    doctor_id, _ = ctx.doctor()
+    today = date.today()
+    return lambda: actions.get_doctor_daily_stats(doctor_id, today - timedelta(days=365), today)
+
+
+async def _rebuild_doctor_stats(ctx: _Context) -> Call:
+    return actions.rebuild_doctor_stats
+
+
+async def _archive_appointments(ctx: _Context) -> Call:
+    # первый повтор переносит приёмы старше archive_after_days, следующие находят пустую выборку
+    return actions.archive_appointments
+
+
+async def _close_past_due_appointments(ctx: _Context) -> Call:
+    return actions.close_past_due_appointments
+
+
+
+async def _fan_out(ctx: _Context) -> Call:
+    return lambda: actions.fan_out(actions.get_doctors)
+
+
+async def _get_doctors_all_branches(ctx: _Context) -> Call:
+    return actions.get_doctors_all_branches
+
+
+async def _get_appointments_all_branches(ctx: _Context) -> Call:
+    day = datetime.combine(date.today() - timedelta(days=ctx.rnd.randrange(0, 365)), time.min)
+    return lambda: actions.get_appointments_all_branches(day, day + timedelta(days=1))
+
+
+async def _get_change_seq(ctx: _Context) -> Call:
+    return actions.get_change_seq
+
+
+async def _get_appointment_changes(ctx: _Context) -> Call:
+    doctor = await ctx.session(ctx.doctor()[1])
+    since = max(await actions.get_change_seq() - 1_000, 0)
+    return lambda: actions.get_appointment_changes(doctor, since)
+
+
+async def _prune_appointment_changes(ctx: _Context) -> Call:
+    # как и с архивом, чистит только первый повтор
+    return lambda: actions.prune_appointment_changes(datetime.now() - timedelta(days=1))
+
+# сценарий и ограничение числа повторов для тяжёлых действий
+CASES: dict[str, tuple[Callable[[_Context], Awaitable[Call]], int | None]] = {
+    "login_user": (_login_user, None),
+    "register_patient": (_register_patient, None),
+    "get_doctors": (_get_doctors, None),
+    "create_doctor": (_create_doctor, None),
+    "update_doctor": (_update_doctor, None),
+    "delete_doctor": (_delete_doctor, 10),
+    "create_appointment": (_create_appointment, None),
+    "get_patient_appointments": (_get_patient_appointments, None),
+    "get_doctor_appointments": (_get_doctor_appointments, None),
+    "get_appointments_by_doctor_id": (_get_appointments_by_doctor_id, None),
+    "get_appointment_details": (_get_appointment_details, None),
+    "update_appointment_by_doctor": (_update_appointment_by_doctor, None),
+    "update_appointments_status": (_update_appointments_status, None),
+    "get_free_slots": (_get_free_slots, None),
+    "get_doctor_schedule": (_get_doctor_schedule, None),
+    "set_weekly_schedule": (_set_weekly_schedule, None),
+    "add_schedule_exception": (_add_schedule_exception, None),
+    "materialize_slots": (_materialize_slots, 3),
+    "fetch_appointment_columns": (_fetch_appointment_columns, None),
+    "iter_appointment_columns": (_iter_appointment_columns, None),
+    "export_appointments": (_export_appointments, None),
+    "import_people_csv": (_import_people_csv, 3),
+    "get_calendar_month": (_get_calendar_month, None),
+    "get_calendar_day": (_get_calendar_day, None),
+    "get_doctor_stats_totals": (_get_doctor_stats_totals, None),
+    "get_doctor_daily_stats": (_get_doctor_daily_stats, None),
+    "rebuild_doctor_stats": (_rebuild_doctor_stats, 3),
+    "close_past_due_appointments": (_close_past_due_appointments, 3),
+    "archive_appointments": (_archive_appointments, 3),
+    "fan_out": (_fan_out, None),
+    "get_doctors_all_branches": (_get_doctors_all_branches, None),
+    "get_appointments_all_branches": (_get_appointments_all_branches, None),
+    "get_change_seq": (_get_change_seq, None),
+    "get_appointment_changes": (_get_appointment_changes, None),
+    "prune_appointment_changes": (_prune_appointment_changes, 3),
+}
+
+
+def public_actions() -> list[str]:
+    """Асинхронные функции из actions.__all__: синхронные помощники вроде parse_datetime базу не трогают"""
+    return [
+        name
+        for name in actions.__all__
+        if inspect.iscoroutinefunction(getattr(actions, name)) or inspect.isasyncgenfunction(getattr(actions, name))
+    ]
+
+
+async def _measure(ctx: _Context, name: str, repeat: int) -> dict:
+    setup, limit = CASES[name]
+    latencies, errors = [], {}
+    for _ in range(min(repeat, limit or repeat)):
+        call = await setup(ctx)
+        started = timer.perf_counter()
+        try:
+            await call()
+        except ServiceError as e:
+            errors[str(e)] = errors.get(str(e), 0) + 1
+        latencies.append(timer.perf_counter() - started)
+    return {
+        "n": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "errors": errors,
+    }
+
+
+async def _dataset_info() -> dict:
+    async with get_read_db() as db:
+        return {
+            "doctors": (await db.execute(select(func.count(Doctor.id)))).scalar_one(),
+            "patients": (await db.execute(select(func.count(Patient.id)))).scalar_one(),
+            "appointments": (await db.execute(select(func.count(Appointment.id)))).scalar_one(),
+        }
+
+
+async def _load_context(tmp: Path, seed: int) -> _Context:
+    async with get_read_db() as db:
+        doctors = (
+            await db.execute(
+                select(Doctor.id, User.login).join(User, User.id == Doctor.user_id).where(User.login.like("doctor_%"))
+            )
+        ).all()
+        patient_logins = list(
+            (
+                await db.execute(
+                    select(User.login).where(User.role == StorageStatus.PATIENT, User.login.like("patient_%")).limit(5_000)
+                )
+            ).scalars()
+        )
+    if not doctors or not patient_logins:
+        raise SystemExit("в базе нет врачей doctor_N и пациентов patient_N: создайте её через benchmarks.dataset")
+    return _Context(random.Random(seed), tmp, [tuple(row) for row in doctors], patient_logins)
+
+
+def _print_results(results: dict, previous: dict | None):
+    print(f"\n{'действие':<32} {'n':>4} {'p50, мс':>10} {'p95, мс':>10}  изменение p50 / p95")
+    for name, stats in results["actions"].items():
+        if stats is None:
+            print(f"{name:<32}  нет сценария")
+            continue
+        line = f"{name:<32} {stats['n']:>4} {stats['p50_ms']:>10.2f} {stats['p95_ms']:>10.2f}"
+        before = (previous or {}).get("actions", {}).get(name)
+        if before:
+            changes = [
+                f"{(stats[key] - before[key]) / before[key] * 100:+6.1f}%" if before[key] else "     -"
+                for key in ("p50_ms", "p95_ms")
+            ]
+            line += "  " + " / ".join(changes)
+        if stats["errors"]:
+            line += f"  отказы: {stats['errors']}"
+        print(line)
+
+
+async def _run(args: argparse.Namespace):
+    previous = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        if args.db is None:
+            db_path = tmp / "suite.sqlite3"
+            make_config(db_path)
+            await generate_dataset(200, 5_000, 100_000, seed=args.seed)
+        elif args.in_place:
+            db_path = args.db
+            make_config(db_path)
+        else:
+            db_path = tmp / "suite.sqlite3"
+            shutil.copy2(args.db, db_path)
+            make_config(db_path)
+        await filling_db()
+
+        ctx = await _load_context(tmp, args.seed)
+        results = {
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "db": str(args.db or "generated"),
+            "dataset": await _dataset_info(),
+            "repeat": args.repeat,
+            "actions": {},
+        }
+        print(f"база: {results['db']}, {results['dataset']}")
+        for name in public_actions():
+            if name in CASES:
+                results["actions"][name] = await _measure(ctx, name, args.repeat)
+            else:
+                results["actions"][name] = None
+        await dispose_engines()
+
+    output = args.output or _RESULTS_DIR / f"actions_{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    _print_results(results, previous)
+    print(f"\nрезультаты: {output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, help="база из benchmarks.dataset")
+    parser.add_argument("--in-place", action="store_true", help="изменять саму базу, а не копию")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="по умолчанию benchmarks/results/actions_<время>.json")
+    parser.add_argument("--compare", type=Path, help="прошлый результат для сравнения")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Аналитика нагрузки: подсчёт по пачкам столбцов в NumPy против цикла по строкам,
+полный расчёт с чтением базы и повторный запрос того же периода из кеша.
+
+    python -m benchmarks.analytics --rows 1000000 --doctors 200
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import update
+
+from benchmarks.common import BENCH_PASSWORD, fill_appointments, make_config, seed_people
+from src.service.analytics import _Accumulator, compute_analytics
+from src.service.database.actions import create_appointment, iter_appointment_columns, login_user
+from src.service.database.core.database import dispose_engines, get_db
+from src.service.database.models import Appointment, AppointmentStatus
+from src.service.utils.epoch import to_epoch
+
+# fill_appointments заполняет два года с 2025-01-01 08:00, последние приёмы - утром 01.01.2027
+_DATE_FROM, _DATE_TO = date(2025, 1, 1), date(2027, 1, 31)
+
+
+def _python_aggregates(chunks, doctor_ids: list[int], months: int, cutoff_ts: int) -> dict:
+    """Те же суммы, что _Accumulator, циклом по строкам"""
+    position = {doctor_id: index for index, doctor_id in enumerate(doctor_ids)}
+    occupied = [0.0] * (len(doctor_ids) * months)
+    heatmap = [0] * (7 * 24)
+    booked, cancelled, no_show = [0] * months, [0] * months, [0] * months
+    for chunk in chunks:
+        for doctor_id, start, end, status in zip(chunk.doctor_ids, chunk.start_ts, chunk.end_ts, chunk.status):
+            dt = datetime(1970, 1, 1) + timedelta(seconds=start)
+            month = (dt.year - _DATE_FROM.year) * 12 + dt.month - _DATE_FROM.month
+            booked[month] += 1
+            if status == AppointmentStatus.CANCELLED:
+                cancelled[month] += 1
+                continue
+            if status == AppointmentStatus.SCHEDULED and end <= cutoff_ts:
+                no_show[month] += 1
+            occupied[position[doctor_id] * months + month] += end - start
+            heatmap[dt.weekday() * 24 + dt.hour] += 1
+    return {"occupied": occupied, "heatmap": heatmap, "booked": booked, "cancelled": cancelled, "no_show": no_show}
+
+
+async def _run(args: argparse.Namespace, tmp: Path) -> tuple[dict, list[str]]:
+    make_config(tmp / "analytics.sqlite3")
+    doctor_ids, _, patient_logins = await seed_people(args.doctors, args.patients)
+    await fill_appointments(args.rows, doctor_ids, args.patients)
+    async with get_db() as db:
+        # часть приёмов отменена, часть так и осталась запланированной - неявки
+        await db.execute(update(Appointment).where(Appointment.id % 9 == 0).values(status=AppointmentStatus.CANCELLED))
+        await db.execute(update(Appointment).where(Appointment.id % 13 == 0).values(status=AppointmentStatus.SCHEDULED))
+        await db.commit()
+
+    months = (_DATE_TO.year - _DATE_FROM.year) * 12 + _DATE_TO.month - _DATE_FROM.month + 1
+    cutoff_ts = to_epoch(datetime.combine(_DATE_TO + timedelta(days=1), datetime.min.time()))
+
+    started = time.perf_counter()
+    chunks = [
+        chunk
+        async for chunk in iter_appointment_columns(
+            date_from=datetime.combine(_DATE_FROM, datetime.min.time()),
+            date_to=datetime.combine(_DATE_TO + timedelta(days=1), datetime.min.time()),
+        )
+    ]
+    timings = {"read": time.perf_counter() - started}
+
+    started = time.perf_counter()
+    accumulator = _Accumulator(
+        np.array(sorted(doctor_ids), dtype=np.int64), np.datetime64(_DATE_FROM, "M"), months, cutoff_ts
+    )
+    for chunk in chunks:
+        accumulator.add(chunk)
+    timings["numpy"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = _python_aggregates(chunks, sorted(doctor_ids), months, cutoff_ts)
+    timings["python"] = time.perf_counter() - started
+
+    failures = []
+    for key in ("heatmap", "booked", "cancelled", "no_show"):
+        if getattr(accumulator, key).tolist() != expected[key]:
+            failures.append(f"{key}: NumPy расходится с циклом по строкам")
+    if not np.allclose(accumulator.occupied, expected["occupied"]):
+        failures.append("занятое время: NumPy расходится с циклом по строкам")
+
+    started = time.perf_counter()
+    report = await compute_analytics(_DATE_FROM, _DATE_TO)
+    timings["full"] = time.perf_counter() - started
+    started = time.perf_counter()
+    cached = await compute_analytics(_DATE_FROM, _DATE_TO)
+    timings["cached"] = time.perf_counter() - started
+
+    if cached is not report:
+        failures.append("повторный запрос того же периода не взят из кеша")
+    if int(report.booked.sum()) != args.rows:
+        failures.append(f"в отчёте {int(report.booked.sum())} приёмов вместо {args.rows}")
+    if not 0 < np.nanmean(report.utilization) < 1:
+        failures.append(f"занятость вне (0, 1): {np.nanmean(report.utilization)}")
+
+    # запись через действие сдвигает журнал изменений, и отчёт считается заново
+    patient = await login_user(patient_logins[0], BENCH_PASSWORD)
+    await create_appointment(patient, doctor_ids[0], datetime(2027, 1, 15, 12, 0))
+    fresh = await compute_analytics(_DATE_FROM, _DATE_TO)
+    if fresh is report or int(fresh.booked.sum()) != args.rows + 1:
+        failures.append("после новой записи отчёт не пересчитан")
+
+    await dispose_engines()
+    return timings, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--patients", type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings, failures = asyncio.run(_run(args, Path(tmp)))
+
+    print(f"приёмов: {args.rows}, врачей: {args.doctors}, период: {_DATE_FROM} - {_DATE_TO}")
+    print(f"чтение пачками столбцов:   {timings['read']:7.2f} с")
+    print(f"подсчёт в NumPy:           {timings['numpy']:7.2f} с")
+    print(f"подсчёт циклом по строкам: {timings['python']:7.2f} с ({timings['python'] / timings['numpy']:.0f}x)")
+    print(f"compute_analytics:         {timings['full']:7.2f} с")
+    print(f"тот же период из кеша:     {timings['cached'] * 1000:7.2f} мс")
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    print("проверки пройдены" if not failures else f"проверок не пройдено: {len(failures)}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Архивация старых приёмов: список приёмов врача до и после переноса, скорость переноса
+и задержка записи пациента, пока архивация идёт пачками через ту же очередь записи.
+Проверяет, что приёмы не теряются, подробности и полный список читают архив, а статистика не меняется.
+
+    python -m benchmarks.archive --rows 200000 --doctors 5 --batch 2000 --repeat 20
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import func, select
+
+from benchmarks.common import BENCH_PASSWORD, fill_appointments, make_config, percentile, seed_people
+from src.service.database.actions import (
+    archive_appointments,
+    create_appointment,
+    get_appointment_changes,
+    get_appointment_details,
+    get_change_seq,
+    get_doctor_appointments,
+    get_doctor_stats_totals,
+    login_user,
+    rebuild_doctor_stats,
+)
+from src.service.database.core.database import dispose_engines, get_read_db
+from src.service.database.models import Appointment, AppointmentArchive
+
+
+async def _timed(repeat: int, make) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await make()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _count(model) -> int:
+    async with get_read_db() as db:
+        return (await db.execute(select(func.count()).select_from(model))).scalar_one()
+
+
+async def _book_while(task: asyncio.Task, patient, doctor_id: int) -> list[float]:
+    """Записи пациента на будущее время, пока идёт архивация"""
+    samples = []
+    start = datetime(2027, 3, 1, 9, 0)
+    while not task.done():
+        started = time.perf_counter()
+        await create_appointment(patient, doctor_id, start + timedelta(minutes=30 * len(samples)))
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _run(args: argparse.Namespace, tmp: Path) -> tuple[dict, dict, list[str]]:
+    make_config(tmp / "archive.sqlite3", archive_after_days=args.days, archive_batch_size=args.batch)
+    doctor_ids, doctor_logins, patient_logins = await seed_people(args.doctors, args.patients)
+    await fill_appointments(args.rows, doctor_ids, args.patients)
+    await rebuild_doctor_stats()
+    doctor = await login_user(doctor_logins[0], BENCH_PASSWORD)
+    patient = await login_user(patient_logins[0], BENCH_PASSWORD)
+
+    period = (date(2025, 1, 1), date(2026, 12, 31))
+    stats_before = await get_doctor_stats_totals(*period)
+    full_before = [item.id for item in await get_doctor_appointments(doctor)]
+    timings = {"before": await _timed(args.repeat, lambda: get_doctor_appointments(doctor))}
+    seq = await get_change_seq()
+
+    started = time.perf_counter()
+    archiving = asyncio.create_task(archive_appointments())
+    timings["booking"] = await _book_while(archiving, patient, doctor_ids[0])
+    moved = await archiving
+    elapsed = time.perf_counter() - started
+    timings["after"] = await _timed(args.repeat, lambda: get_doctor_appointments(doctor))
+
+    failures = []
+    hot, archived = await _count(Appointment), await _count(AppointmentArchive)
+    if archived != moved:
+        failures.append(f"в архиве {archived} приёмов, перенесено {moved}")
+    if hot + archived != args.rows + len(timings["booking"]):
+        failures.append("после архивации число приёмов изменилось")
+    if await archive_appointments():
+        failures.append("повторная архивация нашла ещё приёмы")
+
+    full_after = await get_doctor_appointments(doctor, include_archived=True)
+    booked_now = len(timings["booking"]) if doctor_ids[0] == doctor.doctor_id else 0
+    if len(full_after) != len(full_before) + booked_now:
+        failures.append("полный список с архивом отличается от списка до архивации")
+    if [item.dt for item in full_after] != sorted(item.dt for item in full_after):
+        failures.append("полный список с архивом не отсортирован по времени")
+
+    async with get_read_db() as db:
+        archived_id = (
+            await db.execute(select(AppointmentArchive.id).where(AppointmentArchive.doctor_id == doctor.doctor_id).limit(1))
+        ).scalar_one_or_none()
+    if archived_id is None or not (await get_appointment_details(doctor, archived_id)).archived:
+        failures.append("подробности архивного приёма не найдены или не помечены как архивные")
+
+    delta = await get_appointment_changes(doctor, seq)
+    archived_own = {item.id for item in full_after if item.dt < datetime.now() - timedelta(days=args.days)}
+    if not delta.reset and not archived_own <= set(delta.removed):
+        failures.append("журнал изменений не сообщил о перенесённых приёмах")
+
+    await rebuild_doctor_stats()
+    stats_after = await get_doctor_stats_totals(*period)
+    if stats_after != stats_before:
+        failures.append("статистика после пересчёта с архивом изменилась")
+
+    await dispose_engines()
+    counts = {"moved": moved, "hot": hot, "elapsed": elapsed}
+    return timings, counts, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="приёмов за два года")
+    parser.add_argument("--doctors", type=int, default=5)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365, help="горизонт архивации archive_after_days")
+    parser.add_argument("--batch", type=int, default=2_000, help="archive_batch_size")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings, counts, failures = asyncio.run(_run(args, Path(tmp)))
+
+    print(f"приёмов: {args.rows}, перенесено в архив: {counts['moved']}, осталось в рабочей таблице: {counts['hot']}")
+    print(f"архивация: {counts['elapsed']:.2f} с, {counts['moved'] / counts['elapsed']:.0f} приёмов/с")
+    for key, label in (
+        ("before", "список врача до архивации"),
+        ("after", "список врача после"),
+        ("booking", "запись во время архивации"),
+    ):
+        samples = timings[key]
+        print(
+            f"{label:<30} p50: {percentile(samples, 50) * 1000:8.2f} мс  p95: {percentile(samples, 95) * 1000:8.2f} мс"
+            f"  ({len(samples)})"
+        )
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    print("проверки пройдены" if not failures else f"проверок не пройдено: {len(failures)}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
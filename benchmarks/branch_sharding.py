@@ -0,0 +1,152 @@
+"""
+Разбиение сети на базы филиалов: запись пациентов одновременно во всех филиалах в одном файле
+против отдельного файла на филиал и чтение администратора по всем филиалам параллельно и по очереди.
+Заодно проверяется, что сессия не видит данных чужого филиала.
+
+    python -m benchmarks.branch_sharding --branches 4 --terminals 8 --ops 40 --history 50000
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.common import BENCH_PASSWORD, fill_appointments, make_config, seed_people
+from src.service.database.actions import (
+    create_appointment,
+    get_appointments_all_branches,
+    get_doctors,
+    get_doctors_all_branches,
+    get_patient_appointments,
+    login_user,
+)
+from src.service.database.actions.branches import _appointments_in_range
+from src.service.database.core.database import branch_ids, dispose_engines, use_branch
+from src.service.exeptions import ServiceError
+
+_HISTORY_FROM = datetime(2025, 1, 1)
+_HISTORY_TO = datetime(2027, 1, 1)
+
+
+async def _seed(args: argparse.Namespace, scale: int = 1) -> dict:
+    """Одинаковые врачи, пациенты и история в базе каждого филиала; scale - сколько филиалов в одной базе"""
+    people = {}
+    for branch_id in branch_ids():
+        with use_branch(branch_id):
+            doctor_ids, _, patient_logins = await seed_people(args.doctors * scale, args.terminals * scale)
+            await fill_appointments(args.history * scale, doctor_ids, args.terminals * scale, seed=branch_id or 0)
+            people[branch_id] = (doctor_ids, patient_logins)
+    return people
+
+
+async def _book(args: argparse.Namespace, people: dict, terminals: list[tuple[int | None, int]]) -> float:
+    """Терминалы (филиал, номер) одновременно записывают пациентов; возвращает записей в секунду"""
+    day = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    async def terminal(branch_id, number: int) -> int:
+        with use_branch(branch_id):
+            doctor_ids, patient_logins = people[branch_id]
+            session = await login_user(patient_logins[number], BENCH_PASSWORD)
+        booked = 0
+        for op in range(args.ops):
+            # у каждого терминала своё время, поэтому отказов нет и меряется только запись
+            dt = day + timedelta(days=op // 16, minutes=30 * (op % 16))
+            try:
+                await create_appointment(session, doctor_ids[number % len(doctor_ids)], dt)
+                booked += 1
+            except ServiceError:
+                pass
+        return booked
+
+    started = time.perf_counter()
+    booked = await asyncio.gather(*(terminal(branch_id, number) for branch_id, number in terminals))
+    return sum(booked) / (time.perf_counter() - started)
+
+
+async def _run(args: argparse.Namespace, tmp: Path) -> dict:
+    results = {}
+
+    # одна база: врачи, пациенты и терминалы всех филиалов в одном файле
+    make_config(tmp / "single.sqlite3")
+    people = await _seed(args, scale=args.branches)
+    results["single"] = await _book(args, people, [(None, number) for number in range(args.terminals * args.branches)])
+    await dispose_engines()
+
+    branches = {branch_id: f"sqlite+aiosqlite:///{tmp / f'branch_{branch_id}.sqlite3'}" for branch_id in range(1, args.branches + 1)}
+    make_config(tmp / "unused.sqlite3", branches=branches, branch_id=1)
+    people = await _seed(args)
+    results["sharded"] = await _book(
+        args, people, [(branch_id, number) for branch_id in branches for number in range(args.terminals)]
+    )
+
+    started = time.perf_counter()
+    merged = await get_appointments_all_branches(_HISTORY_FROM, _HISTORY_TO)
+    results["fan_out"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sequential = 0
+    for branch_id in branches:
+        with use_branch(branch_id):
+            sequential += len(await _appointments_in_range(_HISTORY_FROM, _HISTORY_TO))
+    results["sequential"] = time.perf_counter() - started
+
+    failures = []
+    if len(merged) != sequential:
+        failures.append(f"слияние вернуло {len(merged)} приёмов вместо {sequential}")
+    if any(a.dt > b.dt for a, b in zip(merged, merged[1:])):
+        failures.append("слияние нарушило порядок по времени")
+    doctors = await get_doctors_all_branches()
+    if len(doctors) != args.doctors * args.branches or {d.branch_id for d in doctors} != set(branches):
+        failures.append("врачи филиалов собраны не полностью")
+
+    # одинаковые логины в разных филиалах - разные пользователи
+    with use_branch(1):
+        first = await login_user("patient_0", BENCH_PASSWORD)
+        local_doctors = await get_doctors()
+    with use_branch(2 if args.branches > 1 else 1):
+        second = await login_user("patient_0", BENCH_PASSWORD)
+    if first.branch_id != 1 or {d.branch_id for d in local_doctors} != {1}:
+        failures.append("сессия или список врачей без филиала")
+    if args.branches > 1:
+        # запись выполняется в базе филиала сессии, а не текущего контекста
+        with use_branch(2):
+            await create_appointment(first, local_doctors[0].id, datetime(2030, 1, 1, 9))
+        own = await get_patient_appointments(first)
+        other = await get_patient_appointments(second)
+        if not any(a.dt == datetime(2030, 1, 1, 9) for a in own) or any(a.dt == datetime(2030, 1, 1, 9) for a in other):
+            failures.append("запись попала в базу чужого филиала")
+
+    await dispose_engines()
+    results["failures"] = failures
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--branches", type=int, default=4)
+    parser.add_argument("--terminals", type=int, default=8, help="терминалов в каждом филиале")
+    parser.add_argument("--ops", type=int, default=40, help="записей на терминал")
+    parser.add_argument("--doctors", type=int, default=20, help="врачей в каждом филиале")
+    parser.add_argument("--history", type=int, default=50_000, help="прошлых приёмов в каждом филиале")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = asyncio.run(_run(args, Path(tmp)))
+
+    print(f"филиалов: {args.branches}, терминалов в филиале: {args.terminals}, записей на терминал: {args.ops}")
+    print(f"запись, один файл:         {results['single']:8.0f} записей/с")
+    print(f"запись, файл на филиал:    {results['sharded']:8.0f} записей/с")
+    print(f"приёмы всех филиалов ({args.history} в каждом):")
+    print(f"  параллельно:             {results['fan_out']:8.3f} с")
+    print(f"  по очереди:              {results['sequential']:8.3f} с")
+
+    for failure in results["failures"]:
+        print(f"ОШИБКА: {failure}")
+    print("проверки пройдены" if not results["failures"] else f"проверок не пройдено: {len(results['failures'])}")
+    if results["failures"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
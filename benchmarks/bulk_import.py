@@ -0,0 +1,91 @@
+"""
+Массовый импорт врачей и пациентов из CSV против поштучных create_doctor / register_patient.
+
+    python -m benchmarks.bulk_import --rows 2000
+"""
+import argparse
+import asyncio
+import csv
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import func, select
+
+from benchmarks.common import make_config
+from src.service.database.actions import IMPORT_COLUMNS, create_doctor, import_people_csv, register_patient
+from src.service.database.core.database import dispose_engines, get_read_db
+from src.service.database.core.filling import filling_db
+from src.service.database.models import User
+
+
+def _write_csv(path: Path, rows: int, prefix: str):
+    """Каждая десятая строка - врач; в конце несколько заведомо ошибочных строк"""
+    with path.open("w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(IMPORT_COLUMNS)
+        for i in range(rows):
+            if i % 10 == 0:
+                writer.writerow(("doctor", f"{prefix}_doctor_{i}", "secret", f"Врач {i}", f"Специализация {i % 7}", ""))
+            else:
+                writer.writerow(("patient", f"{prefix}_patient_{i}", "secret", f"Пациент {i}", "", f"+7900{i:07d}"))
+        writer.writerow(("patient", f"{prefix}_patient_1", "secret", "Повтор", "", "+79000000000"))
+        writer.writerow(("patient", f"{prefix}_no_phone", "secret", "Без телефона", "", ""))
+        writer.writerow(("nurse", f"{prefix}_nurse", "secret", "Медсестра", "", ""))
+        writer.writerow(("doctor", "admin", "secret", "Занятый логин", "Терапевт", ""))
+
+
+async def _one_by_one(path: Path) -> float:
+    started = time.perf_counter()
+    with path.open(encoding="utf-8", newline="") as file:
+        for row in csv.DictReader(file):
+            if row["role"] == "doctor":
+                await create_doctor(row["login"], row["password"], row["fio"], row["specialization"])
+            else:
+                await register_patient(row["login"], row["password"], row["fio"], row["phone"])
+    return time.perf_counter() - started
+
+
+async def _run(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        make_config(tmp / "import.sqlite3", import_hash_workers=args.workers)
+        await filling_db()
+
+        if args.baseline:
+            baseline_csv = tmp / "baseline.csv"
+            _write_csv(baseline_csv, args.baseline, "single")
+            # ошибочные строки в конце файла для поштучного пути не нужны
+            lines = baseline_csv.read_text(encoding="utf-8").splitlines(keepends=True)[:-4]
+            baseline_csv.write_text("".join(lines), encoding="utf-8")
+            elapsed = await _one_by_one(baseline_csv)
+            print(f"поштучно: {args.baseline} строк за {elapsed:.2f} с ({args.baseline / elapsed:,.1f} строк/с)")
+
+        source = tmp / "people.csv"
+        _write_csv(source, args.rows, "bulk")
+        report = await import_people_csv(source)
+        print(
+            f"импорт: {report.rows} строк за {report.elapsed:.2f} с ({report.rows_per_second:,.1f} строк/с), "
+            f"врачей {report.doctors}, пациентов {report.patients}, ошибок {len(report.errors)}"
+        )
+        writing = report.elapsed - report.hash_elapsed
+        print(f"  из них хэширование {report.hash_elapsed:.2f} с, проверка и запись {writing:.2f} с")
+        for error in report.errors:
+            print(f"  строка {error.line} ({error.login}): {error.message}")
+
+        async with get_read_db() as db:
+            users = (await db.execute(select(func.count(User.id)))).scalar_one()
+        print(f"пользователей в базе: {users}")
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000)
+    parser.add_argument("--baseline", type=int, default=100, help="строк для поштучного сравнения, 0 - без него")
+    parser.add_argument("--workers", type=int, default=0, help="потоков хэширования, 0 - по числу ядер")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
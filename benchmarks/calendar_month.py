@@ -0,0 +1,126 @@
+"""
+Месяц календаря врача: весь список приёмов с подсчётом по дням в Python против одного GROUP BY,
+соседний месяц из заранее загруженного кеша и список одного дня.
+
+    python -m benchmarks.calendar_month --rows 100000 --repeat 20
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import update
+
+from benchmarks.common import BENCH_PASSWORD, fill_appointments, make_config, percentile, seed_people
+from src.service.appointment_calendar import AppointmentCalendar
+from src.service.database.actions import (
+    create_appointment,
+    get_appointment_changes,
+    get_calendar_day,
+    get_calendar_month,
+    get_change_seq,
+    get_doctor_appointments,
+    login_user,
+)
+from src.service.database.core.database import dispose_engines, get_db
+from src.service.database.models import Appointment, AppointmentStatus
+
+
+async def _timed(repeat: int, make) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await make()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _flat_month(doctor, year: int, month: int) -> dict[date, int]:
+    """Как без календаря: загрузить все приёмы врача и разложить по дням"""
+    return dict(
+        Counter(
+            item.dt.date()
+            for item in await get_doctor_appointments(doctor)
+            if item.dt.year == year and item.dt.month == month and item.status != AppointmentStatus.CANCELLED
+        )
+    )
+
+
+async def _run(args: argparse.Namespace, tmp: Path) -> tuple[dict, list[str]]:
+    make_config(tmp / "calendar.sqlite3")
+    doctor_ids, doctor_logins, patient_logins = await seed_people(1, args.patients)
+    await fill_appointments(args.rows, doctor_ids, args.patients)
+    async with get_db() as db:
+        await db.execute(update(Appointment).where(Appointment.id % 10 == 0).values(status=AppointmentStatus.CANCELLED))
+        await db.commit()
+    doctor = await login_user(doctor_logins[0], BENCH_PASSWORD)
+
+    year, month = 2025, 6
+    timings = {
+        "flat": await _timed(args.repeat, lambda: _flat_month(doctor, year, month)),
+        "grouped": await _timed(args.repeat, lambda: get_calendar_month(doctor, year, month)),
+        "day": await _timed(args.repeat, lambda: get_calendar_day(doctor, date(year, month, 16))),
+    }
+
+    failures = []
+    grouped = {item.day: item.count for item in await get_calendar_month(doctor, year, month)}
+    if grouped != await _flat_month(doctor, year, month):
+        failures.append("счётчики по дням расходятся со списком приёмов")
+
+    # листание вперёд: следующий месяц уже загружен, пока смотрели текущий
+    calendar = AppointmentCalendar(doctor)
+    await calendar.month(year, month)
+    neighbour_samples = []
+    for step in range(1, args.repeat + 1):
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await calendar.month(year + (month + step - 1) // 12, (month + step - 1) % 12 + 1)
+        neighbour_samples.append(time.perf_counter() - started)
+    timings["prefetched"] = neighbour_samples
+
+    # новая запись сбрасывает свой месяц в кеше
+    seq = await get_change_seq()
+    july = await calendar.month(2027, 7, prefetch=False)
+    patient = await login_user(patient_logins[0], BENCH_PASSWORD)
+    await create_appointment(patient, doctor_ids[0], datetime(2027, 7, 5, 10, 0))
+    calendar.apply_delta(await get_appointment_changes(doctor, seq))
+    after = await calendar.month(2027, 7, prefetch=False)
+    if after.get(date(2027, 7, 5)) != july.get(date(2027, 7, 5), 0) + 1:
+        failures.append("после новой записи месяц в кеше не обновился")
+
+    await dispose_engines()
+    return timings, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000, help="приёмов у врача за два года")
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings, failures = asyncio.run(_run(args, Path(tmp)))
+
+    print(f"приёмов у врача: {args.rows}, повторов: {args.repeat}")
+    for key, label in (
+        ("flat", "все приёмы + подсчёт в Python"),
+        ("grouped", "GROUP BY за месяц"),
+        ("prefetched", "соседний месяц из кеша"),
+        ("day", "список одного дня"),
+    ):
+        samples = timings[key]
+        print(f"{label:<30} p50: {percentile(samples, 50) * 1000:8.2f} мс  p95: {percentile(samples, 95) * 1000:8.2f} мс")
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    print("проверки пройдены" if not failures else f"проверок не пройдено: {len(failures)}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
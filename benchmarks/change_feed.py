@@ -0,0 +1,120 @@
+"""
+Обновление кабинета врача: полная перезагрузка списка против опроса журнала изменений,
+когда ничего не изменилось и когда появилось несколько новых записей.
+
+    python -m benchmarks.change_feed --appointments 3000 --polls 200
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.common import BENCH_PASSWORD, make_config, percentile, seed_people
+from src.service.database.actions import (
+    create_appointment,
+    get_appointment_changes,
+    get_change_seq,
+    get_doctor_appointments,
+    get_patient_appointments,
+    login_user,
+    prune_appointment_changes,
+    update_appointments_status,
+)
+from src.service.database.core.database import dispose_engines
+from src.service.database.models import AppointmentStatus
+
+
+async def _timed(calls: int, make) -> list[float]:
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await make()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _run(args: argparse.Namespace, tmp: Path) -> tuple[dict, list[str]]:
+    make_config(tmp / "feed.sqlite3")
+    doctor_ids, doctor_logins, patient_logins = await seed_people(1, args.patients)
+    doctor = await login_user(doctor_logins[0], BENCH_PASSWORD)
+    patients = [await login_user(login, BENCH_PASSWORD) for login in patient_logins]
+
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    slot = 0
+
+    async def book(count: int):
+        nonlocal slot
+        for _ in range(count):
+            await create_appointment(patients[slot % len(patients)], doctor_ids[0], start + timedelta(minutes=30 * slot))
+            slot += 1
+
+    await book(args.appointments)
+    seq = await get_change_seq()
+
+    timings = {
+        "full": await _timed(args.polls, lambda: get_doctor_appointments(doctor)),
+        "idle": await _timed(args.polls, lambda: get_appointment_changes(doctor, seq)),
+    }
+
+    failures = []
+    await book(args.changes)
+    timings["delta"] = await _timed(args.polls, lambda: get_appointment_changes(doctor, seq))
+    delta = await get_appointment_changes(doctor, seq)
+    if len(delta.changed) != args.changes or delta.reset:
+        failures.append(f"в изменениях {len(delta.changed)} приёмов вместо {args.changes}")
+
+    # пациенту приходят только его приёмы
+    own_ids = {item.id for item in await get_patient_appointments(patients[0])}
+    if any(item.id not in own_ids for item in (await get_appointment_changes(patients[0], seq)).changed):
+        failures.append("пациенту пришли чужие приёмы")
+
+    cancelled = [item.id for item in delta.changed[:2]]
+    await update_appointments_status(doctor, cancelled, AppointmentStatus.CANCELLED)
+    after_cancel = await get_appointment_changes(doctor, delta.seq)
+    if {item.id for item in after_cancel.changed} != set(cancelled) or any(
+        item.status != AppointmentStatus.CANCELLED for item in after_cancel.changed
+    ):
+        failures.append("отмена не попала в журнал")
+
+    await prune_appointment_changes(datetime.now() + timedelta(days=1))
+    if not (await get_appointment_changes(doctor, seq)).reset:
+        failures.append("после очистки журнала старый номер не требует перезагрузки")
+    if (await get_change_seq()) != after_cancel.seq:
+        failures.append("очистка журнала сбросила номер изменений")
+
+    await dispose_engines()
+    return timings, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=3000, help="приёмов у врача")
+    parser.add_argument("--changes", type=int, default=5, help="новых записей между опросами")
+    parser.add_argument("--patients", type=int, default=50)
+    parser.add_argument("--polls", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings, failures = asyncio.run(_run(args, Path(tmp)))
+
+    print(f"приёмов у врача: {args.appointments}, опросов: {args.polls}")
+    labels = {
+        "full": "полная загрузка списка",
+        "idle": "журнал, изменений нет",
+        "delta": f"журнал, {args.changes} новых записей",
+    }
+    for key, label in labels.items():
+        samples = timings[key]
+        print(f"{label:<28} p50: {percentile(samples, 50) * 1000:7.2f} мс  p95: {percentile(samples, 95) * 1000:7.2f} мс")
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    print("проверки пройдены" if not failures else f"проверок не пройдено: {len(failures)}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+import math
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert, select
+
+from src.config import set_config
+from src.service.database.actions.actions import hash_password
+from src.service.database.core.database import get_db
+from src.service.database.core.filling import filling_db
+from src.service.database.models import Appointment, AppointmentStatus, Doctor, Patient, StorageStatus, User
+from src.service.models.conf_model import Config
+from src.service.utils.epoch import to_epoch
+
+BENCH_PASSWORD = "bench"
+_FILL_CHUNK = 50_000
+
+
+def make_config(db_path: Path, **overrides) -> Config:
+    """Конфиг для бенчмарка: отдельный файл базы и без вывода SQL. Вызывается внутри работающего цикла"""
+    conf = Config(
+        global_event_loop=asyncio.get_running_loop(),
+        data_base_path=db_path,
+        sql_echo=False,
+        **overrides,
+    )
+    set_config(conf)
+    return conf
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+async def seed_people(doctors: int, patients: int) -> tuple[list[int], list[str], list[str]]:
+    """
+    Создаёт схему и заполняет врачей и пациентов пачками.
+    Возвращает id врачей, логины врачей и логины пациентов (пароль у всех BENCH_PASSWORD)
+    """
+    await filling_db()
+    password = hash_password(BENCH_PASSWORD)
+
+    doctor_logins = [f"doctor_{i}" for i in range(doctors)]
+    patient_logins = [f"patient_{i}" for i in range(patients)]
+
+    async with get_db() as db:
+        await db.execute(
+            insert(User),
+            [{"login": login, "password": password, "role": StorageStatus.DOCTOR} for login in doctor_logins]
+            + [{"login": login, "password": password, "role": StorageStatus.PATIENT} for login in patient_logins],
+        )
+        users = dict((await db.execute(select(User.login, User.id))).all())
+        await db.execute(
+            insert(Doctor),
+            [
+                {"user_id": users[login], "fio": f"Врач {i}", "specialization": f"Специализация {i % 10}"}
+                for i, login in enumerate(doctor_logins)
+            ],
+        )
+        await db.execute(
+            insert(Patient),
+            [
+                {"user_id": users[login], "fio": f"Пациент {i}", "phone": f"+7900{i:07d}"}
+                for i, login in enumerate(patient_logins)
+            ],
+        )
+        await db.commit()
+        doctor_ids = list((await db.execute(select(Doctor.id).order_by(Doctor.id))).scalars())
+
+    return doctor_ids, doctor_logins, patient_logins
+
+
+async def fill_appointments(rows: int, doctor_ids: list[int], patients: int, seed: int = 42):
+    """
+    Случайные завершённые приёмы за два года начиная с 2025-01-01, пачками в обход очереди записи.
+    Пациенты считаются созданными seed_people в пустой базе, то есть с id от 1 до patients
+    """
+    rnd = random.Random(seed)
+    base = datetime(2025, 1, 1, 8)
+    table = Appointment.__table__
+    async with get_db() as db:
+        for offset in range(0, rows, _FILL_CHUNK):
+            batch = []
+            for _ in range(min(_FILL_CHUNK, rows - offset)):
+                start = base + timedelta(minutes=15 * rnd.randrange(2 * 365 * 96))
+                end = start + timedelta(minutes=30)
+                batch.append(
+                    {
+                        "doctor_id": rnd.choice(doctor_ids),
+                        "patient_id": rnd.randrange(1, patients + 1),
+                        "datetime": start,
+                        "end_datetime": end,
+                        "start_ts": to_epoch(start),
+                        "end_ts": to_epoch(end),
+                        "status": AppointmentStatus.COMPLETED,
+                    }
+                )
+            await db.execute(insert(table), batch)
+        await db.commit()
@@ -0,0 +1,258 @@
+"""
+Нагрузочный прогон: много терминалов поликлиники в нескольких процессах одновременно
+входят в систему, читают список врачей, записывают пациентов и закрывают приёмы в одном файле SQLite.
+В конце проверяется, что ни у одного врача нет пересекающихся записей.
+
+    python -m benchmarks.contention --terminals 32 --ops 50 --processes 2
+    python -m benchmarks.contention --mix list=20,login=10,book=60,update=10 --days 3 --output load.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased
+
+from benchmarks.common import BENCH_PASSWORD, make_config, percentile, seed_people
+from src.service.database.actions import (
+    SessionContext,
+    create_appointment,
+    get_doctor_appointments,
+    get_doctors,
+    login_user,
+    update_appointment_by_doctor,
+)
+from src.service.database.core.database import dispose_engines, get_read_db
+from src.service.database.core.retry import get_contention_metrics, is_lock_error
+from src.service.database.models import Appointment, AppointmentStatus
+from src.service.exeptions import ServiceError
+
+OPERATIONS = ("list", "login", "book", "update")
+DEFAULT_MIX = "list=40,login=10,book=30,update=20"
+
+
+def parse_mix(raw: str) -> dict[str, int]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS or not weight.strip().isdigit():
+            raise argparse.ArgumentTypeError(f"ожидается список вида {DEFAULT_MIX}")
+        mix[name.strip()] = int(weight)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("хотя бы одна операция должна иметь ненулевой вес")
+    return mix
+
+
+def _new_stats() -> dict:
+    return {"ok": Counter(), "refused": Counter(), "lock_errors": Counter(), "errors": Counter(), "latency": defaultdict(list)}
+
+
+def _record_error(kind: str, error: Exception, stats: dict):
+    # исчерпанные повторы при блокировке приходят как ServiceError с исходной ошибкой в __cause__
+    if is_lock_error(error) or (isinstance(error, ServiceError) and error.__cause__ is not None and is_lock_error(error.__cause__)):
+        stats["lock_errors"][kind] += 1
+    elif isinstance(error, ServiceError):
+        stats["refused"][kind] += 1  # бизнес-отказ (например, время занято) - штатный ответ
+    else:
+        stats["errors"][f"{kind}: {type(error).__name__}"] += 1
+
+
+async def _terminal(terminal_id: int, ops: int, mix: dict[str, int], days: int, people: tuple, sessions: dict, stats: dict):
+    doctor_ids, doctor_logins, patient_logins = people
+    rnd = random.Random(terminal_id)
+    start_day = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    kinds, weights = list(mix), list(mix.values())
+
+    async def session(login: str) -> SessionContext:
+        if login not in sessions:
+            sessions[login] = await login_user(login, BENCH_PASSWORD)
+        return sessions[login]
+
+    for _ in range(ops):
+        kind = rnd.choices(kinds, weights=weights)[0]
+        # вход под пользователем делается один раз на процесс и в задержку операции не входит
+        try:
+            if kind == "book":
+                user = await session(rnd.choice(patient_logins))
+            elif kind == "update":
+                user = await session(rnd.choice(doctor_logins))
+        except Exception as e:
+            _record_error("login", e, stats)
+            continue
+
+        started = time.perf_counter()
+        try:
+            if kind == "list":
+                await get_doctors()
+            elif kind == "login":
+                await login_user(rnd.choice(patient_logins), BENCH_PASSWORD)
+            elif kind == "book":
+                dt = start_day + timedelta(days=rnd.randrange(days), minutes=30 * rnd.randrange(18))
+                await create_appointment(user, rnd.choice(doctor_ids), dt)
+            else:
+                appointments = await get_doctor_appointments(user)
+                if appointments:
+                    target = rnd.choice(appointments)
+                    await update_appointment_by_doctor(
+                        user, target.id, "жалоба", "состояние", "заключение", AppointmentStatus.COMPLETED
+                    )
+            stats["ok"][kind] += 1
+        except Exception as e:
+            _record_error(kind, e, stats)
+        stats["latency"][kind].append(time.perf_counter() - started)
+
+
+async def _run_terminals(
+    process_id: int, db_path: Path, terminals: int, ops: int, mix: dict, days: int, doctors: int, patients: int
+) -> dict:
+    make_config(db_path)
+    doctor_ids = [d.id for d in await get_doctors()]
+    people = (doctor_ids, [f"doctor_{i}" for i in range(doctors)], [f"patient_{i}" for i in range(patients)])
+
+    stats = _new_stats()
+    sessions: dict[str, SessionContext] = {}
+    # номера терминалов сквозные между процессами, иначе процессы повторяли бы одни и те же операции
+    first = process_id * terminals
+    await asyncio.gather(
+        *(_terminal(first + i, ops, mix, days, people, sessions, stats) for i in range(terminals))
+    )
+    await dispose_engines()
+
+    metrics = get_contention_metrics()
+    stats["retries"] = metrics.retries
+    stats["lock_wait"] = metrics.lock_wait_seconds
+    stats["latency"] = dict(stats["latency"])
+    return stats
+
+
+def _process_entry(*args) -> dict:
+    return asyncio.run(_run_terminals(*args))
+
+
+async def _seed(db_path: Path, doctors: int, patients: int):
+    make_config(db_path)
+    await seed_people(doctors, patients)
+    await dispose_engines()
+
+
+async def _double_bookings(db_path: Path) -> tuple[int, int]:
+    """Пары пересекающихся неотменённых записей у одного врача и общее число записей"""
+    make_config(db_path)
+    other = aliased(Appointment)
+    async with get_read_db() as db:
+        overlaps = (
+            await db.execute(
+                select(func.count())
+                .select_from(Appointment)
+                .join(
+                    other,
+                    (other.doctor_id == Appointment.doctor_id)
+                    & (other.id > Appointment.id)
+                    & (other.start_ts < Appointment.end_ts)
+                    & (other.end_ts > Appointment.start_ts),
+                )
+                .where(
+                    Appointment.status != AppointmentStatus.CANCELLED,
+                    other.status != AppointmentStatus.CANCELLED,
+                )
+            )
+        ).scalar_one()
+        total = (await db.execute(select(func.count(Appointment.id)))).scalar_one()
+    await dispose_engines()
+    return overlaps, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--terminals", type=int, default=32, help="терминалов в каждом процессе")
+    parser.add_argument("--ops", type=int, default=50, help="операций на терминал")
+    parser.add_argument("--processes", type=int, default=1, help="процессов, работающих с одним файлом")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"веса операций, {DEFAULT_MIX}")
+    parser.add_argument("--days", type=int, default=30, help="на сколько дней вперёд записывают; меньше - больше конфликтов")
+    parser.add_argument("--doctors", type=int, default=20)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--output", type=Path, help="сохранить итоги в JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "contention.sqlite3"
+        asyncio.run(_seed(db_path, args.doctors, args.patients))
+
+        started = time.perf_counter()
+        with multiprocessing.get_context("spawn").Pool(args.processes) as pool:
+            results = pool.starmap(
+                _process_entry,
+                [
+                    (process_id, db_path, args.terminals, args.ops, args.mix, args.days, args.doctors, args.patients)
+                    for process_id in range(args.processes)
+                ],
+            )
+        elapsed = time.perf_counter() - started
+        overlaps, appointments = asyncio.run(_double_bookings(db_path))
+
+    total = _new_stats()
+    retries, lock_wait = 0, 0.0
+    for stats in results:
+        for key in ("ok", "refused", "lock_errors", "errors"):
+            total[key].update(stats[key])
+        for kind, values in stats["latency"].items():
+            total["latency"][kind].extend(values)
+        retries += stats["retries"]
+        lock_wait += stats["lock_wait"]
+
+    all_latency = [value for values in total["latency"].values() for value in values]
+    report = {
+        "terminals": args.terminals * args.processes,
+        "processes": args.processes,
+        "mix": args.mix,
+        "operations": len(all_latency),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ops": round(len(all_latency) / elapsed, 1),
+        "by_operation": {
+            kind: {
+                "count": len(values),
+                "ok": total["ok"][kind],
+                "refused": total["refused"][kind],
+                "lock_errors": total["lock_errors"][kind],
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+            for kind, values in sorted(total["latency"].items())
+        },
+        "lock_errors": sum(total["lock_errors"].values()),
+        "other_errors": dict(total["errors"]),
+        "lock_retries": retries,
+        "lock_wait_s": round(lock_wait, 3),
+        "appointments": appointments,
+        "double_bookings": overlaps,
+    }
+
+    print(f"терминалов: {report['terminals']}, операций: {report['operations']}, время: {elapsed:.2f} с")
+    print(f"пропускная способность: {report['throughput_ops']} оп/с, смесь: {args.mix}")
+    print(f"задержка всех операций p50: {percentile(all_latency, 50) * 1000:.1f} мс, p95: {percentile(all_latency, 95) * 1000:.1f} мс")
+    print(f"\n{'операция':<8} {'всего':>6} {'успех':>6} {'отказ':>6} {'блок.':>6} {'p50, мс':>9} {'p95, мс':>9} {'p99, мс':>9}")
+    for kind, row in report["by_operation"].items():
+        print(
+            f"{kind:<8} {row['count']:>6} {row['ok']:>6} {row['refused']:>6} {row['lock_errors']:>6}"
+            f" {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}"
+        )
+    print(f"\nошибки блокировки: {report['lock_errors']}, прочие ошибки: {report['other_errors'] or 'нет'}")
+    print(f"повторов из-за блокировки: {retries}, ожидание блокировки: {lock_wait:.2f} с")
+    print(f"записей: {appointments}, двойных записей к врачу: {overlaps}")
+
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    if overlaps:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Генератор синтетической базы с реалистичными объёмами: врачи с недельным расписанием,
+пациенты и приёмы за два года истории плюс месяц вперёд, без пересечений у одного врача.
+При одинаковых параметрах и --anchor база получается одинаковой.
+
+    python -m benchmarks.dataset --output media/bench.sqlite3 --doctors 5000 --patients 200000 --appointments 5000000
+"""
+import argparse
+import asyncio
+import random
+import time as timer
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import insert
+
+from benchmarks.common import make_config, seed_people
+from src.config import get_config
+from src.service.database.core.database import dispose_engines, get_db
+from src.service.database.models import Appointment, AppointmentStatus, DoctorSchedule
+from src.service.utils.epoch import to_epoch
+
+_CHUNK = 50_000
+
+_COMPLAINTS = (
+    "Головная боль и слабость",
+    "Боль в горле, температура 37.8",
+    "Боль в пояснице после нагрузки",
+    "Повышенное давление по утрам",
+    "Кашель в течение двух недель",
+    "Плановый осмотр",
+)
+_CONDITIONS = (
+    "Состояние удовлетворительное",
+    "Состояние средней тяжести",
+    "Давление 140/90, пульс 80",
+    "Температура 37.5, хрипов нет",
+)
+_CONCLUSIONS = (
+    "Назначено лечение, повторный приём через две недели",
+    "Направлен на анализы крови и мочи",
+    "Здоров, рекомендаций нет",
+    "Направлен к узкому специалисту",
+)
+
+
+def _grid(anchor: date, history_days: int, future_days: int) -> list[datetime]:
+    """Все возможные начала приёмов по часам работы из конфига"""
+    conf = get_config()
+    slot = timedelta(minutes=conf.slot_minutes)
+    starts = []
+    day = anchor - timedelta(days=history_days)
+    while day < anchor + timedelta(days=future_days):
+        if day.weekday() in conf.working_weekdays:
+            start = datetime.combine(day, conf.work_day_start)
+            while start + slot <= datetime.combine(day, conf.work_day_end):
+                starts.append(start)
+                start += slot
+        day += timedelta(days=1)
+    return starts
+
+
+async def generate_dataset(
+    doctors: int,
+    patients: int,
+    appointments: int,
+    seed: int = 1,
+    anchor: date | None = None,
+    history_days: int = 730,
+    future_days: int = 30,
+) -> int:
+    """
+    Заполняет пустую базу текущего конфига. Логины doctor_N и patient_N, пароль BENCH_PASSWORD.
+    Возвращает число созданных приёмов: оно меньше запрошенного, если у врачей не хватает рабочего времени
+    """
+    rnd = random.Random(seed)
+    anchor = anchor or date.today()
+    conf = get_config()
+    doctor_ids, _, _ = await seed_people(doctors, patients)
+
+    grid = _grid(anchor, history_days, future_days)
+    grid_ts = [to_epoch(start) for start in grid]
+    slot = timedelta(minutes=conf.slot_minutes)
+    now = datetime.combine(anchor, datetime.min.time())
+
+    table = Appointment.__table__
+    created = 0
+    async with get_db() as db:
+        await db.execute(
+            insert(DoctorSchedule.__table__),
+            [
+                {
+                    "doctor_id": doctor_id,
+                    "weekday": weekday,
+                    "start_time": conf.work_day_start,
+                    "end_time": conf.work_day_end,
+                    "slot_minutes": conf.slot_minutes,
+                }
+                for doctor_id in doctor_ids
+                for weekday in conf.working_weekdays
+            ],
+        )
+        await db.commit()
+
+        batch = []
+        for number, doctor_id in enumerate(doctor_ids):
+            count = appointments // doctors + (1 if number < appointments % doctors else 0)
+            for index in sorted(rnd.sample(range(len(grid)), min(count, len(grid)))):
+                start = grid[index]
+                row = {
+                    "doctor_id": doctor_id,
+                    "patient_id": rnd.randrange(1, patients + 1),
+                    "datetime": start,
+                    "end_datetime": start + slot,
+                    "start_ts": grid_ts[index],
+                    "end_ts": grid_ts[index] + conf.slot_minutes * 60,
+                    "status": AppointmentStatus.SCHEDULED,
+                    "complaint": rnd.choice(_COMPLAINTS),
+                    "condition": None,
+                    "conclusion": None,
+                }
+                if start < now:
+                    if rnd.random() < 0.15:
+                        row["status"] = AppointmentStatus.CANCELLED
+                    else:
+                        row["status"] = AppointmentStatus.COMPLETED
+                        row["condition"] = rnd.choice(_CONDITIONS)
+                        row["conclusion"] = rnd.choice(_CONCLUSIONS)
+                batch.append(row)
+
+            if len(batch) >= _CHUNK or number == len(doctor_ids) - 1:
+                if batch:
+                    await db.execute(insert(table), batch)
+                    await db.commit()
+                    created += len(batch)
+                    batch = []
+    return created
+
+
+async def _run(args: argparse.Namespace):
+    if args.output.exists():
+        raise SystemExit(f"{args.output} уже существует")
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+
+    make_config(args.output)
+    started = timer.perf_counter()
+    created = await generate_dataset(args.doctors, args.patients, args.appointments, args.seed, args.anchor)
+    # при закрытии последнего соединения SQLite переносит WAL в основной файл, и его можно копировать
+    await dispose_engines()
+    size = args.output.stat().st_size / 2**20
+    print(
+        f"врачей: {args.doctors}, пациентов: {args.patients}, приёмов: {created}, "
+        f"{size:.0f} МБ за {timer.perf_counter() - started:.1f} с"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", type=Path, required=True)
+    parser.add_argument("--doctors", type=int, default=5_000)
+    parser.add_argument("--patients", type=int, default=200_000)
+    parser.add_argument("--appointments", type=int, default=5_000_000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--anchor", type=date.fromisoformat, help="«сегодня» для базы, по умолчанию текущая дата")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Первый показ списка врачей: загрузка из базы на только что открытом соединении против чтения снимка с диска.
+
+    python -m benchmarks.directory_snapshot --doctors 2000 --repeat 20
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import make_config, percentile, seed_people
+from src.service.database.actions import create_doctor, get_doctors
+from src.service.database.core.database import dispose_engines
+from src.service.directory_snapshot import diff_doctors, load_doctor_snapshot, revalidate_doctors, snapshot_path
+
+
+async def _run(args: argparse.Namespace, tmp: Path) -> tuple[dict, list[str]]:
+    make_config(tmp / "directory.sqlite3", directory_snapshot_path=tmp / "doctors_snapshot.json")
+    await seed_people(args.doctors, 1)
+    await dispose_engines()
+
+    cold, revalidate, snapshot = [], [], []
+    for _ in range(args.repeat):
+        # как при входе в приложение: движки и соединения создаются заново
+        started = time.perf_counter()
+        await get_doctors()
+        cold.append(time.perf_counter() - started)
+        await dispose_engines()
+
+        started = time.perf_counter()
+        doctors = await revalidate_doctors()
+        revalidate.append(time.perf_counter() - started)
+        await dispose_engines()
+
+        started = time.perf_counter()
+        cached = load_doctor_snapshot()
+        snapshot.append(time.perf_counter() - started)
+
+    failures = []
+    if cached != doctors:
+        failures.append("снимок отличается от списка из базы")
+
+    await create_doctor("doctor_new", "pass", "Аааа Новый", "Терапевт")
+    fresh = await revalidate_doctors()
+    diff = diff_doctors(cached, fresh)
+    if [d.fio for d in diff.added] != ["Аааа Новый"] or diff.removed or diff.changed:
+        failures.append(f"разница со снимком определена неверно: {diff}")
+    if load_doctor_snapshot() != fresh:
+        failures.append("снимок не обновился после загрузки")
+
+    path = snapshot_path()
+    sizes = {
+        "snapshot": path.stat().st_size,
+        "verbose": len(json.dumps([{"id": d.id, "fio": d.fio, "specialization": d.specialization} for d in fresh], ensure_ascii=False, indent=2).encode()),
+    }
+    path.write_text("{повреждён", encoding="utf-8")
+    if load_doctor_snapshot() is not None:
+        failures.append("повреждённый снимок не отброшен")
+
+    await dispose_engines()
+    return {"cold": cold, "revalidate": revalidate, "snapshot": snapshot, "sizes": sizes}, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--doctors", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results, failures = asyncio.run(_run(args, Path(tmp)))
+
+    print(f"врачей: {args.doctors}, повторов: {args.repeat}")
+    for key, label in (
+        ("cold", "get_doctors на новом соединении"),
+        ("revalidate", "то же с сохранением снимка"),
+        ("snapshot", "чтение снимка"),
+    ):
+        samples = results[key]
+        print(f"{label:<34} p50: {percentile(samples, 50) * 1000:7.2f} мс  p95: {percentile(samples, 95) * 1000:7.2f} мс")
+    sizes = results["sizes"]
+    print(f"размер снимка: {sizes['snapshot'] / 1024:.1f} КБ (JSON с именами полей: {sizes['verbose'] / 1024:.1f} КБ)")
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    print("проверки пройдены" if not failures else f"проверок не пройдено: {len(failures)}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
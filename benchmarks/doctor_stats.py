@@ -0,0 +1,154 @@
+"""
+Статистика приёмов врачей за период: GROUP BY по таблице приёмов против чтения сводки DoctorDailyStats.
+Проверяет, что сводка, обновлённая записями и сменами статуса, совпадает с полным пересчётом.
+
+    python -m benchmarks.doctor_stats --rows 200000 --doctors 50 --repeat 20
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import case, func, select
+
+from benchmarks.common import BENCH_PASSWORD, fill_appointments, make_config, percentile, seed_people
+from src.service.database.actions import (
+    create_appointment,
+    get_doctor_appointments,
+    get_doctor_daily_stats,
+    get_doctor_stats_totals,
+    login_user,
+    rebuild_doctor_stats,
+    update_appointment_by_doctor,
+    update_appointments_status,
+)
+from src.service.database.core.database import dispose_engines, get_read_db
+from src.service.database.models import Appointment, AppointmentStatus, Doctor, DoctorDailyStats
+from src.service.utils.epoch import to_epoch
+
+
+async def _aggregate_on_demand(date_from: date, date_to: date) -> list[tuple]:
+    """Тот же результат, что get_doctor_stats_totals, но проходом по приёмам периода"""
+    first = to_epoch(datetime.combine(date_from, datetime.min.time()))
+    last = to_epoch(datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    async with get_read_db() as db:
+        result = await db.execute(
+            select(
+                Doctor.id,
+                func.count(Appointment.id),
+                func.coalesce(func.sum(case((Appointment.status == AppointmentStatus.COMPLETED, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((Appointment.status == AppointmentStatus.CANCELLED, 1), else_=0)), 0),
+            )
+            .outerjoin(
+                Appointment,
+                (Appointment.doctor_id == Doctor.id) & (Appointment.start_ts >= first) & (Appointment.start_ts < last),
+            )
+            .group_by(Doctor.id, Doctor.fio)
+            .order_by(Doctor.fio)
+        )
+        return [tuple(row) for row in result.all()]
+
+
+async def _stats_table() -> list[tuple]:
+    async with get_read_db() as db:
+        result = await db.execute(
+            select(
+                DoctorDailyStats.doctor_id,
+                DoctorDailyStats.day,
+                DoctorDailyStats.booked,
+                DoctorDailyStats.completed,
+                DoctorDailyStats.cancelled,
+            )
+            .where(DoctorDailyStats.booked > 0)
+            .order_by(DoctorDailyStats.doctor_id, DoctorDailyStats.day)
+        )
+        return [tuple(row) for row in result.all()]
+
+
+async def _timed(repeat: int, make) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await make()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _run(args: argparse.Namespace, tmp: Path) -> tuple[dict, list[str]]:
+    make_config(tmp / "stats.sqlite3")
+    doctor_ids, doctor_logins, patient_logins = await seed_people(args.doctors, args.patients)
+    await fill_appointments(args.rows, doctor_ids, args.patients)
+
+    started = time.perf_counter()
+    await rebuild_doctor_stats()
+    rebuild = time.perf_counter() - started
+
+    date_from, date_to = date(2025, 1, 1), date(2025, 12, 31)
+    timings = {
+        "on_demand": await _timed(args.repeat, lambda: _aggregate_on_demand(date_from, date_to)),
+        "summary": await _timed(args.repeat, lambda: get_doctor_stats_totals(date_from, date_to)),
+    }
+
+    failures = []
+    totals = await get_doctor_stats_totals(date_from, date_to)
+    expected = await _aggregate_on_demand(date_from, date_to)
+    if [(t.doctor_id, t.booked, t.completed, t.cancelled) for t in totals] != expected:
+        failures.append("сводка за период расходится с подсчётом по приёмам")
+
+    # записи, отмены и завершения через действия обновляют сводку сами
+    doctor = await login_user(doctor_logins[0], BENCH_PASSWORD)
+    patients = [await login_user(login, BENCH_PASSWORD) for login in patient_logins[:5]]
+    start = datetime(2030, 3, 1, 9)
+    for slot in range(args.bookings):
+        await create_appointment(patients[slot % len(patients)], doctor_ids[0], start + timedelta(minutes=30 * slot))
+    booked = [a.id for a in await get_doctor_appointments(doctor) if a.dt >= start]
+    await update_appointments_status(doctor, booked[: args.bookings // 3], AppointmentStatus.CANCELLED)
+    await update_appointments_status(doctor, booked[args.bookings // 3:], AppointmentStatus.COMPLETED)
+    # повторная смена на тот же статус ничего не меняет в сводке
+    await update_appointments_status(doctor, booked[args.bookings // 3:], AppointmentStatus.COMPLETED)
+    await update_appointment_by_doctor(doctor, booked[0], "", "", "", AppointmentStatus.SCHEDULED)
+
+    incremental = await _stats_table()
+    days = await get_doctor_daily_stats(doctor_ids[0], start.date(), start.date() + timedelta(days=30))
+    if sum(day.booked for day in days) != len(booked):
+        failures.append(f"по дням записано {sum(day.booked for day in days)} приёмов вместо {len(booked)}")
+    if sum(day.cancelled for day in days) != args.bookings // 3 - 1:
+        failures.append("отмены не попали в сводку")
+
+    await rebuild_doctor_stats()
+    if incremental != await _stats_table():
+        failures.append("сводка после изменений расходится с полным пересчётом")
+
+    await dispose_engines()
+    return {"rebuild": rebuild, **timings}, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--bookings", type=int, default=30, help="записей через действия для проверки сводки")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results, failures = asyncio.run(_run(args, Path(tmp)))
+
+    print(f"приёмов: {args.rows}, врачей: {args.doctors}, период: 2025 год")
+    print(f"пересчёт сводки: {results['rebuild'] * 1000:.0f} мс")
+    for key, label in (("on_demand", "GROUP BY по приёмам"), ("summary", "чтение сводки")):
+        samples = results[key]
+        print(f"{label:<22} p50: {percentile(samples, 50) * 1000:8.2f} мс  p95: {percentile(samples, 95) * 1000:8.2f} мс")
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    print("проверки пройдены" if not failures else f"проверок не пройдено: {len(failures)}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
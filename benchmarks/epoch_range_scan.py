@@ -0,0 +1,108 @@
+"""
+Сравнение диапазонных запросов по текстовой колонке datetime и по целочисленной start_ts.
+
+    python -m benchmarks.epoch_range_scan --rows 1000000
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import Index, select, text
+
+from benchmarks.common import fill_appointments, make_config, seed_people
+from src.service.database.core.database import dispose_engines, get_db, get_read_db
+from src.service.database.models import Appointment
+from src.service.utils.epoch import from_epoch, to_epoch
+
+
+async def _fill(rows: int, doctor_ids: list[int], patients: int):
+    await fill_appointments(rows, doctor_ids, patients)
+    # индекс по текстовой колонке только для честного сравнения
+    table = Appointment.__table__
+    async with get_db() as db:
+        await db.run_sync(lambda session: Index("ix_bench_datetime", table.c.datetime).create(session.connection()))
+        await db.commit()
+
+
+async def _measure(label: str, query, convert=None, repeat: int = 5) -> float:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        async with get_read_db() as db:
+            rows = (await db.execute(query)).all()
+            if convert is not None:
+                rows = [convert(row) for row in rows]
+        best = min(best, time.perf_counter() - started)
+        count = len(rows)
+    print(f"{label:<48} {count:>9} строк  {best * 1000:>9.1f} мс  {count / best:>12,.0f} строк/с")
+    return best
+
+
+async def _run(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        make_config(Path(tmp) / "epoch.sqlite3")
+        doctor_ids, _, _ = await seed_people(args.doctors, 100)
+        started = time.perf_counter()
+        await _fill(args.rows, doctor_ids, 100)
+        print(f"заполнено {args.rows} записей за {time.perf_counter() - started:.1f} с\n")
+
+        window_start = datetime(2025, 6, 1)
+        for days in (7, 90):
+            window_end = window_start + timedelta(days=days)
+            print(f"окно {days} дней, все врачи:")
+            await _measure(
+                "  datetime (текст, парсинг в datetime)",
+                select(Appointment.id, Appointment.datetime).where(
+                    Appointment.datetime >= window_start, Appointment.datetime < window_end
+                ),
+            )
+            await _measure(
+                "  start_ts (целое, без преобразования)",
+                select(Appointment.id, Appointment.start_ts).where(
+                    Appointment.start_ts >= to_epoch(window_start), Appointment.start_ts < to_epoch(window_end)
+                ),
+            )
+            await _measure(
+                "  start_ts (целое, from_epoch в Python)",
+                select(Appointment.id, Appointment.start_ts).where(
+                    Appointment.start_ts >= to_epoch(window_start), Appointment.start_ts < to_epoch(window_end)
+                ),
+                convert=lambda row: (row[0], from_epoch(row[1])),
+            )
+
+        doctor_id = doctor_ids[0]
+        print("\nвсе записи одного врача по порядку:")
+        await _measure(
+            "  ORDER BY datetime",
+            select(Appointment.id, Appointment.datetime)
+            .where(Appointment.doctor_id == doctor_id)
+            .order_by(Appointment.datetime),
+        )
+        await _measure(
+            "  ORDER BY start_ts (индекс doctor_id, start_ts)",
+            select(Appointment.id, Appointment.start_ts)
+            .where(Appointment.doctor_id == doctor_id)
+            .order_by(Appointment.start_ts),
+        )
+
+        async with get_read_db() as db:
+            plan = (await db.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM Appointment WHERE start_ts >= 0 AND start_ts < 1"
+            ))).all()
+        print(f"\nплан запроса по start_ts: {plan[0][-1]}")
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--doctors", type=int, default=200)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Пропускная способность выгрузки приёмов и пиковая память при росте объёма.
+Для сравнения - выгрузка через загрузку всех сущностей и Base.to_dict.
+
+    python -m benchmarks.export_appointments --rows 500000
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select, update
+
+from benchmarks.common import fill_appointments, make_config, seed_people
+from src.service.database.actions import export_appointments
+from src.service.database.core.database import dispose_engines, get_db, get_read_db
+from src.service.database.models import Appointment
+
+# записи заполняются равномерно за 2025-2026 годы: окна дают примерно четверть, половину и весь объём
+_WINDOWS = (
+    ("полгода", datetime(2025, 1, 1), datetime(2025, 7, 1)),
+    ("год", datetime(2025, 1, 1), datetime(2026, 1, 1)),
+    ("два года", None, None),
+)
+
+
+async def _add_notes():
+    async with get_db() as db:
+        await db.execute(
+            update(Appointment).values(
+                complaint="Жалобы на головную боль и слабость в течение недели",
+                condition="Состояние удовлетворительное, давление 130/85",
+                conclusion="Назначено обследование, повторный приём через две недели",
+            )
+        )
+        await db.commit()
+
+
+async def _naive_export(destination: Path, date_from, date_to) -> int:
+    """Как было бы без курсора: все сущности в памяти, to_dict на каждую"""
+    query = select(Appointment)
+    if date_from is not None:
+        query = query.where(Appointment.datetime >= date_from, Appointment.datetime < date_to)
+    async with get_read_db() as db:
+        appointments = (await db.execute(query)).scalars().all()
+        with destination.open("w", encoding="utf-8") as file:
+            for appointment in appointments:
+                file.write(json.dumps(appointment.to_dict(), ensure_ascii=False, default=str) + "\n")
+    return len(appointments)
+
+
+async def _measure(label: str, export) -> None:
+    started = time.perf_counter()
+    written = await export()
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    await export()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"  {label:<22} {written:>9} строк  {elapsed:>7.2f} с  {written / elapsed:>10,.0f} строк/с  пик {peak / 2**20:>7.1f} МБ")
+
+
+async def _run(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        make_config(tmp / "export.sqlite3", export_chunk_size=args.chunk)
+        doctor_ids, _, _ = await seed_people(args.doctors, args.patients)
+        await fill_appointments(args.rows, doctor_ids, args.patients)
+        await _add_notes()
+        print(f"приёмов: {args.rows}, пачка курсора: {args.chunk}\n")
+
+        for title, date_from, date_to in _WINDOWS:
+            print(f"окно: {title}")
+            for fmt in ("csv", "jsonl"):
+                output = tmp / f"out.{fmt}"
+                await _measure(
+                    fmt,
+                    lambda: export_appointments(output, fmt=fmt, date_from=date_from, date_to=date_to),
+                )
+            if args.naive:
+                await _measure("jsonl через to_dict", lambda: _naive_export(tmp / "naive.jsonl", date_from, date_to))
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--patients", type=int, default=5_000)
+    parser.add_argument("--chunk", type=int, default=5_000)
+    parser.add_argument("--no-naive", dest="naive", action="store_false", help="без сравнения с to_dict")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Бенчмарк нарезки слотов: год вперёд для 500 врачей с недельными шаблонами.
+
+    python -m benchmarks.materialize_slots --doctors 500 --weeks 52
+"""
+import argparse
+import asyncio
+import tempfile
+import time as timer
+from datetime import date, time
+from pathlib import Path
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.common import make_config, seed_people
+from src.service.database.actions import materialize_slots
+from src.service.database.core.database import dispose_engines, get_db, get_read_db
+from src.service.database.models import DoctorSchedule, Slot
+
+
+async def _run(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        make_config(Path(tmp) / "slots.sqlite3")
+        doctor_ids, _, _ = await seed_people(args.doctors, 1)
+
+        async with get_db() as db:
+            await db.execute(
+                insert(DoctorSchedule),
+                [
+                    {
+                        "doctor_id": doctor_id,
+                        "weekday": weekday,
+                        "start_time": time(8 + doctor_id % 3, 0),
+                        "end_time": time(17 + doctor_id % 3, 0),
+                        "slot_minutes": (15, 20, 30)[doctor_id % 3],
+                    }
+                    for doctor_id in doctor_ids
+                    for weekday in range(5)
+                ],
+            )
+            await db.commit()
+
+        started = timer.perf_counter()
+        created = await materialize_slots(args.weeks, date_from=date.today(), batch_doctors=args.batch)
+        elapsed = timer.perf_counter() - started
+
+        started = timer.perf_counter()
+        repeated = await materialize_slots(args.weeks, date_from=date.today(), batch_doctors=args.batch)
+        repeat_elapsed = timer.perf_counter() - started
+
+        async with get_read_db() as db:
+            total = (await db.execute(select(func.count(Slot.id)))).scalar_one()
+        await dispose_engines()
+
+    print(f"врачей: {args.doctors}, недель: {args.weeks}, слотов в базе: {total}")
+    print(f"нарезка: {created} слотов за {elapsed:.2f} с ({created / elapsed:,.0f} строк/с)")
+    print(f"повторный запуск: {repeated} новых слотов за {repeat_elapsed:.2f} с")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--doctors", type=int, default=500)
+    parser.add_argument("--weeks", type=int, default=52)
+    parser.add_argument("--batch", type=int, default=50, help="врачей в одной транзакции")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Закрытие прошедших приёмов, которые врач не отметил: скорость перевода пачками, план запроса пачки
+и задержка записи пациента во время закрытия. Проверяет, что будущие приёмы не тронуты,
+а сводка статистики и журнал изменений обновлены вместе со статусами.
+
+    python -m benchmarks.past_due_sweep --rows 200000 --doctors 5 --batch 2000
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import func, select, text, update
+
+from benchmarks.common import BENCH_PASSWORD, fill_appointments, make_config, percentile, seed_people
+from src.service.database.actions import (
+    close_past_due_appointments,
+    create_appointment,
+    get_appointment_changes,
+    get_change_seq,
+    get_doctor_appointments,
+    login_user,
+    rebuild_doctor_stats,
+)
+from src.service.database.core.database import dispose_engines, get_db, get_read_db
+from src.service.database.models import Appointment, AppointmentStatus, DoctorDailyStats
+from src.service.maintenance import run_maintenance
+from src.service.utils.epoch import to_epoch
+
+
+async def _scheduled(where) -> int:
+    async with get_read_db() as db:
+        query = select(func.count()).select_from(Appointment).where(Appointment.status == AppointmentStatus.SCHEDULED)
+        return (await db.execute(query.where(where))).scalar_one()
+
+
+async def _batch_plan(cutoff_ts: int) -> str:
+    """План выборки пачки, как в close_past_due_appointments"""
+    query = (
+        select(Appointment.id, Appointment.doctor_id, Appointment.start_ts)
+        .where(Appointment.start_ts < cutoff_ts, Appointment.status == AppointmentStatus.SCHEDULED)
+        .order_by(Appointment.start_ts)
+        .limit(100)
+    )
+    async with get_read_db() as db:
+        sql = str(query.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True}))
+        rows = (await db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+    return " | ".join(str(row[-1]) for row in rows)
+
+
+async def _stats_table() -> list[tuple]:
+    async with get_read_db() as db:
+        result = await db.execute(select(DoctorDailyStats).order_by(DoctorDailyStats.doctor_id, DoctorDailyStats.day))
+        return [(row.doctor_id, row.day, row.booked, row.completed, row.cancelled) for row in result.scalars()]
+
+
+async def _book_while(task: asyncio.Task, patient, doctor_id: int) -> list[float]:
+    samples = []
+    start = datetime(2027, 3, 1, 9, 0)
+    while not task.done():
+        started = time.perf_counter()
+        await create_appointment(patient, doctor_id, start + timedelta(minutes=30 * len(samples)))
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _run(args: argparse.Namespace, tmp: Path) -> tuple[dict, dict, list[str]]:
+    make_config(tmp / "past_due.sqlite3", past_due_batch_size=args.batch, archive_after_days=0)
+    doctor_ids, doctor_logins, patient_logins = await seed_people(args.doctors, args.patients)
+    await fill_appointments(args.rows, doctor_ids, args.patients)
+    async with get_db() as db:
+        # каждый третий приём врач так и не отметил
+        await db.execute(update(Appointment).where(Appointment.id % 3 == 0).values(status=AppointmentStatus.SCHEDULED))
+        await db.commit()
+    await rebuild_doctor_stats()
+    doctor = await login_user(doctor_logins[0], BENCH_PASSWORD)
+    patient = await login_user(patient_logins[0], BENCH_PASSWORD)
+
+    before = datetime.now() - timedelta(hours=24)
+    cutoff_ts = to_epoch(before)
+    future = await _scheduled(Appointment.start_ts >= cutoff_ts)
+    past = await _scheduled(Appointment.start_ts < cutoff_ts)
+    own = [item for item in await get_doctor_appointments(doctor) if item.status == AppointmentStatus.SCHEDULED]
+    own_past = {item.id for item in own if item.dt < before}
+    plan = await _batch_plan(cutoff_ts)
+    seq = await get_change_seq()
+
+    started = time.perf_counter()
+    closing = asyncio.create_task(close_past_due_appointments(before))
+    booking = await _book_while(closing, patient, doctor_ids[0])
+    closed = await closing
+    elapsed = time.perf_counter() - started
+    listed_after = sum(item.status == AppointmentStatus.SCHEDULED for item in await get_doctor_appointments(doctor))
+
+    failures = []
+    if "ix_appointment_status_start_ts" not in plan:
+        failures.append(f"пачка выбирается не по индексу (status, start_ts): {plan}")
+    if closed != past:
+        failures.append(f"закрыто {closed} приёмов, прошедших запланированных было {past}")
+    if await _scheduled(Appointment.start_ts < cutoff_ts):
+        failures.append("остались прошедшие запланированные приёмы")
+    if await _scheduled(Appointment.start_ts >= cutoff_ts) != future + len(booking):
+        failures.append("закрытие затронуло будущие приёмы")
+
+    delta = await get_appointment_changes(doctor, seq)
+    closed_ids = {item.id for item in delta.changed if item.status == AppointmentStatus.NO_SHOW}
+    if not delta.reset and not own_past <= closed_ids:
+        failures.append("журнал изменений не сообщил о закрытых приёмах")
+
+    incremental = await _stats_table()
+    await rebuild_doctor_stats()
+    if incremental != await _stats_table():
+        failures.append("сводка статистики после закрытия расходится с полным пересчётом")
+
+    totals = await run_maintenance()
+    if totals.get("закрытие прошедших приёмов"):
+        failures.append("повторный проход обслуживания снова нашёл прошедшие приёмы")
+
+    await dispose_engines()
+    counts = {"closed": closed, "elapsed": elapsed, "listed_before": len(own), "listed_after": listed_after}
+    return {"booking": booking}, {**counts, "plan": plan}, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="приёмов за два года")
+    parser.add_argument("--doctors", type=int, default=5)
+    parser.add_argument("--patients", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=2_000, help="past_due_batch_size")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        timings, counts, failures = asyncio.run(_run(args, Path(tmp)))
+
+    print(f"приёмов: {args.rows}, закрыто прошедших: {counts['closed']}")
+    print(f"закрытие: {counts['elapsed']:.2f} с, {counts['closed'] / counts['elapsed']:.0f} приёмов/с")
+    print(f"план пачки: {counts['plan']}")
+    print(f"«Будущие приёмы» врача: {counts['listed_before']} -> {counts['listed_after']}")
+    samples = timings["booking"]
+    print(
+        f"{'запись во время закрытия':<30} p50: {percentile(samples, 50) * 1000:8.2f} мс"
+        f"  p95: {percentile(samples, 95) * 1000:8.2f} мс  ({len(samples)})"
+    )
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    print("проверки пройдены" if not failures else f"проверок не пройдено: {len(failures)}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Режим remote на loopback: задержка вызова действия через HTTP по сравнению с прямым вызовом,
+выигрыш от удержания соединения и пропускная способность при нескольких терминалах.
+Заодно проверяется, что результаты и ошибки через сервер совпадают с локальными.
+
+    python -m benchmarks.remote_loopback --calls 300 --clients 8
+"""
+import argparse
+import asyncio
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.common import BENCH_PASSWORD, make_config, percentile, seed_people
+from src.service.database import actions
+from src.service.database.core.database import dispose_engines
+from src.service.exeptions import ServiceError
+from src.service.remote.client import RemoteClient
+from src.service.remote.server import ActionServer
+from src.service.utils.event_loop import start_loop
+
+
+async def _setup(db_path: Path, doctors: int, patients: int):
+    make_config(db_path)
+    await seed_people(doctors, patients)
+
+
+async def _time_local(calls: int) -> list[float]:
+    samples = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        await actions.get_doctors()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _time_remote(url: str, calls: int, keep_alive: bool) -> list[float]:
+    client = RemoteClient(url, timeout=10)
+    samples = []
+    for _ in range(calls):
+        if not keep_alive:
+            # новый клиент - новая requests.Session и новое TCP-соединение
+            client.close()
+            client = RemoteClient(url, timeout=10)
+        started = time.perf_counter()
+        await client.call("get_doctors")
+        samples.append(time.perf_counter() - started)
+    client.close()
+    return samples
+
+
+async def _throughput(url: str, calls: int, clients: int) -> float:
+    client = RemoteClient(url, timeout=10)
+
+    async def terminal():
+        for _ in range(calls // clients):
+            await client.call("get_doctors")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(terminal() for _ in range(clients)))
+    return (calls // clients * clients) / (time.perf_counter() - started)
+
+
+async def _check(url: str, server_loop: asyncio.AbstractEventLoop) -> list[str]:
+    failures = []
+    local_doctors = asyncio.run_coroutine_threadsafe(actions.get_doctors(), server_loop).result()
+    client = RemoteClient(url, timeout=10)
+    if await client.call("get_doctors") != local_doctors:
+        failures.append("get_doctors через сервер отличается от локального")
+
+    patient = await client.call("login_user", "patient_0", BENCH_PASSWORD)
+    if not patient.token or patient.patient_id is None:
+        failures.append("сервер не выдал сессию пациента")
+
+    dt = (datetime.now() + timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+    await client.call("create_appointment", patient, local_doctors[0].id, dt)
+    try:
+        await client.call("create_appointment", patient, local_doctors[0].id, dt)
+        failures.append("повторная запись на то же время прошла")
+    except ServiceError:
+        pass
+
+    appointments = await client.call("get_patient_appointments", patient)
+    if len(appointments) != 1 or appointments[0].dt != dt:
+        failures.append("запись пациента не видна через сервер")
+
+    try:
+        await client.call("create_doctor", "intruder", "pass", "Посторонний", "Терапевт")
+        failures.append("действие администратора выполнено с сессией пациента")
+    except ServiceError:
+        pass
+
+    forged = actions.SessionContext(user_id=patient.user_id, role=patient.role, login=patient.login, token="forged")
+    try:
+        await client.call("get_patient_appointments", forged)
+        failures.append("сервер принял поддельный токен")
+    except ServiceError:
+        pass
+
+    await client.call("end_session", patient)
+    try:
+        await client.call("get_patient_appointments", patient)
+        failures.append("сессия работает после выхода")
+    except ServiceError:
+        pass
+    client.close()
+    return failures
+
+
+def _report(name: str, samples: list[float]):
+    print(
+        f"{name:<28} p50: {percentile(samples, 50) * 1000:7.2f} мс  p95: {percentile(samples, 95) * 1000:7.2f} мс"
+        f"  {len(samples) / sum(samples):8.0f} выз/с"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--clients", type=int, default=8, help="одновременных терминалов в замере пропускной способности")
+    parser.add_argument("--doctors", type=int, default=50)
+    parser.add_argument("--patients", type=int, default=10)
+    args = parser.parse_args()
+
+    server_loop = asyncio.new_event_loop()
+    threading.Thread(target=start_loop, args=(server_loop,), daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "remote.sqlite3"
+        asyncio.run_coroutine_threadsafe(_setup(db_path, args.doctors, args.patients), server_loop).result()
+
+        server = ActionServer(("127.0.0.1", 0), server_loop)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        try:
+            local = asyncio.run_coroutine_threadsafe(_time_local(args.calls), server_loop).result()
+            keep_alive = asyncio.run(_time_remote(url, args.calls, keep_alive=True))
+            reconnect = asyncio.run(_time_remote(url, args.calls, keep_alive=False))
+            throughput = asyncio.run(_throughput(url, args.calls, args.clients))
+            failures = asyncio.run(_check(url, server_loop))
+        finally:
+            server.shutdown()
+            server.server_close()
+            asyncio.run_coroutine_threadsafe(dispose_engines(), server_loop).result()
+            server_loop.call_soon_threadsafe(server_loop.stop)
+
+    print(f"get_doctors, врачей: {args.doctors}, вызовов: {args.calls}")
+    _report("локально", local)
+    _report("сервер, одно соединение", keep_alive)
+    _report("сервер, соединение на вызов", reconnect)
+    print(f"сервер, {args.clients} терминалов: {throughput:.0f} выз/с")
+
+    for failure in failures:
+        print(f"ОШИБКА: {failure}")
+    print("проверки пройдены" if not failures else f"проверок не пройдено: {len(failures)}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Память под список приёмов: обычный dataclass, слотовый AppointmentSummary и столбцы AppointmentColumns.
+
+    python -m benchmarks.view_memory --rows 200000
+"""
+import argparse
+import asyncio
+import gc
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+from sqlalchemy import select
+
+from benchmarks.common import fill_appointments, make_config, seed_people
+from src.service.database.actions import AppointmentSummary, fetch_appointment_columns
+from src.service.database.core.database import dispose_engines, get_read_db
+from src.service.database.models import Appointment, AppointmentStatus, Doctor, Patient
+
+
+@dataclass
+class _PlainSummary:
+    """Прежний вид: обычный dataclass со своим __dict__ у каждого объекта"""
+    id: int
+    doctor_fio: str
+    patient_fio: str
+    dt: datetime
+    status: AppointmentStatus
+
+
+_SUMMARY_QUERY = (
+    select(Appointment.id, Doctor.fio, Patient.fio, Appointment.datetime, Appointment.status)
+    .join(Doctor, Doctor.id == Appointment.doctor_id)
+    .join(Patient, Patient.id == Appointment.patient_id)
+    .order_by(Appointment.start_ts.asc())
+)
+
+
+async def _objects(view_type):
+    async with get_read_db() as db:
+        rows = (await db.execute(_SUMMARY_QUERY)).all()
+    return [view_type(*row) for row in rows]
+
+
+async def _measure(label: str, load, rows: int):
+    """Сколько памяти остаётся занято результатом и каков пик во время загрузки"""
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = await load()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(result) == rows
+    print(
+        f"{label:<34} занято {retained / 2**20:>8.1f} МБ ({retained / rows:>6.0f} Б/строку)"
+        f"  пик {peak / 2**20:>8.1f} МБ  {elapsed:>6.2f} с"
+    )
+    del result
+
+
+async def _run(args: argparse.Namespace):
+    with tempfile.TemporaryDirectory() as tmp:
+        make_config(Path(tmp) / "memory.sqlite3")
+        doctor_ids, _, _ = await seed_people(args.doctors, args.patients)
+        await fill_appointments(args.rows, doctor_ids, args.patients)
+        print(f"приёмов: {args.rows}, врачей: {args.doctors}, пациентов: {args.patients}\n")
+
+        await _measure("dataclass с __dict__", lambda: _objects(_PlainSummary), args.rows)
+        await _measure("AppointmentSummary (slots)", lambda: _objects(AppointmentSummary), args.rows)
+        await _measure("AppointmentColumns", fetch_appointment_columns, args.rows)
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--patients", type=int, default=5_000)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,50 @@
 import asyncio
+import json
+import os
+import tomllib
+from pathlib import Path
 
 from src.service.models.conf_model import Config
 
+ENV_PREFIX = "POLYCLINIC_"
+CONFIG_FILE_ENV = "POLYCLINIC_CONFIG"
+
 _config: Config = None
 
 
+def load_settings(path: Path | None = None) -> dict:
+    """
+    Настройки поверх значений по умолчанию: из TOML-файла (CONFIG_FILE_ENV или config.toml в корне проекта)
+    и из переменных окружения POLYCLINIC_<ПОЛЕ>, например POLYCLINIC_DATABASE_URL. Окружение важнее файла
+    """
+    fields = set(Config.model_fields) - {"global_event_loop"}
+    settings = {}
+
+    env_path = os.environ.get(CONFIG_FILE_ENV)
+    path = path or (Path(env_path) if env_path else Config.model_fields["base"].default / "config.toml")
+    if path.exists():
+        with open(path, "rb") as f:
+            settings = tomllib.load(f)
+        unknown = set(settings) - fields
+        if unknown:
+            raise ValueError(f"Неизвестные настройки в {path}: {', '.join(sorted(unknown))}")
+
+    for name in fields:
+        raw = os.environ.get(ENV_PREFIX + name.upper())
+        if raw is None:
+            continue
+        # списки и словари задаются в JSON, остальное приводит к нужному типу сама модель
+        settings[name] = json.loads(raw) if raw.lstrip().startswith(("[", "{")) else raw
+    return settings
+
+
 def init_conf():
     global _config
     async_loop = asyncio.new_event_loop()
 
     _config = Config(
-        global_event_loop=async_loop
+        global_event_loop=async_loop,
+        **load_settings(),
     )
 
 
@@ -25,4 +59,4 @@ def get_config():
     if _config is None:
         raise RuntimeError("Config не заполнен")
 
-    return _config
\ No newline at end of file
+    return _config
@@ -1,6 +1,7 @@
 import asyncio
 
 from src.config import get_config, init_conf
+from src.service.database.core.database import dispose_engines
 from src.service.database.core.filling import filling_db
 from src.service.utils.core_logger import setup_logging
 from src.ui.main_ui import AuthApp
@@ -10,7 +11,11 @@ async def main():
     init_conf()
     setup_logging(get_config().log_file)
 
-    await filling_db()
+    # в режиме remote база находится на сервере
+    if get_config().backend_mode != "remote":
+        await filling_db()
+        # движки привязаны к текущему циклу, UI работает на global_event_loop
+        await dispose_engines()
 
     AuthApp().run()
 
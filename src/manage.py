@@ -0,0 +1,182 @@
+"""
+Служебные команды, которые запускаются без интерфейса:
+
+    python -m src.manage materialize-slots --weeks 8
+    python -m src.manage export-appointments --format jsonl --date-from 2025-01-01 --date-to 2025-12-31
+    python -m src.manage import-people --file branch.csv
+    python -m src.manage --branch 2 materialize-slots
+    python -m src.manage prune-changes --days 7
+    python -m src.manage rebuild-stats
+    python -m src.manage analytics --date-from 2025-01-01 --date-to 2025-06-30
+    python -m src.manage archive-appointments --days 365
+    python -m src.manage close-past-due --hours 24
+"""
+import argparse
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+from src.config import get_config, init_conf
+from src.service.database.core.database import dispose_engines, use_branch
+from src.service.database.core.filling import filling_db
+from src.service.utils.core_logger import get_logger, setup_logging
+
+
+async def _materialize_slots(args: argparse.Namespace):
+    from src.service.database.actions import materialize_slots
+
+    created = await materialize_slots(args.weeks)
+    get_logger("manage").info(f"Создано слотов: {created}")
+
+
+async def _export_appointments(args: argparse.Namespace):
+    from src.service.database.actions import export_appointments
+
+    output = args.output or get_config().export_dir / f"appointments.{args.format}"
+    written = await export_appointments(
+        output,
+        fmt=args.format,
+        doctor_id=args.doctor_id,
+        date_from=datetime.combine(args.date_from, time.min) if args.date_from else None,
+        # дата окончания включительно
+        date_to=datetime.combine(args.date_to + timedelta(days=1), time.min) if args.date_to else None,
+    )
+    get_logger("manage").info(f"Выгружено приёмов: {written} в {output}")
+
+
+async def _import_people(args: argparse.Namespace):
+    from src.service.database.actions import import_people_csv
+
+    logger = get_logger("manage")
+    report = await import_people_csv(args.file)
+    for error in report.errors:
+        logger.warning(f"Строка {error.line} ({error.login or '-'}): {error.message}")
+    logger.info(
+        f"Строк: {report.rows}, создано врачей: {report.doctors}, пациентов: {report.patients}, "
+        f"ошибок: {len(report.errors)}, {report.rows_per_second:.0f} строк/с"
+    )
+
+
+async def _prune_changes(args: argparse.Namespace):
+    from src.service.database.actions import prune_appointment_changes
+
+    days = args.days if args.days is not None else get_config().change_log_retention_days
+    removed = await prune_appointment_changes(datetime.now() - timedelta(days=days))
+    get_logger("manage").info(f"Удалено записей журнала изменений: {removed}")
+
+
+async def _rebuild_stats(args: argparse.Namespace):
+    from src.service.database.actions import rebuild_doctor_stats
+
+    rows = await rebuild_doctor_stats()
+    get_logger("manage").info(f"Статистика пересчитана, строк сводки: {rows}")
+
+
+async def _archive_appointments(args: argparse.Namespace):
+    from src.service.database.actions import archive_appointments
+
+    days = args.days if args.days is not None else get_config().archive_after_days
+    if days <= 0:
+        get_logger("manage").info("Архивация выключена: archive_after_days = 0")
+        return
+    moved = await archive_appointments(datetime.now() - timedelta(days=days))
+    get_logger("manage").info(f"Перенесено в архив приёмов: {moved}")
+
+
+async def _close_past_due(args: argparse.Namespace):
+    from src.service.database.actions import close_past_due_appointments
+
+    hours = args.hours if args.hours is not None else get_config().past_due_after_hours
+    closed = await close_past_due_appointments(datetime.now() - timedelta(hours=hours))
+    get_logger("manage").info(f"Закрыто прошедших приёмов: {closed}")
+
+
+async def _analytics(args: argparse.Namespace):
+    # NumPy нужен только для аналитики
+    import numpy as np
+
+    from src.service.analytics import compute_analytics
+
+    today = date.today()
+    report = await compute_analytics(args.date_from or today.replace(day=1), args.date_to or today)
+    logger = get_logger("manage")
+    utilization = np.nanmean(report.utilization, axis=0) if report.doctor_ids else np.full(len(report.months), np.nan)
+    for index, month in enumerate(report.months):
+        logger.info(
+            f"{month:%Y-%m}: приёмов {report.booked[index]}, занятость {utilization[index]:.1%}, "
+            f"отмены {report.cancellation_rate[index]:.1%}, неявки {report.no_show_rate[index]:.1%}"
+        )
+    weekdays = ("пн", "вт", "ср", "чт", "пт", "сб", "вс")
+    peaks = np.argsort(report.heatmap, axis=None)[::-1][:3]
+    logger.info(
+        "Часы пик: "
+        + ", ".join(f"{weekdays[cell // 24]} {cell % 24:02d}:00 ({report.heatmap.flat[cell]})" for cell in peaks)
+    )
+
+
+COMMANDS = {
+    "materialize-slots": _materialize_slots,
+    "export-appointments": _export_appointments,
+    "import-people": _import_people,
+    "prune-changes": _prune_changes,
+    "rebuild-stats": _rebuild_stats,
+    "analytics": _analytics,
+    "archive-appointments": _archive_appointments,
+    "close-past-due": _close_past_due,
+}
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--branch", type=int, help="id филиала из Config.branches; по умолчанию Config.branch_id")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    materialize = commands.add_parser("materialize-slots", help="нарезать слоты приёма на N недель вперёд")
+    materialize.add_argument("--weeks", type=int, default=8)
+
+    export = commands.add_parser("export-appointments", help="выгрузить приёмы в CSV или JSONL")
+    export.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    export.add_argument("--output", type=Path, help="по умолчанию media/exports/appointments.<формат>")
+    export.add_argument("--doctor-id", type=int)
+    export.add_argument("--date-from", type=date.fromisoformat)
+    export.add_argument("--date-to", type=date.fromisoformat)
+
+    people = commands.add_parser("import-people", help="создать врачей и пациентов из CSV")
+    people.add_argument("--file", type=Path, required=True, help="колонки: role, login, password, fio, specialization, phone")
+
+    prune = commands.add_parser("prune-changes", help="очистить журнал изменений приёмов")
+    prune.add_argument("--days", type=int, help="оставить изменения за N дней; по умолчанию change_log_retention_days")
+
+    commands.add_parser("rebuild-stats", help="пересчитать статистику приёмов врачей по приёмам и архиву")
+
+    analytics = commands.add_parser("analytics", help="занятость врачей, часы пик, отмены и неявки по месяцам")
+    analytics.add_argument("--date-from", type=date.fromisoformat, help="по умолчанию начало текущего месяца")
+    analytics.add_argument("--date-to", type=date.fromisoformat, help="по умолчанию сегодня")
+
+    archive = commands.add_parser("archive-appointments", help="перенести старые закрытые приёмы в архив")
+    archive.add_argument("--days", type=int, help="старше N дней; по умолчанию archive_after_days")
+
+    past_due = commands.add_parser("close-past-due", help="перевести не отмеченные врачом прошедшие приёмы в past_due_status")
+    past_due.add_argument("--hours", type=int, help="начавшиеся больше N часов назад; по умолчанию past_due_after_hours")
+
+    return parser
+
+
+async def main():
+    args = _parser().parse_args()
+
+    init_conf()
+    get_config().sql_echo = False
+    setup_logging(get_config().log_file, logging.INFO)
+
+    await filling_db()
+    try:
+        with use_branch(args.branch):
+            await COMMANDS[args.command](args)
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,50 @@
+"""
+Сервер поликлиники: несколько терминалов в режиме remote работают с одной базой через него.
+
+    python -m src.server --host 0.0.0.0 --port 8080
+"""
+import argparse
+import asyncio
+import threading
+
+from src.config import get_config, init_conf
+from src.service.database.core.database import dispose_engines
+from src.service.database.core.filling import filling_db
+from src.service.maintenance import MaintenanceRunner
+from src.service.remote.server import ActionServer
+from src.service.utils.core_logger import get_logger, setup_logging
+from src.service.utils.event_loop import start_loop
+
+
+def main():
+    init_conf()
+    conf = get_config()
+    setup_logging(conf.log_file)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=conf.server_host)
+    parser.add_argument("--port", type=int, default=conf.server_port)
+    args = parser.parse_args()
+
+    # все действия выполняются на одном цикле, потоки HTTP-сервера только передают их туда
+    loop = conf.global_event_loop
+    threading.Thread(target=start_loop, args=(loop,), daemon=True).start()
+    asyncio.run_coroutine_threadsafe(filling_db(), loop).result()
+    maintenance = MaintenanceRunner()
+    maintenance.start()
+
+    server = ActionServer((args.host, args.port), loop)
+    get_logger(__name__).info(f"Сервер запущен на {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        maintenance.stop()
+        asyncio.run_coroutine_threadsafe(dispose_engines(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+
+
+if __name__ == "__main__":
+    main()
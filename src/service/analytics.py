@@ -0,0 +1,199 @@
+"""
+Показатели для планирования нагрузки: занятость врачей по месяцам, тепловая карта часов пик,
+доли отмен и неявок. Приёмы читаются пачками столбцов, каждая пачка считается в NumPy целиком
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+from src.service.database.actions import AppointmentColumns, get_change_seq, iter_appointment_columns
+from src.service.database.actions.schedule import load_windows, schedule_version
+from src.service.database.core.database import get_handle, get_read_db
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import AppointmentStatus, Doctor
+from src.service.exeptions import ServiceError
+from src.service.utils.epoch import SECONDS_PER_DAY, to_epoch
+
+_STATUS_CODES = {status: code for code, status in enumerate(AppointmentStatus)}
+_SCHEDULED, _CANCELLED, _NO_SHOW = (
+    _STATUS_CODES[AppointmentStatus.SCHEDULED],
+    _STATUS_CODES[AppointmentStatus.CANCELLED],
+    _STATUS_CODES[AppointmentStatus.NO_SHOW],
+)
+_CACHE_SIZE = 32
+
+_cache: OrderedDict[tuple, "AnalyticsReport"] = OrderedDict()
+
+
+@dataclass(slots=True, frozen=True, eq=False)
+class AnalyticsReport:
+    """
+    Показатели за период [date_from, date_to], даты включительно.
+    months - первые числа месяцев периода, по ним идут столбцы utilization и массивы по месяцам
+    """
+    date_from: date
+    date_to: date
+    months: list[date]
+    doctor_ids: list[int]
+    # (врачи, месяцы): доля рабочего времени, занятая неотменёнными приёмами; NaN - рабочего времени нет
+    utilization: np.ndarray
+    # (7, 24): неотменённые приёмы по дню недели (0 - понедельник) и часу начала
+    heatmap: np.ndarray
+    booked: np.ndarray
+    cancelled: np.ndarray
+    # неявки и ещё не отмеченные запланированные приёмы, время которых прошло к computed_at
+    no_show: np.ndarray
+    computed_at: datetime
+
+    @property
+    def cancellation_rate(self) -> np.ndarray:
+        return _rate(self.cancelled, self.booked)
+
+    @property
+    def no_show_rate(self) -> np.ndarray:
+        return _rate(self.no_show, self.booked)
+
+
+def _rate(part: np.ndarray, total: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(total > 0, part / total, np.nan)
+
+
+class _Accumulator:
+    """Суммы по пачкам приёмов: память не зависит от длины периода, только от числа врачей и месяцев"""
+
+    def __init__(self, doctor_ids: np.ndarray, first_month: np.datetime64, months: int, cutoff_ts: int):
+        self.doctor_ids = doctor_ids
+        self.first_month = first_month
+        self.months = months
+        self.cutoff_ts = cutoff_ts
+        self.occupied = np.zeros(len(doctor_ids) * months, dtype=np.float64)
+        self.heatmap = np.zeros(7 * 24, dtype=np.int64)
+        self.booked = np.zeros(months, dtype=np.int64)
+        self.cancelled = np.zeros(months, dtype=np.int64)
+        self.no_show = np.zeros(months, dtype=np.int64)
+
+    def add(self, chunk: AppointmentColumns) -> None:
+        if not len(chunk):
+            return
+        # array('q') отдаёт буфер без копирования
+        start = np.frombuffer(chunk.start_ts, dtype=np.int64)
+        end = np.frombuffer(chunk.end_ts, dtype=np.int64)
+        doctor = np.searchsorted(self.doctor_ids, np.frombuffer(chunk.doctor_ids, dtype=np.int64))
+        status = np.fromiter(map(_STATUS_CODES.__getitem__, chunk.status), dtype=np.int8, count=len(chunk))
+        month = (start.astype("datetime64[s]").astype("datetime64[M]") - self.first_month).astype(np.int64)
+
+        cancelled = status == _CANCELLED
+        active = ~cancelled
+        self.booked += np.bincount(month, minlength=self.months)
+        self.cancelled += np.bincount(month[cancelled], minlength=self.months)
+        no_show = (status == _NO_SHOW) | ((status == _SCHEDULED) & (end <= self.cutoff_ts))
+        self.no_show += np.bincount(month[no_show], minlength=self.months)
+
+        cell = doctor[active] * self.months + month[active]
+        self.occupied += np.bincount(cell, weights=(end - start)[active], minlength=self.occupied.size)
+
+        # 1970-01-01 - четверг, поэтому понедельник получается сдвигом на 3 дня
+        days, seconds = np.divmod(start[active], SECONDS_PER_DAY)
+        self.heatmap += np.bincount((days + 3) % 7 * 24 + seconds // 3600, minlength=self.heatmap.size)
+
+    def utilization(self, capacity: np.ndarray) -> np.ndarray:
+        occupied = self.occupied.reshape(len(self.doctor_ids), self.months)
+        return _rate(occupied, capacity)
+
+
+def _month_starts(date_from: date, date_to: date) -> list[date]:
+    months = np.arange(np.datetime64(date_from, "M"), np.datetime64(date_to, "M") + 1)
+    return [month.astype("datetime64[D]").item() for month in months]
+
+
+async def _capacity(
+    doctor_ids: np.ndarray,
+    first_month: np.datetime64,
+    months: int,
+    date_from: date,
+    date_to: date,
+) -> np.ndarray:
+    """Рабочее время врачей по расписанию (шаблон и исключения) в секундах: массив (врачи, месяцы)"""
+    capacity = np.zeros((len(doctor_ids), months), dtype=np.float64)
+    if not len(doctor_ids):
+        return capacity
+    async with get_read_db() as db:
+        windows = await load_windows(db, doctor_ids.tolist(), date_from, date_to)
+
+    index, starts, ends = [], [], []
+    for position, doctor_id in enumerate(doctor_ids.tolist()):
+        for start, end, _ in windows[doctor_id]:
+            index.append(position)
+            starts.append(start)
+            ends.append(end)
+    if not starts:
+        return capacity
+    start = np.array(starts, dtype="datetime64[s]")
+    month = (start.astype("datetime64[M]") - first_month).astype(np.int64)
+    seconds = (np.array(ends, dtype="datetime64[s]") - start).astype(np.float64)
+    np.add.at(capacity, (np.array(index), month), seconds)
+    return capacity
+
+
+@retry_on_lock
+async def _compute(date_from: date, date_to: date, cutoff: datetime) -> AnalyticsReport:
+    async with get_read_db() as db:
+        doctor_ids = np.array(
+            (await db.execute(select(Doctor.id).order_by(Doctor.id))).scalars().all(), dtype=np.int64
+        )
+
+    months = _month_starts(date_from, date_to)
+    first_month = np.datetime64(date_from, "M")
+    accumulator = _Accumulator(doctor_ids, first_month, len(months), to_epoch(cutoff))
+    async for chunk in iter_appointment_columns(
+        date_from=datetime.combine(date_from, time.min),
+        date_to=datetime.combine(date_to + timedelta(days=1), time.min),
+    ):
+        accumulator.add(chunk)
+
+    capacity = await _capacity(doctor_ids, first_month, len(months), date_from, date_to)
+    return AnalyticsReport(
+        date_from=date_from,
+        date_to=date_to,
+        months=months,
+        doctor_ids=doctor_ids.tolist(),
+        utilization=accumulator.utilization(capacity),
+        heatmap=accumulator.heatmap.reshape(7, 24),
+        booked=accumulator.booked,
+        cancelled=accumulator.cancelled,
+        no_show=accumulator.no_show,
+        computed_at=cutoff,
+    )
+
+
+async def compute_analytics(date_from: date, date_to: date) -> AnalyticsReport:
+    """
+    Показатели филиала за период. Результат кешируется по базе и периоду: изменение приёмов
+    сдвигает номер журнала изменений, изменение врачей и расписаний - schedule_version,
+    и следующий вызов считает заново
+    """
+    if date_to < date_from:
+        raise ServiceError("Дата окончания раньше даты начала")
+
+    # неявки зависят от текущего времени: для незавершённого периода кеш живёт до конца часа
+    period_end = datetime.combine(date_to + timedelta(days=1), time.min)
+    cutoff = min(period_end, datetime.now().replace(minute=0, second=0, microsecond=0))
+    key = (str(get_handle().url), date_from, date_to, cutoff, await get_change_seq(), schedule_version())
+    report = _cache.get(key)
+    if report is not None:
+        _cache.move_to_end(key)
+        return report
+
+    report = await _compute(date_from, date_to, cutoff)
+    _cache[key] = report
+    while len(_cache) > _CACHE_SIZE:
+        _cache.popitem(last=False)
+    return report
+
+
+def clear_analytics_cache() -> None:
+    _cache.clear()
@@ -0,0 +1,96 @@
+import asyncio
+from collections import OrderedDict
+from datetime import date
+
+from src.service.backend import (
+    AppointmentDelta,
+    AppointmentSummary,
+    CalendarDay,
+    SessionContext,
+    get_calendar_day,
+    get_calendar_month,
+)
+
+MonthKey = tuple[int, int]
+
+
+def shift_month(key: MonthKey, delta: int) -> MonthKey:
+    index = key[0] * 12 + key[1] - 1 + delta
+    return index // 12, index % 12 + 1
+
+
+class AppointmentCalendar:
+    """
+    Кеш календаря приёмов пользователя на global_event_loop: счётчики по дням месяца
+    и списки приёмов дней. Открытие месяца заранее загружает соседние, поэтому листание
+    не ждёт запроса. Загрузки хранятся задачами: повторный запрос месяца, который ещё
+    догружается, ждёт ту же задачу
+    """
+
+    def __init__(self, session: SessionContext, max_months: int = 12):
+        self.session = session
+        self.max_months = max_months
+        self._months: OrderedDict[MonthKey, asyncio.Task[dict[date, int]]] = OrderedDict()
+        self._days: dict[date, asyncio.Task[list[AppointmentSummary]]] = {}
+
+    async def month(self, year: int, month: int, prefetch: bool = True) -> dict[date, int]:
+        key = (year, month)
+        counts = await self._cached(self._months, key, lambda: self._load_month(key))
+        if key in self._months:
+            self._months.move_to_end(key)
+        if prefetch:
+            for neighbour in (shift_month(key, -1), shift_month(key, 1)):
+                if neighbour not in self._months:
+                    self._start(self._months, neighbour, self._load_month(neighbour))
+        while len(self._months) > self.max_months:
+            evicted, _ = self._months.popitem(last=False)
+            self._drop_days(evicted)
+        return counts
+
+    async def day(self, day: date) -> list[AppointmentSummary]:
+        """Список дня загружается только когда его открыли"""
+        return await self._cached(self._days, day, lambda: get_calendar_day(self.session, day))
+
+    def is_loaded(self, year: int, month: int) -> bool:
+        task = self._months.get((year, month))
+        return task is not None and task.done() and task.exception() is None
+
+    def apply_delta(self, delta: AppointmentDelta) -> None:
+        """Сбрасывает месяцы и дни с изменившимися приёмами; у удалённых дата неизвестна - сбрасывается всё"""
+        if delta.reset or delta.removed:
+            self.clear()
+            return
+        for item in delta.changed:
+            day = item.dt.date()
+            self._months.pop((day.year, day.month), None)
+            self._days.pop(day, None)
+
+    def clear(self) -> None:
+        self._months.clear()
+        self._days.clear()
+
+    async def _load_month(self, key: MonthKey) -> dict[date, int]:
+        days: list[CalendarDay] = await get_calendar_month(self.session, *key)
+        return {item.day: item.count for item in days}
+
+    def _drop_days(self, key: MonthKey) -> None:
+        for day in [day for day in self._days if (day.year, day.month) == key]:
+            del self._days[day]
+
+    @staticmethod
+    def _start(cache: dict, key, coro) -> asyncio.Task:
+        task = cache[key] = asyncio.ensure_future(coro)
+
+        def forget_failed(done: asyncio.Task):
+            # неудачная загрузка не остаётся в кеше, следующий запрос повторит её
+            if (done.cancelled() or done.exception() is not None) and cache.get(key) is done:
+                del cache[key]
+
+        task.add_done_callback(forget_failed)
+        return task
+
+    async def _cached(self, cache: dict, key, make_coro):
+        task = cache.get(key)
+        if task is None:
+            task = self._start(cache, key, make_coro())
+        return await asyncio.shield(task)
@@ -0,0 +1,144 @@
+"""
+Действия для интерфейса. В режиме local они выполняются над своей базой,
+в режиме remote - на сервере python -m src.server. Сигнатуры в обоих режимах одинаковые
+"""
+import asyncio
+from datetime import datetime
+from pathlib import Path
+
+from src.config import get_config
+from src.service.database import actions
+from src.service.database.actions import (
+    AppointmentDelta,
+    AppointmentSummary,
+    AppointmentView,
+    CalendarDay,
+    DoctorStatsView,
+    DoctorView,
+    ScheduleView,
+    SessionContext,
+    parse_datetime,
+)
+from src.service.exeptions import ServiceError
+
+_client = None
+
+
+def is_remote() -> bool:
+    return get_config().backend_mode == "remote"
+
+
+def get_client():
+    global _client
+    if _client is None:
+        # requests нужен только в режиме remote
+        from src.service.remote.client import RemoteClient
+
+        conf = get_config()
+        _client = RemoteClient(conf.server_url, conf.server_timeout, conf.branch_id)
+    return _client
+
+
+def _dispatch(name: str):
+    local = getattr(actions, name)
+
+    async def action(*args, **kwargs):
+        if is_remote():
+            return await get_client().call(name, *args, **kwargs)
+        return await local(*args, **kwargs)
+
+    action.__name__ = action.__qualname__ = name
+    action.__doc__ = local.__doc__
+    return action
+
+
+login_user = _dispatch("login_user")
+register_patient = _dispatch("register_patient")
+get_doctors = _dispatch("get_doctors")
+get_free_slots = _dispatch("get_free_slots")
+get_doctor_schedule = _dispatch("get_doctor_schedule")
+get_patient_appointments = _dispatch("get_patient_appointments")
+get_doctor_appointments = _dispatch("get_doctor_appointments")
+get_appointment_details = _dispatch("get_appointment_details")
+get_calendar_month = _dispatch("get_calendar_month")
+get_calendar_day = _dispatch("get_calendar_day")
+get_change_seq = _dispatch("get_change_seq")
+get_appointment_changes = _dispatch("get_appointment_changes")
+create_appointment = _dispatch("create_appointment")
+update_appointment_by_doctor = _dispatch("update_appointment_by_doctor")
+update_appointments_status = _dispatch("update_appointments_status")
+create_doctor = _dispatch("create_doctor")
+update_doctor = _dispatch("update_doctor")
+delete_doctor = _dispatch("delete_doctor")
+get_appointments_by_doctor_id = _dispatch("get_appointments_by_doctor_id")
+set_weekly_schedule = _dispatch("set_weekly_schedule")
+add_schedule_exception = _dispatch("add_schedule_exception")
+materialize_slots = _dispatch("materialize_slots")
+get_doctors_all_branches = _dispatch("get_doctors_all_branches")
+get_appointments_all_branches = _dispatch("get_appointments_all_branches")
+get_doctor_stats_totals = _dispatch("get_doctor_stats_totals")
+get_doctor_daily_stats = _dispatch("get_doctor_daily_stats")
+
+
+def end_session(session: SessionContext) -> None:
+    """Завершает сессию при выходе пользователя"""
+    actions.end_session(session)
+    if is_remote() and session.token:
+        # интерфейс не ждёт ответа: серверная сессия всё равно будет закрыта или забыта при перезапуске
+        asyncio.run_coroutine_threadsafe(get_client().call("end_session", session), get_config().global_event_loop)
+
+
+async def export_appointments(
+    destination: Path,
+    fmt: str = "csv",
+    doctor_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> int:
+    """Выгрузка пишет файл рядом с базой, поэтому доступна только в режиме local"""
+    if is_remote():
+        raise ServiceError("Выгрузка записей выполняется на сервере: python -m src.manage export-appointments")
+    return await actions.export_appointments(destination, fmt, doctor_id=doctor_id, date_from=date_from, date_to=date_to)
+
+
+__all__ = [
+    "AppointmentDelta",
+    "AppointmentSummary",
+    "AppointmentView",
+    "CalendarDay",
+    "DoctorStatsView",
+    "DoctorView",
+    "ScheduleView",
+    "SessionContext",
+    "parse_datetime",
+    "is_remote",
+    "get_client",
+    "login_user",
+    "register_patient",
+    "get_doctors",
+    "get_free_slots",
+    "get_doctor_schedule",
+    "get_patient_appointments",
+    "get_doctor_appointments",
+    "get_appointment_details",
+    "get_calendar_month",
+    "get_calendar_day",
+    "get_change_seq",
+    "get_appointment_changes",
+    "create_appointment",
+    "update_appointment_by_doctor",
+    "update_appointments_status",
+    "create_doctor",
+    "update_doctor",
+    "delete_doctor",
+    "get_appointments_by_doctor_id",
+    "set_weekly_schedule",
+    "add_schedule_exception",
+    "materialize_slots",
+    "get_doctors_all_branches",
+    "get_appointments_all_branches",
+    "get_doctor_stats_totals",
+    "get_doctor_daily_stats",
+    "end_session",
+    "export_appointments",
+]
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import Callable
+
+from src.config import get_config
+from src.service.backend import AppointmentDelta, SessionContext, get_appointment_changes
+from src.service.exeptions import ServiceError
+
+DeltaCallback = Callable[[AppointmentDelta], None]
+
+
+class ChangeFeed:
+    """
+    Опрашивает журнал изменений приёмов на global_event_loop и передаёт подписчикам только изменившиеся приёмы.
+    Подписчики вызываются в потоке цикла: экраны сами переносят обработку в поток интерфейса
+    """
+
+    def __init__(self, session: SessionContext, since: int, interval: float | None = None):
+        self.session = session
+        self.seq = since
+        self.interval = interval if interval is not None else get_config().change_poll_interval
+        self._subscribers: list[DeltaCallback] = []
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, callback: DeltaCallback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: DeltaCallback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def start(self):
+        """Запускает опрос; вызывается из любого потока"""
+        loop = get_config().global_event_loop
+        loop.call_soon_threadsafe(self._start_task)
+
+    def stop(self):
+        loop = get_config().global_event_loop
+        loop.call_soon_threadsafe(self._cancel_task)
+
+    def _start_task(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _cancel_task(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def poll(self) -> AppointmentDelta:
+        delta = await get_appointment_changes(self.session, self.seq)
+        self.seq = delta.seq
+        if delta.changed or delta.removed or delta.reset:
+            for callback in list(self._subscribers):
+                callback(delta)
+        return delta
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.poll()
+            except ServiceError as e:
+                # сессия завершена или сервер недоступен: следующая попытка через interval
+                logging.warning(f"Журнал изменений недоступен: {e}")
+            except Exception:
+                logging.exception("Ошибка опроса журнала изменений")
@@ -1,7 +1,10 @@
 from src.service.database.actions.actions import (
+    SessionContext,
     DoctorView,
+    AppointmentSummary,
     AppointmentView,
     login_user,
+    end_session,
     register_patient,
     get_doctors,
     create_doctor,
@@ -12,13 +15,62 @@ from src.service.database.actions.actions import (
     get_patient_appointments,
     get_doctor_appointments,
     get_appointments_by_doctor_id,
+    get_appointment_details,
     update_appointment_by_doctor,
+    update_appointments_status,
+)
+from src.service.database.actions.schedule import (
+    ScheduleView,
+    get_doctor_schedule,
+    set_weekly_schedule,
+    add_schedule_exception,
+    materialize_slots,
+)
+from src.service.database.actions.slots import get_free_slots
+from src.service.database.actions.columnar import (
+    AppointmentColumns,
+    iter_appointment_columns,
+    fetch_appointment_columns,
+)
+from src.service.database.actions.export import EXPORT_FORMATS, export_appointments
+from src.service.database.actions.branches import (
+    fan_out,
+    get_doctors_all_branches,
+    get_appointments_all_branches,
+)
+from src.service.database.actions.changes import (
+    AppointmentDelta,
+    get_change_seq,
+    get_appointment_changes,
+    prune_appointment_changes,
+)
+from src.service.database.actions.archive import archive_appointments
+from src.service.database.actions.past_due import close_past_due_appointments
+from src.service.database.actions.calendar import (
+    CalendarDay,
+    get_calendar_month,
+    get_calendar_day,
+)
+from src.service.database.actions.stats import (
+    DoctorStatsView,
+    rebuild_doctor_stats,
+    get_doctor_stats_totals,
+    get_doctor_daily_stats,
+)
+from src.service.database.actions.bulk_import import (
+    IMPORT_COLUMNS,
+    ImportRowError,
+    ImportReport,
+    import_people_csv,
 )
 
 __all__ = [
+    "SessionContext",
     "DoctorView",
+    "AppointmentSummary",
     "AppointmentView",
     "login_user",
+    "end_session",
     "register_patient",
     "get_doctors",
     "create_doctor",
@@ -29,5 +81,38 @@ __all__ = [
     "get_patient_appointments",
     "get_doctor_appointments",
     "get_appointments_by_doctor_id",
+    "get_appointment_details",
     "update_appointment_by_doctor",
+    "update_appointments_status",
+    "get_free_slots",
+    "ScheduleView",
+    "get_doctor_schedule",
+    "set_weekly_schedule",
+    "add_schedule_exception",
+    "materialize_slots",
+    "AppointmentColumns",
+    "iter_appointment_columns",
+    "fetch_appointment_columns",
+    "EXPORT_FORMATS",
+    "export_appointments",
+    "fan_out",
+    "get_doctors_all_branches",
+    "get_appointments_all_branches",
+    "AppointmentDelta",
+    "get_change_seq",
+    "get_appointment_changes",
+    "prune_appointment_changes",
+    "archive_appointments",
+    "close_past_due_appointments",
+    "CalendarDay",
+    "get_calendar_month",
+    "get_calendar_day",
+    "DoctorStatsView",
+    "rebuild_doctor_stats",
+    "get_doctor_stats_totals",
+    "get_doctor_daily_stats",
+    "IMPORT_COLUMNS",
+    "ImportRowError",
+    "ImportReport",
+    "import_people_csv",
 ]
\ No newline at end of file
@@ -1,40 +1,73 @@
+import asyncio
+import functools
 import hashlib
+import heapq
 import hmac
 import os
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from sqlalchemy import select, delete
+from sqlalchemy import DateTime, func, select, delete, update, insert, literal
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from src.service.database.core.database import get_db
+from src.config import get_config
+from src.service.database.actions.schedule import schedule_changed
+from src.service.database.actions.stats import record_stats_changes
+from src.service.database.core.database import current_branch, get_read_db, submit_write, use_branch
+from src.service.database.core.retry import retry_on_lock
 from src.service.database.models import (
     User,
     StorageStatus,
     Doctor,
     Patient,
     Appointment,
+    AppointmentArchive,
+    AppointmentChange,
     AppointmentStatus,
+    DoctorSchedule,
+    ScheduleException,
+    Slot,
+    DoctorDailyStats,
 )
 from src.service.exeptions import ServiceError
+from src.service.utils.epoch import to_epoch
 
 
 @dataclass
-class AuthPayload:
+class SessionContext:
+    """Сессия пользователя: кроме user_id хранит уже найденные id врача или пациента"""
     user_id: int
     role: StorageStatus
     login: str
+    doctor_id: int | None = None
+    patient_id: int | None = None
+    active: bool = True
+    token: str | None = None  # выдаётся сервером в режиме remote
+    branch_id: int | None = None  # филиал, в базе которого найден пользователь
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DoctorView:
     id: int
     fio: str
     specialization: str
+    branch_id: int | None = None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
+class AppointmentSummary:
+    """Строка списка приёмов без заметок врача"""
+    id: int
+    doctor_fio: str
+    patient_fio: str
+    dt: datetime
+    status: AppointmentStatus
+    branch_id: int | None = None
+
+
+@dataclass(slots=True, frozen=True)
 class AppointmentView:
     id: int
     doctor_fio: str
@@ -44,10 +77,50 @@ class AppointmentView:
     complaint: str
     condition: str
     conclusion: str
+    archived: bool = False  # приём уже в архиве и не изменяется
+
+
+# пользователи (филиал, id), удалённые после входа: их сессии больше не принимаются
+_revoked_user_ids: set[tuple[int | None, int]] = set()
+
+
+def end_session(session: SessionContext) -> None:
+    """Завершает сессию при выходе пользователя"""
+    session.active = False
+
+
+def _session_doctor_id(session: SessionContext) -> int:
+    _check_session(session)
+    if session.doctor_id is None:
+        raise ServiceError("Врач не найден")
+    return session.doctor_id
+
+
+def _session_patient_id(session: SessionContext) -> int:
+    _check_session(session)
+    if session.patient_id is None:
+        raise ServiceError("Пациент не найден")
+    return session.patient_id
+
+
+def _check_session(session: SessionContext) -> None:
+    if not session.active or (session.branch_id, session.user_id) in _revoked_user_ids:
+        raise ServiceError("Сессия завершена, войдите заново")
+
+
+def _on_session_branch(func):
+    """Действие с сессией выполняется в базе филиала, где пользователь вошёл в систему"""
 
+    @functools.wraps(func)
+    async def wrapper(session: SessionContext, *args, **kwargs):
+        with use_branch(session.branch_id):
+            return await func(session, *args, **kwargs)
+
+    return wrapper
 
 
 def hash_password(password: str) -> str:
+    """PBKDF2 занимает десятки миллисекунд: в действиях вызывается через asyncio.to_thread, чтобы не держать цикл"""
     salt = os.urandom(16)
     key = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, 100_000)
     return f"pbkdf2_sha256${salt.hex()}${key.hex()}"
@@ -64,59 +137,92 @@ def verify_password(password: str, stored: str) -> bool:
     return hmac.compare_digest(password, stored)
 
 
-async def register_patient(login: str, password: str, fio: str, phone: str) -> AuthPayload:
+@retry_on_lock
+async def register_patient(login: str, password: str, fio: str, phone: str) -> SessionContext:
     if not login or not password or not fio or not phone:
         raise ServiceError("Переданы не все данные")
 
-    async with get_db() as db:
-        user = User(login=login.strip(), password=hash_password(password), role=StorageStatus.PATIENT)
+    password_hash = await asyncio.to_thread(hash_password, password)
+    branch_id = current_branch()
+
+    async def job(db: AsyncSession) -> SessionContext:
+        user = User(login=login.strip(), password=password_hash, role=StorageStatus.PATIENT)
         db.add(user)
         try:
             await db.flush()
-            db.add(Patient(user_id=user.id, fio=fio.strip(), phone=phone.strip()))
-            await db.commit()
+            patient = Patient(user_id=user.id, fio=fio.strip(), phone=phone.strip())
+            db.add(patient)
+            await db.flush()
         except IntegrityError:
-            await db.rollback()
             raise ServiceError("Логин уже занят")
 
-        return AuthPayload(user_id=user.id, role=user.role, login=user.login)
+        return SessionContext(
+            user_id=user.id, role=user.role, login=user.login, patient_id=patient.id, branch_id=branch_id
+        )
 
+    return await submit_write(job)
 
-async def login_user(login: str, password: str) -> AuthPayload:
-    async with get_db() as db:
-        result = await db.execute(select(User).where(User.login == login.strip()))
-        user = result.scalar_one_or_none()
 
-        if user is None or user.role == StorageStatus.DELETED:
-            raise ServiceError("Пользователь не найден")
+@retry_on_lock
+async def login_user(login: str, password: str) -> SessionContext:
+    async with get_read_db() as db:
+        result = await db.execute(
+            select(User, Doctor.id, Patient.id)
+            .outerjoin(Doctor, Doctor.user_id == User.id)
+            .outerjoin(Patient, Patient.user_id == User.id)
+            .where(User.login == login.strip())
+        )
+        row = result.one_or_none()
 
-        if not verify_password(password, user.password):
-            raise ServiceError("Неверный пароль")
+    if row is None or row[0].role == StorageStatus.DELETED:
+        raise ServiceError("Пользователь не найден")
 
-        return AuthPayload(user_id=user.id, role=user.role, login=user.login)
+    user, doctor_id, patient_id = row
+    # хэш считается в потоке и без занятого соединения читателя
+    if not await asyncio.to_thread(verify_password, password, user.password):
+        raise ServiceError("Неверный пароль")
 
+    branch_id = current_branch()
+    _revoked_user_ids.discard((branch_id, user.id))
+    return SessionContext(
+        user_id=user.id,
+        role=user.role,
+        login=user.login,
+        doctor_id=doctor_id,
+        patient_id=patient_id,
+        branch_id=branch_id,
+    )
 
+
+@retry_on_lock
 async def get_doctors() -> list[DoctorView]:
-    async with get_db() as db:
+    async with get_read_db() as db:
         result = await db.execute(select(Doctor).order_by(Doctor.fio.asc()))
         doctors = result.scalars().all()
-        return [DoctorView(id=d.id, fio=d.fio, specialization=d.specialization) for d in doctors]
+        branch_id = current_branch()
+        return [DoctorView(id=d.id, fio=d.fio, specialization=d.specialization, branch_id=branch_id) for d in doctors]
 
 
+@retry_on_lock
 async def create_doctor(login: str, password: str, fio: str, specialization: str) -> None:
-    async with get_db() as db:
-        user = User(login=login.strip(), password=hash_password(password), role=StorageStatus.DOCTOR)
+    password_hash = await asyncio.to_thread(hash_password, password)
+
+    async def job(db: AsyncSession) -> None:
+        user = User(login=login.strip(), password=password_hash, role=StorageStatus.DOCTOR)
         db.add(user)
 
         try:
             await db.flush()
             db.add(Doctor(user_id=user.id, fio=fio.strip(), specialization=specialization.strip()))
-            await db.commit()
+            await db.flush()
         except IntegrityError:
-            await db.rollback()
             raise ServiceError("Логин уже занят")
 
+    await submit_write(job)
+    schedule_changed()
 
+
+@retry_on_lock
 async def update_doctor(
     doctor_id: int,
     fio: str,
@@ -124,7 +230,11 @@ async def update_doctor(
     login: str | None = None,
     password: str | None = None,
 ) -> None:
-    async with get_db() as db:
+    password_hash = None
+    if password is not None and password.strip():
+        password_hash = await asyncio.to_thread(hash_password, password.strip())
+
+    async def job(db: AsyncSession) -> None:
         result = await db.execute(select(Doctor).options(selectinload(Doctor.user)).where(Doctor.id == doctor_id))
         doctor = result.scalar_one_or_none()
         if doctor is None:
@@ -136,184 +246,426 @@ async def update_doctor(
         if login is not None and login.strip():
             doctor.user.login = login.strip()
 
-        if password is not None and password.strip():
-            doctor.user.password = hash_password(password.strip())
+        if password_hash is not None:
+            doctor.user.password = password_hash
 
         try:
-            await db.commit()
+            await db.flush()
         except IntegrityError:
-            await db.rollback()
             raise ServiceError("Логин уже занят")
 
+    await submit_write(job)
+
 
+@retry_on_lock
 async def delete_doctor(doctor_id: int) -> None:
-    async with get_db() as db:
-        result = await db.execute(select(Doctor).options(selectinload(Doctor.user)).where(Doctor.id == doctor_id))
+    async def job(db: AsyncSession) -> None:
+        result = await db.execute(select(Doctor).where(Doctor.id == doctor_id))
         doctor = result.scalar_one_or_none()
         if doctor is None:
             raise ServiceError("Врач не найден")
 
         user_id = doctor.user_id
+        await db.execute(delete(Slot).where(Slot.doctor_id == doctor_id))
+        await db.execute(delete(ScheduleException).where(ScheduleException.doctor_id == doctor_id))
+        await db.execute(delete(DoctorSchedule).where(DoctorSchedule.doctor_id == doctor_id))
+        await db.execute(delete(DoctorDailyStats).where(DoctorDailyStats.doctor_id == doctor_id))
         await db.execute(delete(Doctor).where(Doctor.id == doctor_id))
         await db.execute(delete(User).where(User.id == user_id))
-        await db.commit()
+        return user_id
 
+    _revoked_user_ids.add((current_branch(), await submit_write(job)))
+    schedule_changed()
 
-async def create_appointment(patient_user_id: int, doctor_id: int, dt: datetime) -> None:
-    async with get_db() as db:
-        patient_result = await db.execute(select(Patient).where(Patient.user_id == patient_user_id))
-        patient = patient_result.scalar_one_or_none()
-        if patient is None:
-            raise ServiceError("Пациент не найден")
 
+@_on_session_branch
+@retry_on_lock
+async def create_appointment(
+    session: SessionContext,
+    doctor_id: int,
+    dt: datetime,
+    duration_minutes: int | None = None,
+) -> None:
+    """
+    Записывает пациента на приём. Длительность берётся из слота расписания,
+    а если слотов на это время нет - из duration_minutes или длины слота по умолчанию
+    """
+    patient_id = _session_patient_id(session)
+    conf = get_config()
+    duration = duration_minutes or conf.slot_minutes
+    if not 0 < duration <= conf.max_appointment_minutes:
+        raise ServiceError("Некорректная длительность приёма")
+
+    async def job(db: AsyncSession) -> None:
         doctor_result = await db.execute(select(Doctor).where(Doctor.id == doctor_id))
         doctor = doctor_result.scalar_one_or_none()
         if doctor is None:
             raise ServiceError("Врач не найден")
 
-        occupied = await db.execute(
-            select(Appointment).where(
-                Appointment.doctor_id == doctor_id,
-                Appointment.datetime == dt,
-            )
+        slot_result = await db.execute(
+            select(Slot.id, Slot.start, Slot.end)
+            .where(Slot.doctor_id == doctor_id, Slot.start <= dt, Slot.end > dt)
+            .order_by(Slot.start.desc())
+            .limit(1)
         )
-        if occupied.scalar_one_or_none() is not None:
+        slot = slot_result.first()
+        if slot is not None and slot.start != dt:
+            raise ServiceError("Время не совпадает с расписанием врача")
+
+        end = slot.end if slot is not None else dt + timedelta(minutes=duration)
+        appointment_id = await _insert_without_overlap(db, doctor_id, patient_id, dt, end)
+        if appointment_id is None:
             raise ServiceError("Выбранное время занято")
 
-        db.add(
-            Appointment(
-                doctor_id=doctor_id,
-                patient_id=patient.id,
-                datetime=dt,
-                complaint="",
-                condition="",
-                conclusion="",
-                status=AppointmentStatus.SCHEDULED,
+        await log_appointment_changes(db, [appointment_id])
+        await record_stats_changes(db, [(doctor_id, to_epoch(dt), None, AppointmentStatus.SCHEDULED)])
+
+        if slot is not None:
+            # запись занимает заранее нарезанный слот одним UPDATE по первичному ключу
+            claim = await db.execute(
+                update(Slot)
+                .where(Slot.id == slot.id, Slot.appointment_id.is_(None))
+                .values(appointment_id=appointment_id)
+                .execution_options(synchronize_session=False)
             )
-        )
-        await db.commit()
+            if claim.rowcount != 1:
+                raise ServiceError("Выбранное время занято")
 
+    await submit_write(job)
 
-async def get_patient_appointments(patient_user_id: int) -> list[AppointmentView]:
-    async with get_db() as db:
-        patient_result = await db.execute(select(Patient).where(Patient.user_id == patient_user_id))
-        patient = patient_result.scalar_one_or_none()
-        if patient is None:
-            raise ServiceError("Пациент не найден")
 
-        result = await db.execute(
-            select(Appointment)
-            .options(selectinload(Appointment.doctor), selectinload(Appointment.patient))
-            .where(Appointment.patient_id == patient.id)
-            .order_by(Appointment.datetime.asc())
+async def _insert_without_overlap(
+    db: AsyncSession,
+    doctor_id: int,
+    patient_id: int,
+    start: datetime,
+    end: datetime,
+) -> int | None:
+    """
+    Вставляет запись одним INSERT ... SELECT ... WHERE NOT EXISTS, поэтому проверка пересечения
+    и вставка атомарны; пересечения ищет _overlapping.
+    Сравниваются целочисленные start_ts/end_ts, а не строки дат.
+    Возвращает id новой записи или None, если время пересекается с другой записью
+    """
+    table = Appointment.__table__
+    start_ts, end_ts = to_epoch(start), to_epoch(end)
+    values = select(
+        literal(doctor_id),
+        literal(patient_id),
+        literal(start, DateTime),
+        literal(end, DateTime),
+        literal(start_ts),
+        literal(end_ts),
+        literal(""),
+        literal(""),
+        literal(""),
+        literal(AppointmentStatus.SCHEDULED, table.c.status.type),
+    ).where(~_overlapping(doctor_id, start_ts, end_ts))
+
+    result = await db.execute(
+        insert(table)
+        .from_select(
+            [
+                "doctor_id",
+                "patient_id",
+                "datetime",
+                "end_datetime",
+                "start_ts",
+                "end_ts",
+                "complaint",
+                "condition",
+                "conclusion",
+                "status",
+            ],
+            values,
         )
-        appointments = result.scalars().all()
-
-        return [
-            AppointmentView(
-                id=a.id,
-                doctor_fio=a.doctor.fio,
-                patient_fio=a.patient.fio,
-                dt=a.datetime,
-                status=a.status,
-                complaint=a.complaint or "",
-                condition=a.condition or "",
-                conclusion=a.conclusion or "",
-            )
-            for a in appointments
-        ]
+        .returning(table.c.id)
+    )
+    return result.scalar_one_or_none()
+
+
+def _overlapping(doctor_id: int, start_ts: int, end_ts: int, exclude_id: int | None = None):
+    """
+    EXISTS по неотменённым приёмам врача, пересекающимся с [start_ts, end_ts). Поиск идёт по индексу
+    (doctor_id, start_ts): начало чужой записи ограничено снизу максимальной длительностью приёма
+    """
+    # псевдоним: в UPDATE Appointment подзапрос не должен коррелировать с обновляемой строкой
+    busy = Appointment.__table__.alias("busy")
+    earliest_start_ts = start_ts - get_config().max_appointment_minutes * 60
+    query = select(busy.c.id).where(
+        busy.c.doctor_id == doctor_id,
+        busy.c.start_ts > earliest_start_ts,
+        busy.c.start_ts < end_ts,
+        busy.c.end_ts > start_ts,
+        busy.c.status != AppointmentStatus.CANCELLED,
+    )
+    if exclude_id is not None:
+        query = query.where(busy.c.id != exclude_id)
+    return query.exists()
+
+
+async def _reactivate(db: AsyncSession, doctor_id: int, appointment, status: AppointmentStatus) -> bool:
+    """
+    Возвращает отменённый приём в статус status, только если его время никто не занял после отмены:
+    проверка пересечения выполняется в самом UPDATE, как при записи. Заново занимает слот приёма.
+    appointment - строка или объект с id, datetime, start_ts и end_ts
+    """
+    result = await db.execute(
+        update(Appointment)
+        .where(
+            Appointment.id == appointment.id,
+            Appointment.status == AppointmentStatus.CANCELLED,
+            ~_overlapping(doctor_id, appointment.start_ts, appointment.end_ts, exclude_id=appointment.id),
+        )
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
 
+    await db.execute(
+        update(Slot)
+        .where(Slot.doctor_id == doctor_id, Slot.start == appointment.datetime, Slot.appointment_id.is_(None))
+        .values(appointment_id=appointment.id)
+        .execution_options(synchronize_session=False)
+    )
+    return True
 
-async def get_doctor_appointments(doctor_user_id: int) -> list[AppointmentView]:
-    async with get_db() as db:
-        doctor_result = await db.execute(select(Doctor).where(Doctor.user_id == doctor_user_id))
-        doctor = doctor_result.scalar_one_or_none()
-        if doctor is None:
-            raise ServiceError("Врач не найден")
 
-        result = await db.execute(
-            select(Appointment)
-            .options(selectinload(Appointment.patient), selectinload(Appointment.doctor))
-            .where(Appointment.doctor_id == doctor.id)
-            .order_by(Appointment.datetime.asc())
-        )
-        appointments = result.scalars().all()
-
-        return [
-            AppointmentView(
-                id=a.id,
-                doctor_fio=a.doctor.fio,
-                patient_fio=a.patient.fio,
-                dt=a.datetime,
-                status=a.status,
-                complaint=a.complaint or "",
-                condition=a.condition or "",
-                conclusion=a.conclusion or "",
-            )
-            for a in appointments
-        ]
+@_on_session_branch
+@retry_on_lock
+async def get_patient_appointments(session: SessionContext, include_archived: bool = False) -> list[AppointmentSummary]:
+    patient_id = _session_patient_id(session)
 
+    async with get_read_db() as db:
+        return await _appointment_list(db, lambda model: model.patient_id == patient_id, include_archived)
 
 
+@_on_session_branch
+@retry_on_lock
+async def get_doctor_appointments(session: SessionContext, include_archived: bool = False) -> list[AppointmentSummary]:
+    doctor_id = _session_doctor_id(session)
 
-async def get_appointments_by_doctor_id(doctor_id: int) -> list[AppointmentView]:
-    async with get_db() as db:
-        doctor_result = await db.execute(select(Doctor).where(Doctor.id == doctor_id))
-        doctor = doctor_result.scalar_one_or_none()
-        if doctor is None:
+    async with get_read_db() as db:
+        return await _appointment_list(db, lambda model: model.doctor_id == doctor_id, include_archived)
+
+
+@retry_on_lock
+async def get_appointments_by_doctor_id(doctor_id: int, include_archived: bool = False) -> list[AppointmentSummary]:
+    async with get_read_db() as db:
+        if await db.get(Doctor, doctor_id) is None:
             raise ServiceError("Врач не найден")
 
-        result = await db.execute(
-            select(Appointment)
-            .options(selectinload(Appointment.patient), selectinload(Appointment.doctor))
-            .where(Appointment.doctor_id == doctor.id)
-            .order_by(Appointment.datetime.asc())
-        )
-        appointments = result.scalars().all()
-
-        return [
-            AppointmentView(
-                id=a.id,
-                doctor_fio=a.doctor.fio,
-                patient_fio=a.patient.fio,
-                dt=a.datetime,
-                status=a.status,
-                complaint=a.complaint or "",
-                condition=a.condition or "",
-                conclusion=a.conclusion or "",
+        return await _appointment_list(db, lambda model: model.doctor_id == doctor_id, include_archived)
+
+
+async def _appointment_list(db: AsyncSession, owner, include_archived: bool) -> list[AppointmentSummary]:
+    """
+    Приёмы рабочей таблицы, а с include_archived - и архива, по времени начала.
+    owner(model) строит условие на Appointment или AppointmentArchive
+    """
+    rows = (await db.execute(_summary_query().where(owner(Appointment)))).all()
+    if include_archived:
+        archived = (await db.execute(_summary_query(AppointmentArchive).where(owner(AppointmentArchive)))).all()
+        rows = list(heapq.merge(archived, rows, key=lambda row: row.datetime))
+    return _summaries(rows)
+
+
+async def reaches_archive(db: AsyncSession, start: datetime | None) -> bool:
+    """
+    Есть ли в архиве приёмы, начавшиеся не раньше start (None - любые). Граница берётся из самого архива
+    по индексу start_ts, а не из archive_after_days: архивировать можно и вручную с другим горизонтом
+    """
+    newest = (await db.execute(select(func.max(AppointmentArchive.start_ts)))).scalar()
+    return newest is not None and (start is None or newest >= to_epoch(start))
+
+
+def _summaries(rows) -> list[AppointmentSummary]:
+    branch_id = current_branch()
+    return [AppointmentSummary(*row, branch_id) for row in rows]
+
+
+def _summary_query(model=Appointment):
+    """Только колонки для списка: заметки приёма не читаются. model - Appointment или AppointmentArchive"""
+    return (
+        select(model.id, Doctor.fio, Patient.fio, model.datetime, model.status)
+        .join(Doctor, Doctor.id == model.doctor_id)
+        .join(Patient, Patient.id == model.patient_id)
+        .order_by(model.start_ts.asc())
+    )
+
+
+@_on_session_branch
+@retry_on_lock
+async def get_appointment_details(session: SessionContext, appointment_id: int) -> AppointmentView:
+    """
+    Полные данные приёма с заметками: врач и пациент видят только свои приёмы, администратор - любые.
+    Приём, которого уже нет в рабочей таблице, ищется в архиве
+    """
+    _check_session(session)
+
+    def details_query(model):
+        query = (
+            select(
+                model.id,
+                Doctor.fio,
+                Patient.fio,
+                model.datetime,
+                model.status,
+                model.complaint,
+                model.condition,
+                model.conclusion,
             )
-            for a in appointments
-        ]
-
+            .join(Doctor, Doctor.id == model.doctor_id)
+            .join(Patient, Patient.id == model.patient_id)
+            .where(model.id == appointment_id)
+        )
+        if session.role == StorageStatus.DOCTOR:
+            query = query.where(model.doctor_id == _session_doctor_id(session))
+        elif session.role == StorageStatus.PATIENT:
+            query = query.where(model.patient_id == _session_patient_id(session))
+        return query
+
+    archived = False
+    async with get_read_db() as db:
+        row = (await db.execute(details_query(Appointment))).one_or_none()
+        if row is None:
+            row = (await db.execute(details_query(AppointmentArchive))).one_or_none()
+            archived = True
+    if row is None:
+        raise ServiceError("Приём не найден")
+
+    a_id, doctor_fio, patient_fio, dt, status, complaint, condition, conclusion = row
+    return AppointmentView(
+        id=a_id,
+        doctor_fio=doctor_fio,
+        patient_fio=patient_fio,
+        dt=dt,
+        status=status,
+        complaint=complaint or "",
+        condition=condition or "",
+        conclusion=conclusion or "",
+        archived=archived,
+    )
+
+
+@_on_session_branch
+@retry_on_lock
 async def update_appointment_by_doctor(
-    doctor_user_id: int,
+    session: SessionContext,
     appointment_id: int,
     complaint: str,
     condition: str,
     conclusion: str,
     status: AppointmentStatus,
 ) -> None:
-    async with get_db() as db:
-        doctor_result = await db.execute(select(Doctor).where(Doctor.user_id == doctor_user_id))
-        doctor = doctor_result.scalar_one_or_none()
-        if doctor is None:
-            raise ServiceError("Врач не найден")
+    doctor_id = _session_doctor_id(session)
 
+    async def job(db: AsyncSession) -> None:
         appointment_result = await db.execute(
             select(Appointment).where(
                 Appointment.id == appointment_id,
-                Appointment.doctor_id == doctor.id,
+                Appointment.doctor_id == doctor_id,
             )
         )
         appointment = appointment_result.scalar_one_or_none()
         if appointment is None:
             raise ServiceError("Прием не найден")
 
+        previous_status = appointment.status
+        if previous_status == AppointmentStatus.CANCELLED and status != AppointmentStatus.CANCELLED:
+            if not await _reactivate(db, doctor_id, appointment, status):
+                raise ServiceError("Время приёма уже занято другой записью")
+
         appointment.complaint = complaint.strip()
         appointment.condition = condition.strip()
         appointment.conclusion = conclusion.strip()
         appointment.status = status
-        await db.commit()
+        await db.flush()
+        await log_appointment_changes(db, [appointment_id])
+        await record_stats_changes(db, [(doctor_id, appointment.start_ts, previous_status, status)])
+
+        if status == AppointmentStatus.CANCELLED:
+            await _release_slots(db, doctor_id, [appointment_id])
+
+    await submit_write(job)
+
+
+@_on_session_branch
+@retry_on_lock
+async def update_appointments_status(
+    session: SessionContext,
+    appointment_ids: list[int],
+    status: AppointmentStatus,
+) -> int:
+    """Меняет статус сразу у нескольких приёмов врача одним UPDATE. Возвращает число изменённых приёмов"""
+    doctor_id = _session_doctor_id(session)
+    if not appointment_ids:
+        return 0
+
+    async def job(db: AsyncSession) -> int:
+        # принадлежность приёмов врачу проверяется в самом запросе; приёмы уже в этом статусе не трогаются
+        owned = (Appointment.id.in_(appointment_ids), Appointment.doctor_id == doctor_id, Appointment.status != status)
+        # прежние статусы нужны сводке статистики: UPDATE ... RETURNING отдаёт уже новые
+        previous = (
+            await db.execute(
+                select(Appointment.id, Appointment.datetime, Appointment.start_ts, Appointment.end_ts, Appointment.status)
+                .where(*owned)
+            )
+        ).all()
+        reactivated = []
+        if status != AppointmentStatus.CANCELLED:
+            # отменённые возвращаются по одному: каждый следующий видит время, уже занятое предыдущими.
+            # Приём, время которого занято, остаётся отменённым
+            reactivated = [
+                row.id
+                for row in previous
+                if row.status == AppointmentStatus.CANCELLED and await _reactivate(db, doctor_id, row, status)
+            ]
+            owned = (*owned, Appointment.status != AppointmentStatus.CANCELLED)
+        result = await db.execute(
+            update(Appointment)
+            .where(*owned)
+            .values(status=status)
+            .returning(Appointment.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated_ids = [*result.scalars(), *reactivated]
+        updated = set(updated_ids)
+        await log_appointment_changes(db, updated_ids)
+        await record_stats_changes(
+            db, [(doctor_id, row.start_ts, row.status, status) for row in previous if row.id in updated]
+        )
+        if status == AppointmentStatus.CANCELLED:
+            await _release_slots(db, doctor_id, updated_ids)
+        return len(updated_ids)
+
+    return await submit_write(job)
+
+
+async def log_appointment_changes(db: AsyncSession, appointment_ids: list[int]) -> None:
+    """Записывает изменение приёмов в журнал в той же транзакции, что и само изменение"""
+    if not appointment_ids:
+        return
+
+    await db.execute(
+        insert(AppointmentChange.__table__).from_select(
+            ["appointment_id", "doctor_id", "patient_id", "changed_ts"],
+            select(
+                Appointment.id, Appointment.doctor_id, Appointment.patient_id, literal(to_epoch(datetime.now()))
+            ).where(Appointment.id.in_(appointment_ids)),
+        )
+    )
+
+
+async def _release_slots(db: AsyncSession, doctor_id: int, appointment_ids: list[int]) -> None:
+    """Освобождает слоты отменённых приёмов"""
+    await db.execute(
+        update(Slot)
+        .where(Slot.doctor_id == doctor_id, Slot.appointment_id.in_(appointment_ids))
+        .values(appointment_id=None)
+        .execution_options(synchronize_session=False)
+    )
 
 
 def parse_datetime(raw: str) -> datetime:
@@ -0,0 +1,81 @@
+"""
+Перенос старых завершённых, отменённых и пропущенных приёмов из Appointment в AppointmentArchive.
+Рабочая таблица остаётся небольшой, а списки и подробности при запросе старых данных читают архив
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_config
+from src.service.database.actions.actions import log_appointment_changes
+from src.service.database.core.database import submit_write
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import Appointment, AppointmentArchive, AppointmentStatus, Slot
+from src.service.exeptions import ServiceError
+from src.service.utils.epoch import to_epoch
+
+_ARCHIVED_STATUSES = (AppointmentStatus.COMPLETED, AppointmentStatus.CANCELLED, AppointmentStatus.NO_SHOW)
+
+
+@retry_on_lock
+async def _archive_batch(cutoff_ts: int, batch_size: int) -> int:
+    async def job(db: AsyncSession) -> int:
+        # самые старые приёмы по индексу start_ts
+        ids = list(
+            (
+                await db.execute(
+                    select(Appointment.id)
+                    .where(Appointment.start_ts < cutoff_ts, Appointment.status.in_(_ARCHIVED_STATUSES))
+                    .order_by(Appointment.start_ts)
+                    .limit(batch_size)
+                )
+            ).scalars()
+        )
+        if not ids:
+            return 0
+
+        hot = Appointment.__table__
+        columns = [column.name for column in hot.columns]
+        await db.execute(
+            insert(AppointmentArchive.__table__).from_select(
+                [*columns, "archived_ts"],
+                select(*hot.columns, literal(to_epoch(datetime.now()))).where(hot.c.id.in_(ids)),
+            )
+        )
+        # журнал пишется до удаления: экраны получат эти приёмы уже из архива
+        await log_appointment_changes(db, ids)
+        await db.execute(
+            update(Slot)
+            .where(Slot.appointment_id.in_(ids))
+            .values(appointment_id=None)
+            .execution_options(synchronize_session=False)
+        )
+        await db.execute(delete(Appointment).where(Appointment.id.in_(ids)).execution_options(synchronize_session=False))
+        return len(ids)
+
+    return await submit_write(job)
+
+
+async def archive_appointments(older_than: datetime | None = None, batch_size: int | None = None) -> int:
+    """
+    Переносит в архив закрытые (не запланированные) приёмы, начавшиеся раньше older_than
+    (по умолчанию - archive_after_days назад). Каждая пачка - отдельная задача записи,
+    поэтому записи пациентов не ждут конца всего переноса. Возвращает число перенесённых приёмов
+    """
+    conf = get_config()
+    if older_than is None:
+        if conf.archive_after_days <= 0:
+            return 0
+        older_than = datetime.now() - timedelta(days=conf.archive_after_days)
+    batch_size = batch_size or conf.archive_batch_size
+    if batch_size <= 0:
+        raise ServiceError("Размер пачки архивации должен быть больше нуля")
+
+    cutoff_ts = to_epoch(older_than)
+    total = 0
+    while True:
+        moved = await _archive_batch(cutoff_ts, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
@@ -0,0 +1,65 @@
+"""Чтения администратора сразу по всем филиалам сети"""
+import asyncio
+import heapq
+from datetime import datetime
+from typing import Any, Awaitable, Callable, TypeVar
+
+from src.service.database.actions.actions import (
+    AppointmentSummary,
+    DoctorView,
+    _summaries,
+    _summary_query,
+    get_doctors,
+    reaches_archive,
+)
+from src.service.database.core.database import branch_ids, get_read_db, use_branch
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import Appointment, AppointmentArchive
+from src.service.exeptions import ServiceError
+from src.service.utils.epoch import to_epoch
+
+T = TypeVar("T")
+
+
+async def fan_out(read: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> dict[int | None, T]:
+    """Выполняет чтение в базе каждого филиала одновременно. Возвращает результаты по id филиала"""
+    branches = branch_ids()
+
+    async def on_branch(branch_id: int | None) -> T:
+        with use_branch(branch_id):
+            return await read(*args, **kwargs)
+
+    results = await asyncio.gather(*(on_branch(branch_id) for branch_id in branches))
+    return dict(zip(branches, results))
+
+
+async def get_doctors_all_branches() -> list[DoctorView]:
+    """Врачи всех филиалов по ФИО: списки филиалов уже отсортированы и только сливаются"""
+    by_branch = await fan_out(get_doctors)
+    return list(heapq.merge(*by_branch.values(), key=lambda doctor: doctor.fio))
+
+
+@retry_on_lock
+async def _appointments_in_range(date_from: datetime, date_to: datetime) -> list[AppointmentSummary]:
+    def in_range(model):
+        return _summary_query(model).where(
+            model.start_ts >= to_epoch(date_from),
+            model.start_ts < to_epoch(date_to),
+        )
+
+    async with get_read_db() as db:
+        rows = (await db.execute(in_range(Appointment))).all()
+        # старые завершённые и отменённые приёмы уже перенесены в архив
+        if await reaches_archive(db, date_from):
+            archived = (await db.execute(in_range(AppointmentArchive))).all()
+            rows = list(heapq.merge(archived, rows, key=lambda row: row.datetime))
+        return _summaries(rows)
+
+
+async def get_appointments_all_branches(date_from: datetime, date_to: datetime) -> list[AppointmentSummary]:
+    """Приёмы всех филиалов из [date_from, date_to) по времени начала, вместе с архивом"""
+    if date_to <= date_from:
+        raise ServiceError("Дата окончания раньше даты начала")
+
+    by_branch = await fan_out(_appointments_in_range, date_from, date_to)
+    return list(heapq.merge(*by_branch.values(), key=lambda appointment: appointment.dt))
@@ -0,0 +1,174 @@
+import asyncio
+import csv
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_config
+from src.service.database.actions.actions import hash_password
+from src.service.database.actions.schedule import schedule_changed
+from src.service.database.core.database import submit_write
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import Doctor, Patient, StorageStatus, User
+from src.service.exeptions import ServiceError
+
+IMPORT_COLUMNS = ("role", "login", "password", "fio", "specialization", "phone")
+
+_ROLES = {"doctor": StorageStatus.DOCTOR, "patient": StorageStatus.PATIENT}
+# без чего строку нельзя создать, кроме login, password и fio
+_ROLE_FIELDS = {StorageStatus.DOCTOR: "specialization", StorageStatus.PATIENT: "phone"}
+_HASH_CHUNK = 64
+
+
+@dataclass(slots=True, frozen=True)
+class ImportRowError:
+    line: int
+    login: str
+    message: str
+
+
+@dataclass(slots=True)
+class ImportReport:
+    doctors: int = 0
+    patients: int = 0
+    errors: list[ImportRowError] = field(default_factory=list)
+    rows: int = 0
+    elapsed: float = 0.0
+    hash_elapsed: float = 0.0  # из elapsed: хэширование паролей
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+@dataclass(slots=True)
+class _ImportRow:
+    line: int
+    role: StorageStatus
+    login: str
+    password: str
+    fio: str
+    extra: str  # специализация врача или телефон пациента
+
+
+def _read_rows(source: Path) -> tuple[list[_ImportRow], list[ImportRowError], int]:
+    """Проверяет файл целиком до записи: в базу попадают только строки без ошибок"""
+    rows, errors, seen = [], [], {}
+    with source.open(encoding="utf-8-sig", newline="") as file:
+        reader = csv.DictReader(file)
+        missing = [column for column in ("role", "login", "password", "fio") if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ServiceError(f"В файле нет колонок: {', '.join(missing)}")
+
+        total = 0
+        for total, raw in enumerate(reader, start=1):
+            line = reader.line_num
+            values = {column: (raw.get(column) or "").strip() for column in IMPORT_COLUMNS}
+            login = values["login"]
+
+            role = _ROLES.get(values["role"].lower())
+            if role is None:
+                errors.append(ImportRowError(line, login, "Неизвестная роль"))
+                continue
+            extra = values[_ROLE_FIELDS[role]]
+            if not login or not values["password"] or not values["fio"] or not extra:
+                errors.append(ImportRowError(line, login, "Переданы не все данные"))
+                continue
+            if login in seen:
+                errors.append(ImportRowError(line, login, f"Логин повторяется в строке {seen[login]}"))
+                continue
+
+            seen[login] = line
+            rows.append(_ImportRow(line, role, login, values["password"], values["fio"], extra))
+
+    return rows, errors, total
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    return [hash_password(password) for password in passwords]
+
+
+async def _hash_passwords(rows: list[_ImportRow]) -> list[str]:
+    """
+    PBKDF2 - самая дорогая часть импорта. hashlib отпускает GIL на время расчёта,
+    поэтому пачки паролей в пуле потоков считаются на всех ядрах параллельно
+    """
+    workers = get_config().import_hash_workers or os.cpu_count() or 1
+    loop = asyncio.get_running_loop()
+    chunks = [[row.password for row in rows[i:i + _HASH_CHUNK]] for i in range(0, len(rows), _HASH_CHUNK)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        hashed = await asyncio.gather(*(loop.run_in_executor(pool, _hash_many, chunk) for chunk in chunks))
+    return [password for chunk in hashed for password in chunk]
+
+
+async def _insert_batch(db: AsyncSession, batch: list[tuple[_ImportRow, str]]) -> tuple[int, int, list[ImportRowError]]:
+    # очередь записи выполняет задания по одному, поэтому между проверкой и вставкой логин никто не займёт
+    taken = set(
+        (await db.execute(select(User.login).where(User.login.in_([row.login for row, _ in batch])))).scalars()
+    )
+    errors = [ImportRowError(row.line, row.login, "Логин уже занят") for row, _ in batch if row.login in taken]
+    fresh = [(row, password) for row, password in batch if row.login not in taken]
+    if not fresh:
+        return 0, 0, errors
+
+    users = User.__table__
+    result = await db.execute(
+        insert(users).returning(users.c.id, sort_by_parameter_order=True),
+        [{"login": row.login, "password": password, "role": row.role} for row, password in fresh],
+    )
+    user_ids = result.scalars().all()
+
+    doctors = [
+        {"user_id": user_id, "fio": row.fio, "specialization": row.extra}
+        for (row, _), user_id in zip(fresh, user_ids)
+        if row.role == StorageStatus.DOCTOR
+    ]
+    patients = [
+        {"user_id": user_id, "fio": row.fio, "phone": row.extra}
+        for (row, _), user_id in zip(fresh, user_ids)
+        if row.role == StorageStatus.PATIENT
+    ]
+    if doctors:
+        await db.execute(insert(Doctor.__table__), doctors)
+    if patients:
+        await db.execute(insert(Patient.__table__), patients)
+    return len(doctors), len(patients), errors
+
+
+@retry_on_lock
+async def _write_batch(batch: list[tuple[_ImportRow, str]]) -> tuple[int, int, list[ImportRowError]]:
+    """Пачка пишется одной транзакцией, поэтому при блокировке её можно безопасно повторить"""
+    return await submit_write(_insert_batch, batch)
+
+
+async def import_people_csv(source: Path) -> ImportReport:
+    """
+    Массовое создание врачей и пациентов из CSV с колонками role, login, password, fio,
+    specialization (для врачей) и phone (для пациентов). Ошибочные строки пропускаются
+    и попадают в отчёт, остальные записываются пачками по import_batch_size строк в транзакции
+    """
+    started = time.perf_counter()
+    rows, errors, total = await asyncio.to_thread(_read_rows, source)
+    report = ImportReport(errors=errors, rows=total)
+
+    hash_started = time.perf_counter()
+    passwords = await _hash_passwords(rows)
+    report.hash_elapsed = time.perf_counter() - hash_started
+    pairs = list(zip(rows, passwords))
+    batch_size = get_config().import_batch_size
+    for i in range(0, len(pairs), batch_size):
+        doctors, patients, batch_errors = await _write_batch(pairs[i:i + batch_size])
+        report.doctors += doctors
+        if doctors:
+            schedule_changed()
+        report.patients += patients
+        report.errors.extend(batch_errors)
+
+    report.errors.sort(key=lambda error: error.line)
+    report.elapsed = time.perf_counter() - started
+    return report
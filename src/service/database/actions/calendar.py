@@ -0,0 +1,110 @@
+"""Календарь приёмов: число приёмов по дням месяца одним GROUP BY и список приёмов выбранного дня"""
+import heapq
+from collections import Counter
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.service.database.actions.actions import (
+    AppointmentSummary,
+    SessionContext,
+    _check_session,
+    _on_session_branch,
+    _session_doctor_id,
+    _session_patient_id,
+    _summaries,
+    _summary_query,
+    reaches_archive,
+)
+from src.service.database.core.database import get_read_db
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import Appointment, AppointmentArchive, AppointmentStatus, StorageStatus
+from src.service.exeptions import ServiceError
+from src.service.utils.epoch import SECONDS_PER_DAY, from_epoch_day, to_epoch
+
+
+@dataclass(slots=True, frozen=True)
+class CalendarDay:
+    day: date
+    # приёмы дня без отменённых
+    count: int
+
+
+def _owner(session: SessionContext):
+    """
+    Условие на приёмы пользователя для Appointment или AppointmentArchive;
+    у администратора - все приёмы филиала
+    """
+    _check_session(session)
+    if session.role == StorageStatus.DOCTOR:
+        doctor_id = _session_doctor_id(session)
+        return lambda model: model.doctor_id == doctor_id
+    if session.role == StorageStatus.PATIENT:
+        patient_id = _session_patient_id(session)
+        return lambda model: model.patient_id == patient_id
+    return None
+
+
+async def _sources(db: AsyncSession, start: datetime) -> tuple:
+    """Архив читается, только если в нём могут быть приёмы запрошенного периода"""
+    return (Appointment, AppointmentArchive) if await reaches_archive(db, start) else (Appointment,)
+
+
+def month_bounds(year: int, month: int) -> tuple[date, date]:
+    """Первый день месяца и первый день следующего"""
+    if not 1 <= month <= 12:
+        raise ServiceError("Некорректный месяц")
+    first = date(year, month, 1)
+    return first, (first + timedelta(days=31)).replace(day=1)
+
+
+@_on_session_branch
+@retry_on_lock
+async def get_calendar_month(session: SessionContext, year: int, month: int) -> list[CalendarDay]:
+    """
+    Число приёмов по дням месяца. Группировка идёт по номеру дня start_ts // 86400 внутри
+    диапазона по индексу (doctor_id, start_ts) или (patient_id, start_ts). Дни без приёмов не возвращаются
+    """
+    owner = _owner(session)
+    first, after_last = month_bounds(year, month)
+    start = datetime.combine(first, time.min)
+
+    counts = Counter()
+    async with get_read_db() as db:
+        for model in await _sources(db, start):
+            day_number = model.start_ts // SECONDS_PER_DAY
+            query = (
+                select(day_number, func.count())
+                .where(
+                    model.start_ts >= to_epoch(start),
+                    model.start_ts < to_epoch(datetime.combine(after_last, time.min)),
+                    model.status != AppointmentStatus.CANCELLED,
+                )
+                .group_by(day_number)
+            )
+            if owner is not None:
+                query = query.where(owner(model))
+            counts.update(dict((await db.execute(query)).all()))
+
+    return [CalendarDay(from_epoch_day(number), count) for number, count in sorted(counts.items())]
+
+
+@_on_session_branch
+@retry_on_lock
+async def get_calendar_day(session: SessionContext, day: date) -> list[AppointmentSummary]:
+    """Приёмы пользователя за день, включая отменённые, по времени начала"""
+    owner = _owner(session)
+    start = datetime.combine(day, time.min)
+    start_ts = to_epoch(start)
+
+    parts = []
+    async with get_read_db() as db:
+        for model in await _sources(db, start):
+            query = _summary_query(model).where(model.start_ts >= start_ts, model.start_ts < start_ts + SECONDS_PER_DAY)
+            if owner is not None:
+                query = query.where(owner(model))
+            parts.append((await db.execute(query)).all())
+
+    return _summaries(list(heapq.merge(*parts, key=lambda row: row.datetime)))
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import delete, distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.service.database.actions.actions import (
+    AppointmentSummary,
+    SessionContext,
+    _check_session,
+    _on_session_branch,
+    _session_doctor_id,
+    _session_patient_id,
+    _summaries,
+    _summary_query,
+)
+from src.service.database.core.database import get_read_db, submit_write
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import Appointment, AppointmentArchive, AppointmentChange, StorageStatus
+from src.service.utils.epoch import to_epoch
+
+
+@dataclass(slots=True, frozen=True)
+class AppointmentDelta:
+    """
+    Изменения приёмов после номера since. Перенесённые в архив приёмы приходят в changed,
+    в removed - удалённые совсем. reset - часть журнала уже очищена и список нужно загрузить заново
+    """
+    seq: int
+    changed: list[AppointmentSummary]
+    removed: list[int]
+    reset: bool = False
+
+
+@retry_on_lock
+async def get_change_seq() -> int:
+    """Номер последнего изменения приёмов: с него начинается опрос журнала"""
+    async with get_read_db() as db:
+        return (await db.execute(select(func.max(AppointmentChange.id)))).scalar_one() or 0
+
+
+@_on_session_branch
+@retry_on_lock
+async def get_appointment_changes(session: SessionContext, since: int) -> AppointmentDelta:
+    """
+    Приёмы пользователя, изменившиеся после номера since.
+    Если изменений нет, выполняется только чтение максимального номера по первичному ключу
+    """
+    _check_session(session)
+    if session.role == StorageStatus.DOCTOR:
+        owner = AppointmentChange.doctor_id == _session_doctor_id(session)
+    elif session.role == StorageStatus.PATIENT:
+        owner = AppointmentChange.patient_id == _session_patient_id(session)
+    else:
+        owner = None
+
+    async with get_read_db() as db:
+        # min и max отдельными запросами: каждый из них SQLite берёт с края индекса, а вместе - полным проходом
+        newest = (await db.execute(select(func.max(AppointmentChange.id)))).scalar_one()
+        if newest is None or newest <= since:
+            return AppointmentDelta(since, [], [])
+        oldest = (await db.execute(select(func.min(AppointmentChange.id)))).scalar_one()
+        if since < oldest - 1:
+            return AppointmentDelta(newest, [], [], reset=True)
+
+        changed_ids = (
+            select(distinct(AppointmentChange.appointment_id))
+            .where(AppointmentChange.id > since, AppointmentChange.id <= newest)
+        )
+        if owner is not None:
+            changed_ids = changed_ids.where(owner)
+        ids = list((await db.execute(changed_ids)).scalars())
+        if not ids:
+            return AppointmentDelta(newest, [], [])
+
+        changed = _summaries((await db.execute(_summary_query().where(Appointment.id.in_(ids)))).all())
+        present = {appointment.id for appointment in changed}
+        missing = [a_id for a_id in ids if a_id not in present]
+        if missing:
+            archived = await db.execute(_summary_query(AppointmentArchive).where(AppointmentArchive.id.in_(missing)))
+            changed += _summaries(archived.all())
+
+    present = {appointment.id for appointment in changed}
+    return AppointmentDelta(newest, changed, [a_id for a_id in ids if a_id not in present])
+
+
+@retry_on_lock
+async def prune_appointment_changes(older_than: datetime) -> int:
+    """Удаляет из журнала записи старше older_than; последняя запись остаётся, чтобы номер не сбросился"""
+
+    async def job(db: AsyncSession) -> int:
+        newest = (await db.execute(select(func.max(AppointmentChange.id)))).scalar_one()
+        if newest is None:
+            return 0
+        result = await db.execute(
+            delete(AppointmentChange).where(
+                AppointmentChange.changed_ts < to_epoch(older_than),
+                AppointmentChange.id < newest,
+            )
+        )
+        return result.rowcount
+
+    return await submit_write(job)
@@ -0,0 +1,148 @@
+import sys
+from array import array
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from sqlalchemy import Select, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.service.database.actions.actions import AppointmentSummary, reaches_archive
+from src.service.database.core.database import get_read_db
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import Appointment, AppointmentArchive, AppointmentStatus, Doctor, Patient
+from src.service.utils.epoch import from_epoch, to_epoch
+
+_CHUNK = 10_000
+
+
+@dataclass(slots=True)
+class AppointmentColumns:
+    """
+    Приёмы по столбцам для массовой обработки (выгрузка, статистика).
+    Числа лежат в array('q') по 8 байт без отдельных объектов, одинаковые ФИО - одна и та же строка
+    """
+    ids: array = field(default_factory=lambda: array("q"))
+    doctor_ids: array = field(default_factory=lambda: array("q"))
+    start_ts: array = field(default_factory=lambda: array("q"))
+    end_ts: array = field(default_factory=lambda: array("q"))
+    doctor_fio: list[str] = field(default_factory=list)
+    patient_fio: list[str] = field(default_factory=list)
+    status: list[AppointmentStatus] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def append(
+        self,
+        appointment_id: int,
+        doctor_id: int,
+        start_ts: int,
+        end_ts: int,
+        doctor_fio: str,
+        patient_fio: str,
+        status: AppointmentStatus,
+    ) -> None:
+        self.ids.append(appointment_id)
+        self.doctor_ids.append(doctor_id)
+        self.start_ts.append(start_ts)
+        self.end_ts.append(end_ts)
+        self.doctor_fio.append(sys.intern(doctor_fio))
+        self.patient_fio.append(sys.intern(patient_fio))
+        self.status.append(status)
+
+    def extend(self, other: "AppointmentColumns") -> None:
+        self.ids.extend(other.ids)
+        self.doctor_ids.extend(other.doctor_ids)
+        self.start_ts.extend(other.start_ts)
+        self.end_ts.extend(other.end_ts)
+        self.doctor_fio.extend(other.doctor_fio)
+        self.patient_fio.extend(other.patient_fio)
+        self.status.extend(other.status)
+
+    def summary(self, index: int) -> AppointmentSummary:
+        return AppointmentSummary(
+            id=self.ids[index],
+            doctor_fio=self.doctor_fio[index],
+            patient_fio=self.patient_fio[index],
+            dt=from_epoch(self.start_ts[index]),
+            status=self.status[index],
+        )
+
+
+def _range_select(model, doctor_id: int | None, date_from: datetime | None, date_to: datetime | None, notes: bool):
+    columns = [
+        model.id.label("id"),
+        model.doctor_id.label("doctor_id"),
+        Doctor.fio.label("doctor_fio"),
+        model.patient_id.label("patient_id"),
+        Patient.fio.label("patient_fio"),
+        model.start_ts.label("start_ts"),
+        model.end_ts.label("end_ts"),
+        model.status.label("status"),
+    ]
+    if notes:
+        columns += [
+            model.complaint.label("complaint"),
+            model.condition.label("condition"),
+            model.conclusion.label("conclusion"),
+        ]
+    query = (
+        select(*columns)
+        .join(Doctor, Doctor.id == model.doctor_id)
+        .join(Patient, Patient.id == model.patient_id)
+    )
+    if doctor_id is not None:
+        query = query.where(model.doctor_id == doctor_id)
+    if date_from is not None:
+        query = query.where(model.start_ts >= to_epoch(date_from))
+    if date_to is not None:
+        query = query.where(model.start_ts < to_epoch(date_to))
+    return query
+
+
+async def _range_query(
+    db: AsyncSession,
+    doctor_id: int | None,
+    date_from: datetime | None,
+    date_to: datetime | None,
+    notes: bool = False,
+) -> Select:
+    """
+    Приёмы из [date_from, date_to) по времени начала для выгрузки и столбцов; notes добавляет заметки врача.
+    Если период достаёт до архива, к рабочей таблице добавляется AppointmentArchive
+    """
+    hot = _range_select(Appointment, doctor_id, date_from, date_to, notes)
+    if not await reaches_archive(db, date_from):
+        return hot.order_by(Appointment.start_ts.asc(), Appointment.id.asc())
+
+    combined = union_all(hot, _range_select(AppointmentArchive, doctor_id, date_from, date_to, notes)).subquery()
+    return select(combined).order_by(combined.c.start_ts.asc(), combined.c.id.asc())
+
+
+async def iter_appointment_columns(
+    doctor_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+    chunk_size: int = _CHUNK,
+) -> AsyncIterator[AppointmentColumns]:
+    """Приёмы из [date_from, date_to), включая архив, пачками по chunk_size строк; курсор читается по мере обработки"""
+    async with get_read_db() as db:
+        result = await db.stream(await _range_query(db, doctor_id, date_from, date_to))
+        async for rows in result.partitions(chunk_size):
+            chunk = AppointmentColumns()
+            for row in rows:
+                chunk.append(row.id, row.doctor_id, row.start_ts, row.end_ts, row.doctor_fio, row.patient_fio, row.status)
+            yield chunk
+
+
+@retry_on_lock
+async def fetch_appointment_columns(
+    doctor_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> AppointmentColumns:
+    columns = AppointmentColumns()
+    async for chunk in iter_appointment_columns(doctor_id, date_from, date_to):
+        columns.extend(chunk)
+    return columns
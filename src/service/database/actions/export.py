@@ -0,0 +1,100 @@
+import asyncio
+import csv
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Sequence, TextIO
+
+from sqlalchemy import Row
+
+from src.config import get_config
+from src.service.database.actions.columnar import _range_query
+from src.service.database.core.database import get_read_db
+from src.service.database.core.retry import retry_on_lock
+from src.service.exeptions import ServiceError
+from src.service.utils.epoch import from_epoch
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+_FIELDS = (
+    "id",
+    "doctor_id",
+    "doctor_fio",
+    "patient_id",
+    "patient_fio",
+    "start",
+    "end",
+    "status",
+    "complaint",
+    "condition",
+    "conclusion",
+)
+
+
+def _values(row: Row) -> tuple:
+    a_id, doctor_id, doctor_fio, patient_id, patient_fio, start_ts, end_ts, status, complaint, condition, conclusion = row
+    return (
+        a_id,
+        doctor_id,
+        doctor_fio,
+        patient_id,
+        patient_fio,
+        from_epoch(start_ts).isoformat(),
+        from_epoch(end_ts).isoformat(),
+        status.value,
+        complaint or "",
+        condition or "",
+        conclusion or "",
+    )
+
+
+def _csv_writer(file: TextIO) -> Callable[[Sequence[Row]], None]:
+    writer = csv.writer(file)
+    writer.writerow(_FIELDS)
+
+    def write(rows: Sequence[Row]) -> None:
+        writer.writerows(_values(row) for row in rows)
+
+    return write
+
+
+def _jsonl_writer(file: TextIO) -> Callable[[Sequence[Row]], None]:
+    def write(rows: Sequence[Row]) -> None:
+        file.writelines(json.dumps(dict(zip(_FIELDS, _values(row))), ensure_ascii=False) + "\n" for row in rows)
+
+    return write
+
+
+@retry_on_lock
+async def export_appointments(
+    destination: Path,
+    fmt: str = "csv",
+    doctor_id: int | None = None,
+    date_from: datetime | None = None,
+    date_to: datetime | None = None,
+) -> int:
+    """
+    Выгружает приёмы из [date_from, date_to), включая архивные, в CSV или JSONL и возвращает число строк.
+    Строки читаются курсором пачками по export_chunk_size, поэтому память не зависит от размера таблицы.
+    Файл пишется рядом под временным именем и появляется только целиком
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ServiceError("Неизвестный формат выгрузки")
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    partial = destination.with_name(destination.name + ".part")
+    written = 0
+    try:
+        with partial.open("w", encoding="utf-8", newline="") as file:
+            write = _csv_writer(file) if fmt == "csv" else _jsonl_writer(file)
+            async with get_read_db() as db:
+                result = await db.stream(await _range_query(db, doctor_id, date_from, date_to, notes=True))
+                async for rows in result.partitions(get_config().export_chunk_size):
+                    # запись на диск идёт в отдельном потоке и не блокирует цикл событий
+                    await asyncio.to_thread(write, rows)
+                    written += len(rows)
+        partial.replace(destination)
+    finally:
+        partial.unlink(missing_ok=True)
+
+    return written
@@ -0,0 +1,99 @@
+"""
+Закрытие прошедших приёмов, которые врач так и не отметил: они остаются в статусе SCHEDULED,
+попадают в «Будущие приёмы» и в проверки занятости. Перевод идёт пачками по индексу (status, start_ts)
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_config
+from src.service.database.actions.actions import log_appointment_changes
+from src.service.database.actions.stats import record_stats_changes
+from src.service.database.core.database import submit_write
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import Appointment, AppointmentStatus, Slot
+from src.service.exeptions import ServiceError
+from src.service.utils.epoch import to_epoch
+
+
+def past_due_status() -> AppointmentStatus | None:
+    """Статус для прошедших приёмов из Config.past_due_status; None - закрытие выключено"""
+    value = get_config().past_due_status
+    if not value:
+        return None
+    try:
+        status = AppointmentStatus(value)
+    except ValueError:
+        raise ServiceError(f"Неизвестный статус приёма: {value}")
+    if status == AppointmentStatus.SCHEDULED:
+        raise ServiceError("Прошедшие приёмы нельзя оставлять запланированными")
+    return status
+
+
+@retry_on_lock
+async def _close_batch(cutoff_ts: int, status: AppointmentStatus, batch_size: int) -> int:
+    async def job(db: AsyncSession) -> int:
+        # status = scheduled и start_ts < cutoff - один диапазон индекса ix_appointment_status_start_ts
+        rows = (
+            await db.execute(
+                select(Appointment.id, Appointment.doctor_id, Appointment.start_ts)
+                .where(Appointment.start_ts < cutoff_ts, Appointment.status == AppointmentStatus.SCHEDULED)
+                .order_by(Appointment.start_ts)
+                .limit(batch_size)
+            )
+        ).all()
+        if not rows:
+            return 0
+
+        ids = [row.id for row in rows]
+        await db.execute(
+            update(Appointment)
+            .where(Appointment.id.in_(ids))
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+        await log_appointment_changes(db, ids)
+        await record_stats_changes(
+            db, [(row.doctor_id, row.start_ts, AppointmentStatus.SCHEDULED, status) for row in rows]
+        )
+        if status == AppointmentStatus.CANCELLED:
+            await db.execute(
+                update(Slot)
+                .where(Slot.appointment_id.in_(ids))
+                .values(appointment_id=None)
+                .execution_options(synchronize_session=False)
+            )
+        return len(ids)
+
+    return await submit_write(job)
+
+
+async def close_past_due_appointments(
+    before: datetime | None = None,
+    status: AppointmentStatus | None = None,
+    batch_size: int | None = None,
+) -> int:
+    """
+    Переводит запланированные приёмы, начавшиеся раньше before (по умолчанию - past_due_after_hours назад),
+    в статус status (по умолчанию - past_due_status). Каждая пачка - отдельная задача записи.
+    Возвращает число закрытых приёмов
+    """
+    conf = get_config()
+    status = status or past_due_status()
+    if status is None:
+        return 0
+    if status == AppointmentStatus.SCHEDULED:
+        raise ServiceError("Прошедшие приёмы нельзя оставлять запланированными")
+    before = before or datetime.now() - timedelta(hours=conf.past_due_after_hours)
+    batch_size = batch_size or conf.past_due_batch_size
+    if batch_size <= 0:
+        raise ServiceError("Размер пачки должен быть больше нуля")
+
+    cutoff_ts = to_epoch(before)
+    total = 0
+    while True:
+        closed = await _close_batch(cutoff_ts, status, batch_size)
+        total += closed
+        if closed < batch_size:
+            return total
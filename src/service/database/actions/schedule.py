@@ -0,0 +1,284 @@
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import bindparam, delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import get_config
+from src.service.database.core.database import get_read_db, submit_write
+from src.service.database.core.dialect import insert_ignore
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import (
+    Appointment,
+    AppointmentStatus,
+    Doctor,
+    DoctorSchedule,
+    ScheduleException,
+    Slot,
+)
+from src.service.exeptions import ServiceError
+from src.service.utils.epoch import to_epoch
+
+# начало, конец и длина слота в минутах
+WorkWindow = tuple[datetime, datetime, int]
+DayPart = tuple[time, time, int]
+
+_INSERT_CHUNK = 5_000
+
+# растёт при изменении врачей и расписаний в этом процессе: от них зависит рабочее время в аналитике
+_schedule_version = 0
+
+
+@dataclass(slots=True, frozen=True)
+class ScheduleView:
+    weekday: int
+    start_time: time
+    end_time: time
+    slot_minutes: int
+
+
+def schedule_version() -> int:
+    return _schedule_version
+
+
+def schedule_changed() -> None:
+    """Вызывается после записи, изменившей состав врачей или их часы приёма"""
+    global _schedule_version
+    _schedule_version += 1
+
+
+def _default_template() -> dict[int, list[DayPart]]:
+    conf = get_config()
+    return {
+        weekday: [(conf.work_day_start, conf.work_day_end, conf.slot_minutes)]
+        for weekday in conf.working_weekdays
+    }
+
+
+def build_windows(
+    template: dict[int, list[DayPart]],
+    exceptions: dict[date, list[DayPart | None]],
+    date_from: date,
+    date_to: date,
+) -> list[WorkWindow]:
+    """Рабочие окна врача по дням, отсортированные по началу. Исключение на дату заменяет шаблон"""
+    windows = []
+    day = date_from
+    while day <= date_to:
+        if day in exceptions:
+            parts = [part for part in exceptions[day] if part is not None]
+        else:
+            parts = template.get(day.weekday(), [])
+
+        for start, end, slot_minutes in sorted(parts):
+            windows.append((datetime.combine(day, start), datetime.combine(day, end), slot_minutes))
+        day += timedelta(days=1)
+    return windows
+
+
+async def load_windows(
+    db: AsyncSession,
+    doctor_ids: list[int],
+    date_from: date,
+    date_to: date,
+) -> dict[int, list[WorkWindow]]:
+    """Рабочие окна для нескольких врачей: шаблоны и исключения читаются двумя запросами"""
+    templates: dict[int, dict[int, list[DayPart]]] = {}
+    result = await db.execute(select(DoctorSchedule).where(DoctorSchedule.doctor_id.in_(doctor_ids)))
+    for row in result.scalars():
+        templates.setdefault(row.doctor_id, {}).setdefault(row.weekday, []).append(
+            (row.start_time, row.end_time, row.slot_minutes)
+        )
+
+    exceptions: dict[int, dict[date, list[DayPart | None]]] = {}
+    result = await db.execute(
+        select(ScheduleException).where(
+            ScheduleException.doctor_id.in_(doctor_ids),
+            ScheduleException.day >= date_from,
+            ScheduleException.day <= date_to,
+        )
+    )
+    conf = get_config()
+    for row in result.scalars():
+        part = None
+        if row.start_time is not None and row.end_time is not None:
+            part = (row.start_time, row.end_time, row.slot_minutes or conf.slot_minutes)
+        exceptions.setdefault(row.doctor_id, {}).setdefault(row.day, []).append(part)
+
+    default = _default_template()
+    return {
+        doctor_id: build_windows(templates.get(doctor_id, default), exceptions.get(doctor_id, {}), date_from, date_to)
+        for doctor_id in doctor_ids
+    }
+
+
+@retry_on_lock
+async def get_doctor_schedule(doctor_id: int) -> list[ScheduleView]:
+    async with get_read_db() as db:
+        result = await db.execute(
+            select(DoctorSchedule)
+            .where(DoctorSchedule.doctor_id == doctor_id)
+            .order_by(DoctorSchedule.weekday, DoctorSchedule.start_time)
+        )
+        return [
+            ScheduleView(
+                weekday=row.weekday,
+                start_time=row.start_time,
+                end_time=row.end_time,
+                slot_minutes=row.slot_minutes,
+            )
+            for row in result.scalars()
+        ]
+
+
+@retry_on_lock
+async def set_weekly_schedule(doctor_id: int, entries: list[ScheduleView]) -> None:
+    """
+    Заменяет недельный шаблон врача. Будущие свободные слоты по старому шаблону удаляются:
+    до следующей нарезки свободное время считается по новому шаблону, занятые слоты остаются
+    """
+    for entry in entries:
+        if not 0 <= entry.weekday <= 6 or entry.start_time >= entry.end_time or entry.slot_minutes <= 0:
+            raise ServiceError("Некорректные часы приёма")
+
+    async def job(db: AsyncSession) -> None:
+        if await db.get(Doctor, doctor_id) is None:
+            raise ServiceError("Врач не найден")
+
+        await db.execute(delete(DoctorSchedule).where(DoctorSchedule.doctor_id == doctor_id))
+        db.add_all(
+            DoctorSchedule(
+                doctor_id=doctor_id,
+                weekday=entry.weekday,
+                start_time=entry.start_time,
+                end_time=entry.end_time,
+                slot_minutes=entry.slot_minutes,
+            )
+            for entry in entries
+        )
+        await db.execute(
+            delete(Slot).where(
+                Slot.doctor_id == doctor_id,
+                Slot.start >= datetime.now(),
+                Slot.appointment_id.is_(None),
+            )
+        )
+
+    await submit_write(job)
+    schedule_changed()
+
+
+@retry_on_lock
+async def add_schedule_exception(
+    doctor_id: int,
+    day: date,
+    start_time: time | None = None,
+    end_time: time | None = None,
+    slot_minutes: int | None = None,
+) -> None:
+    """Особые часы приёма на дату; без времени - выходной. Свободные слоты этого дня убираются"""
+    if (start_time is None) != (end_time is None) or (start_time is not None and start_time >= end_time):
+        raise ServiceError("Некорректные часы приёма")
+
+    async def job(db: AsyncSession) -> None:
+        if await db.get(Doctor, doctor_id) is None:
+            raise ServiceError("Врач не найден")
+
+        db.add(
+            ScheduleException(
+                doctor_id=doctor_id,
+                day=day,
+                start_time=start_time,
+                end_time=end_time,
+                slot_minutes=slot_minutes,
+            )
+        )
+        # незанятые слоты дня пересоздаст следующая нарезка уже по исключению
+        await db.execute(
+            delete(Slot).where(
+                Slot.doctor_id == doctor_id,
+                Slot.start >= datetime.combine(day, time.min),
+                Slot.start < datetime.combine(day + timedelta(days=1), time.min),
+                Slot.appointment_id.is_(None),
+            )
+        )
+
+    await submit_write(job)
+    schedule_changed()
+
+
+async def materialize_slots(weeks: int, date_from: date | None = None, batch_doctors: int = 50) -> int:
+    """
+    Нарезает слоты приёма на weeks недель вперёд для всех врачей.
+    Врачи обрабатываются пачками, каждая пачка - отдельная транзакция с пакетной вставкой,
+    чтобы между пачками могли проходить обычные записи. Повторный запуск не создаёт дублей.
+    Возвращает число созданных слотов
+    """
+    date_from = date_from or date.today()
+    date_to = date_from + timedelta(weeks=weeks) - timedelta(days=1)
+
+    async with get_read_db() as db:
+        doctor_ids = list((await db.execute(select(Doctor.id).order_by(Doctor.id))).scalars())
+
+    created = 0
+    for i in range(0, len(doctor_ids), batch_doctors):
+        created += await _materialize_chunk(doctor_ids[i:i + batch_doctors], date_from, date_to)
+    return created
+
+
+@retry_on_lock
+async def _materialize_chunk(doctor_ids: list[int], date_from: date, date_to: date) -> int:
+    async with get_read_db() as db:
+        windows = await load_windows(db, doctor_ids, date_from, date_to)
+
+    rows = []
+    for doctor_id, doctor_windows in windows.items():
+        for window_start, window_end, slot_minutes in doctor_windows:
+            step = timedelta(minutes=slot_minutes)
+            start = window_start
+            while start + step <= window_end:
+                rows.append({"doctor_id": doctor_id, "start": start, "end": start + step})
+                start += step
+
+    range_start = datetime.combine(date_from, time.min)
+    range_end = datetime.combine(date_to + timedelta(days=1), time.min)
+
+    async def job(db: AsyncSession) -> int:
+        inserted = 0
+        statement = insert_ignore(db, Slot.__table__, ["doctor_id", "start"])
+        for i in range(0, len(rows), _INSERT_CHUNK):
+            result = await db.execute(statement, rows[i:i + _INSERT_CHUNK])
+            inserted += max(result.rowcount, 0)
+
+        # слоты, пересекающиеся с уже существующими записями, сразу считаются занятыми
+        max_length = timedelta(minutes=get_config().max_appointment_minutes)
+        earliest = range_start - max_length
+        booked = await db.execute(
+            select(Appointment.id, Appointment.doctor_id, Appointment.datetime, Appointment.end_datetime).where(
+                Appointment.doctor_id.in_(doctor_ids),
+                Appointment.start_ts > to_epoch(earliest),
+                Appointment.start_ts < to_epoch(range_end),
+                Appointment.status != AppointmentStatus.CANCELLED,
+            )
+        )
+        links = [
+            {"b_doctor": d_id, "b_start": start, "b_end": end, "b_from": start - max_length, "b_appointment": a_id}
+            for a_id, d_id, start, end in booked
+        ]
+        if links:
+            slots = Slot.__table__
+            await db.execute(
+                update(slots)
+                .where(
+                    slots.c.doctor_id == bindparam("b_doctor"),
+                    slots.c.start > bindparam("b_from"),
+                    slots.c.start < bindparam("b_end"),
+                    slots.c.end > bindparam("b_start"),
+                    slots.c.appointment_id.is_(None),
+                )
+                .values(appointment_id=bindparam("b_appointment")),
+                links,
+            )
+        return inserted
+
+    return await submit_write(job)
@@ -0,0 +1,102 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select
+
+from src.config import get_config
+from src.service.database.actions.schedule import WorkWindow, load_windows
+from src.service.database.core.database import get_read_db
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import Appointment, AppointmentStatus, Doctor, Slot
+from src.service.exeptions import ServiceError
+from src.service.utils.epoch import from_epoch, to_epoch
+
+Interval = tuple[datetime, datetime] | tuple[int, int]
+
+
+@retry_on_lock
+async def get_free_slots(doctor_id: int, date_from: date, date_to: date) -> list[datetime]:
+    """Свободное время приёма врача с date_from по date_to включительно, по возрастанию"""
+    if date_to < date_from:
+        return []
+
+    now = datetime.now()
+    range_start = max(datetime.combine(date_from, time.min), now)
+    range_end = datetime.combine(date_to + timedelta(days=1), time.min)
+
+    async with get_read_db() as db:
+        if await db.get(Doctor, doctor_id) is None:
+            raise ServiceError("Врач не найден")
+
+        # нарезанные слоты - один диапазонный запрос по индексу (doctor_id, start)
+        result = await db.execute(
+            select(Slot.start, Slot.appointment_id)
+            .where(Slot.doctor_id == doctor_id, Slot.start >= range_start, Slot.start < range_end)
+            .order_by(Slot.start.asc())
+        )
+        materialized = result.all()
+        covered = {start.date() for start, _ in materialized}
+        free = [start for start, appointment_id in materialized if appointment_id is None]
+
+        # дни, которые нарезка ещё не покрыла, считаются по расписанию
+        first_day = max(date_from, now.date())
+        missing = [first_day + timedelta(days=i) for i in range((date_to - first_day).days + 1)]
+        missing = [day for day in missing if day not in covered]
+        if not missing:
+            return free
+
+        windows = (await load_windows(db, [doctor_id], missing[0], missing[-1]))[doctor_id]
+        windows = [window for window in windows if window[0].date() not in covered]
+
+        # диапазонный запрос по индексу (doctor_id, start_ts), записи сразу отсортированы
+        earliest_start = to_epoch(datetime.combine(missing[0], time.min)) - get_config().max_appointment_minutes * 60
+        result = await db.execute(
+            select(Appointment.start_ts, Appointment.end_ts)
+            .where(
+                Appointment.doctor_id == doctor_id,
+                Appointment.start_ts > earliest_start,
+                Appointment.start_ts < to_epoch(datetime.combine(missing[-1] + timedelta(days=1), time.min)),
+                Appointment.status != AppointmentStatus.CANCELLED,
+            )
+            .order_by(Appointment.start_ts.asc())
+        )
+        booked = [(from_epoch(start), from_epoch(end)) for start, end in merge_intervals(result.all())]
+
+    computed = free_slots(windows, booked, not_before=now)
+    if not free:
+        return computed
+    return sorted(free + computed)
+
+
+def merge_intervals(intervals: list[Interval]) -> list[Interval]:
+    """Сливает отсортированные по началу интервалы в непересекающиеся: их концы тоже идут по возрастанию"""
+    merged: list[Interval] = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_slots(windows: list[WorkWindow], booked: list[Interval], not_before: datetime) -> list[datetime]:
+    """
+    Нарезает рабочие окна на слоты и убирает пересекающиеся с занятыми интервалами.
+    Окна отсортированы, занятые интервалы слиты merge_intervals, поэтому хватает одного прохода двумя указателями.
+    """
+    result = []
+    i = 0
+    for window_start, window_end, slot_minutes in windows:
+        slot = timedelta(minutes=slot_minutes)
+        start = window_start
+        while start + slot <= window_end:
+            end = start + slot
+            # интервалы, закончившиеся до начала слота, больше не понадобятся
+            while i < len(booked) and booked[i][1] <= start:
+                i += 1
+
+            busy = i < len(booked) and booked[i][0] < end
+            if not busy and start >= not_before:
+                result.append(start)
+            start = end
+    return result
@@ -0,0 +1,154 @@
+"""
+Статистика приёмов врачей по дням. Сводка DoctorDailyStats обновляется в задачах записи
+вместе с самими приёмами, а панель администратора читает только её
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import Delete, Insert, case, delete, func, insert, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.service.database.core.database import get_read_db, submit_write
+from src.service.database.core.dialect import insert_or_add
+from src.service.database.core.retry import retry_on_lock
+from src.service.database.models import Appointment, AppointmentArchive, AppointmentStatus, Doctor, DoctorDailyStats
+from src.service.exeptions import ServiceError
+from src.service.utils.epoch import SECONDS_PER_DAY, from_epoch_day, to_epoch_day
+
+_COUNTERS = ["booked", "completed", "cancelled"]
+
+# (doctor_id, start_ts, статус до изменения, статус после); None до - новый приём, None после - удалённый
+StatusChange = tuple[int, int, AppointmentStatus | None, AppointmentStatus | None]
+
+
+@dataclass(slots=True, frozen=True)
+class DoctorStatsView:
+    """Приёмы врача за день, а при day=None - за весь запрошенный период"""
+    doctor_id: int
+    doctor_fio: str
+    day: date | None
+    booked: int
+    completed: int
+    cancelled: int
+
+
+async def record_stats_changes(db: AsyncSession, changes: Iterable[StatusChange]) -> None:
+    """Прибавляет изменения приёмов к сводке одним INSERT ... ON CONFLICT в транзакции задачи записи"""
+    deltas: dict[tuple[int, int], list[int]] = defaultdict(lambda: [0, 0, 0])
+    for doctor_id, start_ts, old, new in changes:
+        if old == new:
+            continue
+        delta = deltas[(doctor_id, start_ts // SECONDS_PER_DAY)]
+        for status, sign in ((old, -1), (new, 1)):
+            if status is None:
+                continue
+            delta[0] += sign
+            if status == AppointmentStatus.COMPLETED:
+                delta[1] += sign
+            elif status == AppointmentStatus.CANCELLED:
+                delta[2] += sign
+
+    rows = [
+        {"doctor_id": doctor_id, "day": day, "booked": booked, "completed": completed, "cancelled": cancelled}
+        for (doctor_id, day), (booked, completed, cancelled) in deltas.items()
+        if booked or completed or cancelled
+    ]
+    if rows:
+        table = DoctorDailyStats.__table__
+        await db.execute(insert_or_add(db, table, ["doctor_id", "day"], _COUNTERS), rows)
+
+
+def stats_rebuild_statements() -> tuple[Delete, Insert]:
+    """Очистка сводки и её пересчёт одним GROUP BY по всем приёмам существующих врачей, включая архив"""
+    appointment = union_all(
+        *(select(model.doctor_id, model.start_ts, model.status) for model in (Appointment, AppointmentArchive))
+    ).subquery()
+    counts = (
+        select(
+            appointment.c.doctor_id,
+            appointment.c.start_ts // SECONDS_PER_DAY,
+            func.count(),
+            func.sum(case((appointment.c.status == AppointmentStatus.COMPLETED, 1), else_=0)),
+            func.sum(case((appointment.c.status == AppointmentStatus.CANCELLED, 1), else_=0)),
+        )
+        .join(Doctor.__table__, Doctor.id == appointment.c.doctor_id)
+        .where(appointment.c.start_ts.is_not(None))
+        .group_by(appointment.c.doctor_id, appointment.c.start_ts // SECONDS_PER_DAY)
+    )
+    table = DoctorDailyStats.__table__
+    return delete(table), insert(table).from_select(["doctor_id", "day", *_COUNTERS], counts)
+
+
+@retry_on_lock
+async def rebuild_doctor_stats() -> int:
+    """Пересчитывает сводку по приёмам и архиву. Возвращает число строк сводки"""
+
+    async def job(db: AsyncSession) -> int:
+        clear, fill = stats_rebuild_statements()
+        await db.execute(clear)
+        await db.execute(fill)
+        return (await db.execute(select(func.count()).select_from(DoctorDailyStats))).scalar_one()
+
+    return await submit_write(job)
+
+
+def _day_range(date_from: date, date_to: date) -> tuple[int, int]:
+    """Номера дней периода; дата окончания включительно"""
+    if date_to < date_from:
+        raise ServiceError("Дата окончания раньше даты начала")
+    return to_epoch_day(date_from), to_epoch_day(date_to)
+
+
+@retry_on_lock
+async def get_doctor_stats_totals(date_from: date, date_to: date) -> list[DoctorStatsView]:
+    """Приёмы каждого врача за период, врачи без приёмов - с нулями. Сортировка по ФИО"""
+    first, last = _day_range(date_from, date_to)
+    async with get_read_db() as db:
+        result = await db.execute(
+            select(
+                Doctor.id,
+                Doctor.fio,
+                func.coalesce(func.sum(DoctorDailyStats.booked), 0),
+                func.coalesce(func.sum(DoctorDailyStats.completed), 0),
+                func.coalesce(func.sum(DoctorDailyStats.cancelled), 0),
+            )
+            .outerjoin(
+                DoctorDailyStats,
+                (DoctorDailyStats.doctor_id == Doctor.id)
+                & (DoctorDailyStats.day >= first)
+                & (DoctorDailyStats.day <= last),
+            )
+            .group_by(Doctor.id, Doctor.fio)
+            .order_by(Doctor.fio)
+        )
+        return [DoctorStatsView(d_id, fio, None, *counts) for d_id, fio, *counts in result.all()]
+
+
+@retry_on_lock
+async def get_doctor_daily_stats(doctor_id: int, date_from: date, date_to: date) -> list[DoctorStatsView]:
+    """Приёмы врача по дням периода; дни без приёмов не возвращаются"""
+    first, last = _day_range(date_from, date_to)
+    async with get_read_db() as db:
+        result = await db.execute(
+            select(
+                Doctor.fio,
+                DoctorDailyStats.day,
+                DoctorDailyStats.booked,
+                DoctorDailyStats.completed,
+                DoctorDailyStats.cancelled,
+            )
+            .join(Doctor, Doctor.id == DoctorDailyStats.doctor_id)
+            .where(
+                DoctorDailyStats.doctor_id == doctor_id,
+                DoctorDailyStats.day >= first,
+                DoctorDailyStats.day <= last,
+                DoctorDailyStats.booked > 0,
+            )
+            .order_by(DoctorDailyStats.day)
+        )
+        return [
+            DoctorStatsView(doctor_id, fio, from_epoch_day(day), booked, completed, cancelled)
+            for fio, day, booked, completed, cancelled in result.all()
+        ]
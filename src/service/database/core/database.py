@@ -1,7 +1,16 @@
-from contextlib import asynccontextmanager
-from sqlalchemy import inspect
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+from sqlalchemy import URL, event, inspect, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.service.database.core.dialect import SUPPORTED_BACKENDS
+from src.service.database.core.write_queue import WriteJob, WriteQueue
+from src.service.exeptions import ServiceError
 
 Base_sqlalchemy = declarative_base()
 
@@ -11,16 +20,221 @@ class Base(Base_sqlalchemy):
     def to_dict(self):
         return {c.key: getattr(self, c.key) for c in inspect(self).mapper.column_attrs}
 
-@asynccontextmanager
-async def get_db() -> AsyncSession:
+
+def _setup_sqlite_writer(engine: AsyncEngine):
+    """
+    Соединение-писатель: WAL, чтобы читатели не блокировали запись,
+    и BEGIN IMMEDIATE, чтобы блокировка на запись бралась в начале транзакции
+    """
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, _):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def on_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _setup_sqlite_reader(engine: AsyncEngine):
+    """Соединения-читатели физически не могут изменить данные"""
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def is_sqlite_memory(url: URL) -> bool:
+    """База SQLite в памяти существует, пока открыто хотя бы одно её соединение"""
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+class DatabaseHandle:
+    """Движки одной базы: единственный писатель с очередью записи и пул читателей"""
+
+    def __init__(
+        self,
+        url: str,
+        echo: bool,
+        reader_pool_size: int,
+        write_queue_maxsize: int,
+        busy_timeout: float,
+        group_commit_window: float = 0.0,
+        group_commit_max_batch: int = 64,
+        reader_max_overflow: int = 0,
+        pool_timeout: float = 30.0,
+        pool_recycle: int = -1,
+    ):
+        self.loop = asyncio.get_running_loop()
+        self.url = make_url(url)
+        if self.url.get_backend_name() not in SUPPORTED_BACKENDS:
+            raise ServiceError(f"База {self.url.get_backend_name()} не поддерживается: только SQLite и PostgreSQL")
+        sqlite = self.url.get_backend_name() == "sqlite"
+        memory = is_sqlite_memory(self.url)
+
+        # timeout у SQLite - ожидание снятия блокировки файла; у серверных баз его задаёт сама база
+        connect_args = {"timeout": busy_timeout} if sqlite else {}
+        pool_args = {"pool_timeout": pool_timeout, "pool_recycle": pool_recycle}
+        if memory:
+            # по умолчанию база в памяти получает StaticPool, где одновременные сессии делят соединение
+            # и откатывают друг другу транзакции. Очередь из одного соединения выдаёт его по одному;
+            # пересоздавать это соединение нельзя - вместе с ним пропадёт база
+            pool_args = {"poolclass": AsyncAdaptedQueuePool, "pool_timeout": pool_timeout, "pool_recycle": -1}
+        self.writer_engine = create_async_engine(
+            self.url, echo=echo, pool_size=1, max_overflow=0, connect_args=connect_args, **pool_args
+        )
+        if memory:
+            # у каждого соединения была бы своя пустая база: читатели работают на единственном соединении писателя
+            self.reader_engine = self.writer_engine
+        else:
+            self.reader_engine = create_async_engine(
+                self.url,
+                echo=echo,
+                pool_size=reader_pool_size,
+                max_overflow=reader_max_overflow,
+                connect_args=connect_args,
+                **pool_args,
+            )
+
+        if sqlite:
+            _setup_sqlite_writer(self.writer_engine)
+            if self.reader_engine is not self.writer_engine:
+                _setup_sqlite_reader(self.reader_engine)
+
+        self.writer_factory = async_sessionmaker(self.writer_engine, expire_on_commit=False, class_=AsyncSession)
+        self.reader_factory = async_sessionmaker(self.reader_engine, expire_on_commit=False, class_=AsyncSession)
+        self.write_queue = WriteQueue(
+            self.writer_factory,
+            maxsize=write_queue_maxsize,
+            group_window=group_commit_window,
+            max_batch=group_commit_max_batch,
+        )
+
+    async def dispose(self):
+        await self.write_queue.close()
+        await self._dispose_engines()
+
+    async def _dispose_engines(self):
+        await self.writer_engine.dispose()
+        if self.reader_engine is not self.writer_engine:
+            await self.reader_engine.dispose()
+
+    def retire(self) -> asyncio.Task | None:
+        """
+        Закрывает движки, когда на их место пришли движки другого event loop.
+        Если старый цикл ещё работает в своём потоке, закрытие выполняется на нём. Очередь записи
+        остановленного цикла умерла вместе с ним, а соединения aiosqlite закрываются и из текущего цикла.
+        Соединения серверных баз привязаны к старому циклу: пулы просто отпускаются
+        """
+        if self.loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.dispose(), self.loop)
+            return None
+        if self.url.get_backend_name() == "sqlite":
+            return asyncio.ensure_future(self._dispose_engines())
+        self.writer_engine.sync_engine.dispose(close=False)
+        self.reader_engine.sync_engine.dispose(close=False)
+        return None
+
+
+# движки по филиалам; без Config.branches единственная база хранится под ключом None
+_handles: dict[int | None, DatabaseHandle] = {}
+# закрытие движков, оставшихся от прошлого event loop
+_retiring: set[asyncio.Task] = set()
+# филиал, в базу которого идут запросы текущей задачи; None - филиал терминала Config.branch_id
+_current_branch: ContextVar[int | None] = ContextVar("current_branch", default=None)
+
+
+def branch_ids() -> list[int | None]:
+    from src.config import get_config
+
+    return sorted(get_config().branches) or [None]
+
+
+def current_branch() -> int | None:
     from src.config import get_config
 
     conf = get_config()
-    async_session_factory = sessionmaker(
-        create_async_engine(conf.sqlite_url, echo=True),
-        expire_on_commit=False,
-        class_=AsyncSession
-    )
+    if not conf.branches:
+        return None
+
+    branch_id = _current_branch.get()
+    if branch_id is None:
+        branch_id = conf.branch_id
+    if branch_id not in conf.branches:
+        raise ServiceError("Филиал не найден")
+    return branch_id
+
+
+@contextmanager
+def use_branch(branch_id: int | None) -> Iterator[None]:
+    """Направляет get_db, get_read_db и submit_write внутри блока в базу филиала branch_id"""
+    token = _current_branch.set(branch_id)
+    try:
+        yield
+    finally:
+        _current_branch.reset(token)
+
+
+def get_handle() -> DatabaseHandle:
+    """
+    Возвращает движки базы текущего филиала для текущего event loop.
+    Соединения aiosqlite привязаны к циклу, поэтому на новом цикле движки создаются заново.
+    """
+    from src.config import get_config
 
-    async with async_session_factory() as session:
+    branch_id = current_branch()
+    handle = _handles.get(branch_id)
+    if handle is None or handle.loop is not asyncio.get_running_loop():
+        if handle is not None:
+            task = handle.retire()
+            if task is not None:
+                _retiring.add(task)
+                task.add_done_callback(_retiring.discard)
+        conf = get_config()
+        handle = _handles[branch_id] = DatabaseHandle(
+            conf.branches[branch_id] if branch_id is not None else conf.db_url,
+            echo=conf.sql_echo,
+            reader_pool_size=conf.reader_pool_size,
+            write_queue_maxsize=conf.write_queue_maxsize,
+            busy_timeout=conf.sqlite_busy_timeout,
+            group_commit_window=conf.group_commit_window,
+            group_commit_max_batch=conf.group_commit_max_batch,
+            reader_max_overflow=conf.reader_max_overflow,
+            pool_timeout=conf.pool_timeout,
+            pool_recycle=conf.pool_recycle,
+        )
+    return handle
+
+
+async def dispose_engines():
+    handles = list(_handles.values())
+    _handles.clear()
+    for handle in handles:
+        await handle.dispose()
+    await asyncio.gather(*_retiring)
+
+
+@asynccontextmanager
+async def get_db() -> AsyncSession:
+    """Сессия на соединении-писателе (в обход очереди записи)"""
+    async with get_handle().writer_factory() as session:
         yield session
+
+
+@asynccontextmanager
+async def get_read_db() -> AsyncSession:
+    """Сессия из пула только для чтения"""
+    async with get_handle().reader_factory() as session:
+        yield session
+
+
+async def submit_write(job: WriteJob, *args: Any) -> Any:
+    """Выполняет `job(session, *args)` в очереди записи в отдельной транзакции"""
+    return await get_handle().write_queue.submit(job, *args)
@@ -0,0 +1,32 @@
+"""
+Конструкции SQL, которые пишутся по-разному в SQLite и PostgreSQL.
+Другие базы не поддерживаются: запись приёмов и смена статусов опираются на RETURNING
+"""
+from sqlalchemy import Insert, Table
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+SUPPORTED_BACKENDS = ("sqlite", "postgresql")
+
+
+def _insert(db: AsyncSession, table: Table, construct: str) -> Insert:
+    dialect = db.bind.dialect.name
+    if dialect == "sqlite":
+        return sqlite.insert(table)
+    if dialect == "postgresql":
+        return postgresql.insert(table)
+    raise NotImplementedError(f"{construct} не поддерживает базу {dialect}")
+
+
+def insert_ignore(db: AsyncSession, table: Table, index_elements: list[str]) -> Insert:
+    """INSERT, который пропускает строки с уже занятым уникальным ключом index_elements"""
+    return _insert(db, table, "insert_ignore").on_conflict_do_nothing(index_elements=index_elements)
+
+
+def insert_or_add(db: AsyncSession, table: Table, index_elements: list[str], counters: list[str]) -> Insert:
+    """INSERT, который при занятом уникальном ключе index_elements прибавляет counters к существующей строке"""
+    statement = _insert(db, table, "insert_or_add")
+    return statement.on_conflict_do_update(
+        index_elements=index_elements,
+        set_={name: table.c[name] + statement.excluded[name] for name in counters},
+    )
@@ -1,45 +1,46 @@
 import logging
 
 from sqlalchemy import select, text
-from sqlalchemy.ext.asyncio import create_async_engine
 
-from src.config import get_config
 from src.service.database.actions.actions import hash_password
-from src.service.database.core.database import Base, get_db
+from src.service.database.core.database import Base, branch_ids, get_db, get_handle, use_branch
+from src.service.database.core.migrations import run_migrations
 from src.service.database.models import User, StorageStatus
 
 
 
 async def filling_db():
-    await _create_database()
-    await _create_table()
+    # у каждого филиала своя база со своим администратором
+    for branch_id in branch_ids():
+        with use_branch(branch_id):
+            await _create_database()
+            await _create_table()
+            await run_migrations()
 
-    await _filling_only_one_admin()
+            await _filling_only_one_admin()
 
 
 async def _create_database():
     """
     Создаёт файл SQLite базы данных и все таблицы.
     Если файл существует — ничего не ломает.
+    Работает через соединение-писатель: база SQLite в памяти видна только его соединению
     """
-    conf = get_config()
-    engine = create_async_engine(conf.sqlite_url, echo=True)
+    engine = get_handle().writer_engine
 
     try:
         async with engine.begin() as conn:
-            logging.info(f"Creating database tables at {conf.data_base_path}...")
+            logging.info(f"Creating database tables at {engine.url}...")
             await conn.run_sync(Base.metadata.create_all)
             logging.info("Database tables created successfully")
     except Exception as e:
         logging.error(f"Error creating tables: {e}")
         raise
-    finally:
-        await engine.dispose()
 
 
 async def _create_table():
     """создает таблицы в целевой базе данных"""
-    engine = create_async_engine(get_config().sqlite_url)
+    engine = get_handle().writer_engine
     try:
         async with engine.begin() as conn:
             logging.info("Creating core tables...")
@@ -48,8 +49,6 @@ async def _create_table():
     except Exception as e:
         logging.error(f"Error creating tables: {e}")
         raise
-    finally:
-        await engine.dispose()
 
 
 async def _filling_only_one_admin():
@@ -0,0 +1,165 @@
+import logging
+from datetime import timedelta
+
+from sqlalchemy import Connection, Enum, bindparam, func, inspect, select, text, update
+from sqlalchemy.schema import CreateTable
+
+from src.config import get_config
+from src.service.database import models  # noqa: F401 - регистрирует таблицы в Base.metadata
+from src.service.database.actions.stats import stats_rebuild_statements
+from src.service.database.core.database import Base, get_handle
+from src.service.database.models import Appointment, AppointmentArchive, DoctorDailyStats
+from src.service.utils.epoch import to_epoch
+
+_BACKFILL_CHUNK = 10_000
+
+# индексы, которые заменены новыми и только замедляют запись
+_OBSOLETE_INDEXES = ("ix_appointment_doctor_datetime",)
+
+
+async def run_migrations():
+    """
+    Доводит схему существующей базы до текущих моделей.
+    create_all создаёт только отсутствующие таблицы, всё остальное делается здесь.
+    """
+    engine = get_handle().writer_engine
+    if engine.dialect.name == "postgresql":
+        # новое значение типа ENUM нельзя использовать в той же транзакции, где оно добавлено
+        async with engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.run_sync(_add_enum_values)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_backfill_appointment_times)
+        await conn.run_sync(_backfill_doctor_stats)
+        await conn.run_sync(_appointment_autoincrement)
+        await conn.run_sync(_drop_obsolete_indexes)
+        await conn.run_sync(_ensure_indexes)
+
+
+def _add_missing_columns(conn: Connection):
+    """Добавляет в существующие таблицы колонки, появившиеся в моделях"""
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            column_type = column.type.compile(dialect=conn.dialect)
+            conn.exec_driver_sql(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}")
+            logging.info(f"Added column {table.name}.{column.name}")
+
+
+def _add_enum_values(conn: Connection):
+    """Добавляет в типы ENUM PostgreSQL значения, появившиеся в моделях, например статус no_show"""
+    quote = conn.dialect.identifier_preparer.quote
+    types = {
+        column.type.name: column.type.enums
+        for table in Base.metadata.sorted_tables
+        for column in table.columns
+        if isinstance(column.type, Enum) and column.type.name
+    }
+    for name, values in types.items():
+        for value in values:
+            conn.exec_driver_sql(f"ALTER TYPE {quote(name)} ADD VALUE IF NOT EXISTS '{value}'")
+
+
+def _backfill_appointment_times(conn: Connection):
+    """
+    Дозаполняет end_datetime и целочисленные start_ts/end_ts у старых записей.
+    Старые записи не знали длительности: считаем их длиной в один слот
+    """
+    slot = timedelta(minutes=get_config().slot_minutes)
+    table = Appointment.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(end_datetime=bindparam("b_end"), start_ts=bindparam("b_start_ts"), end_ts=bindparam("b_end_ts"))
+    )
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.datetime, table.c.end_datetime)
+            .where((table.c.end_datetime.is_(None)) | (table.c.start_ts.is_(None)) | (table.c.end_ts.is_(None)))
+            .limit(_BACKFILL_CHUNK)
+        ).all()
+        if not rows:
+            break
+
+        params = []
+        for row_id, start, end in rows:
+            end = end or start + slot
+            params.append({"b_id": row_id, "b_end": end, "b_start_ts": to_epoch(start), "b_end_ts": to_epoch(end)})
+        conn.execute(statement, params)
+
+
+def _backfill_doctor_stats(conn: Connection):
+    """Сводка статистики появилась позже приёмов: в базе с приёмами она заполняется один раз"""
+    if conn.execute(select(DoctorDailyStats.doctor_id).limit(1)).first() is not None:
+        return
+    if conn.execute(select(Appointment.id).limit(1)).first() is None:
+        return
+
+    _, fill = stats_rebuild_statements()
+    conn.execute(fill)
+    logging.info("Doctor daily stats rebuilt")
+
+
+def _appointment_autoincrement(conn: Connection):
+    """
+    Без AUTOINCREMENT SQLite выдаёт новому приёму max(id) + 1, то есть id последнего приёма,
+    ушедшего в архив. Таблица из старой схемы пересоздаётся с AUTOINCREMENT, а счётчик id
+    поднимается выше всех id архива. Индексы затем создаёт _ensure_indexes
+    """
+    if conn.dialect.name != "sqlite":
+        return
+    table = Appointment.__table__
+    quote = conn.dialect.identifier_preparer.quote
+    schema = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+    ).scalar_one_or_none()
+    if schema is not None and "AUTOINCREMENT" not in schema.upper():
+        # внешние ключи в SQLite здесь не включены, поэтому DROP TABLE не трогает ссылки из Slot
+        rebuilt = f"{table.name}_rebuild"
+        ddl = str(CreateTable(table).compile(dialect=conn.dialect))
+        conn.exec_driver_sql(ddl.replace(f"CREATE TABLE {quote(table.name)}", f"CREATE TABLE {quote(rebuilt)}", 1))
+        columns = ", ".join(quote(column.name) for column in table.columns)
+        conn.exec_driver_sql(f"INSERT INTO {quote(rebuilt)} ({columns}) SELECT {columns} FROM {quote(table.name)}")
+        conn.exec_driver_sql(f"DROP TABLE {quote(table.name)}")
+        conn.exec_driver_sql(f"ALTER TABLE {quote(rebuilt)} RENAME TO {quote(table.name)}")
+        logging.info("Appointment table rebuilt with AUTOINCREMENT")
+
+    top = max(
+        conn.execute(select(func.coalesce(func.max(Appointment.id), 0))).scalar_one(),
+        conn.execute(select(func.coalesce(func.max(AppointmentArchive.id), 0))).scalar_one(),
+    )
+    params = {"name": table.name, "top": top}
+    if conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = :name"), params).first() is None:
+        if top:
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :top)"), params)
+    else:
+        conn.execute(text("UPDATE sqlite_sequence SET seq = :top WHERE name = :name AND seq < :top"), params)
+
+
+def _drop_obsolete_indexes(conn: Connection):
+    quote = conn.dialect.identifier_preparer.quote
+    for table_name in inspect(conn).get_table_names():
+        for index in inspect(conn).get_indexes(table_name):
+            if index["name"] not in _OBSOLETE_INDEXES:
+                continue
+            conn.exec_driver_sql(f"DROP INDEX {quote(index['name'])}")
+
+
+def _ensure_indexes(conn: Connection):
+    existing_tables = set(inspect(conn).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    logging.info("Database indexes checked")
@@ -0,0 +1,80 @@
+import asyncio
+import functools
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field, replace
+
+from sqlalchemy.exc import DBAPIError
+
+from src.service.exeptions import ServiceError
+
+_LOCK_MARKERS = (
+    "database is locked",
+    "database table is locked",
+    "database is busy",
+    # PostgreSQL: транзакцию откатила сама база, повтор безопасен
+    "deadlock detected",
+    "could not serialize access",
+)
+
+
+@dataclass
+class ContentionMetrics:
+    retries: int = 0  # повторные попытки после ошибки блокировки
+    exhausted: int = 0  # вызовы, которые так и не дождались блокировки
+    lock_wait_seconds: float = 0.0  # время в неудачных попытках и паузах между ними
+    retries_by_action: Counter = field(default_factory=Counter)
+
+
+_metrics = ContentionMetrics()
+
+
+def get_contention_metrics() -> ContentionMetrics:
+    """Снимок счётчиков конкуренции за блокировку базы"""
+    return replace(_metrics, retries_by_action=Counter(_metrics.retries_by_action))
+
+
+def reset_contention_metrics():
+    global _metrics
+    _metrics = ContentionMetrics()
+
+
+def is_lock_error(exc: BaseException) -> bool:
+    return isinstance(exc, DBAPIError) and any(marker in str(exc) for marker in _LOCK_MARKERS)
+
+
+def retry_on_lock(func):
+    """
+    Повторяет действие при занятой блокировке SQLite с экспоненциальной паузой и полным джиттером.
+    Применять только к идемпотентным действиям или к действиям, которые целиком
+    выполняются одной транзакцией: при ошибке она откатывается и повтор безопасен.
+    """
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        from src.config import get_config
+
+        conf = get_config()
+        attempt = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except DBAPIError as e:
+                if not is_lock_error(e):
+                    raise
+
+                _metrics.lock_wait_seconds += time.perf_counter() - started
+                attempt += 1
+                if attempt >= conf.lock_retry_attempts:
+                    _metrics.exhausted += 1
+                    raise ServiceError("База данных занята, повторите попытку позже") from e
+
+                delay = random.uniform(0, min(conf.lock_retry_max_delay, conf.lock_retry_base_delay * 2 ** attempt))
+                _metrics.retries += 1
+                _metrics.retries_by_action[func.__name__] += 1
+                _metrics.lock_wait_seconds += delay
+                await asyncio.sleep(delay)
+
+    return wrapper
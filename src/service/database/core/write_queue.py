@@ -0,0 +1,121 @@
+import asyncio
+from typing import Any, Awaitable, Callable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+T = TypeVar("T")
+WriteJob = Callable[..., Awaitable[T]]
+
+
+class WriteQueue:
+    """
+    Очередь записи в базу данных.
+    Все изменения выполняются строго по одному через единственное соединение-писатель,
+    поэтому действия больше не соревнуются за блокировку SQLite.
+    Каждая задача выполняется в отдельной транзакции, коммит делает очередь.
+
+    Групповой коммит (group_window > 0): задачи, пришедшие в течение окна, выполняются
+    в одной транзакции, каждая в своей точке сохранения (SAVEPOINT). Ошибка одной задачи
+    откатывает только её, остальные получают свой результат после общего коммита.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        maxsize: int = 0,
+        group_window: float = 0.0,
+        max_batch: int = 64,
+    ):
+        self._session_factory = session_factory
+        self._queue: asyncio.Queue[tuple[WriteJob, tuple, asyncio.Future]] = asyncio.Queue(maxsize)
+        self._worker: asyncio.Task | None = None
+        self._group_window = group_window
+        self._max_batch = max_batch
+
+    async def submit(self, job: WriteJob, *args: Any) -> Any:
+        """Ставит задачу `job(session, *args)` в очередь и ждёт её результата"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((job, args, future))
+        return await future
+
+    async def close(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            taken = [await self._queue.get()]
+            try:
+                if self._group_window > 0:
+                    await self._collect(taken)
+
+                batch = [item for item in taken if not item[2].cancelled()]
+                if len(batch) == 1:
+                    await self._execute(*batch[0])
+                elif batch:
+                    await self._execute_group(batch)
+            finally:
+                for _ in taken:
+                    self._queue.task_done()
+
+    async def _collect(self, batch: list):
+        """Добирает в пачку задачи, пришедшие в течение окна группового коммита"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._group_window
+        while len(batch) < self._max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _execute(self, job: WriteJob, args: tuple, future: asyncio.Future):
+        try:
+            async with self._session_factory() as session:
+                async with session.begin():
+                    result = await job(session, *args)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+
+        if not future.done():
+            future.set_result(result)
+
+    async def _execute_group(self, batch: list):
+        outcomes: list[tuple[bool, Any]] = []
+        try:
+            async with self._session_factory() as session:
+                async with session.begin():
+                    for job, args, _ in batch:
+                        try:
+                            async with session.begin_nested():
+                                outcomes.append((True, await job(session, *args)))
+                        except Exception as e:
+                            outcomes.append((False, e))
+        except Exception as e:
+            # общий коммит не удался - ни одна задача пачки не записана
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), (ok, value) in zip(batch, outcomes):
+            if future.done():
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
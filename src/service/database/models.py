@@ -1,6 +1,6 @@
 import enum
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum, Index, Date, Time, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from src.service.database.core.database import Base
@@ -17,6 +17,7 @@ class AppointmentStatus(enum.Enum):
     SCHEDULED = "scheduled"
     COMPLETED = "completed"
     CANCELLED = "cancelled"
+    NO_SHOW = "no_show"  # пациент не пришёл; время приёма остаётся занятым
 
 
 class User(Base):
@@ -50,6 +51,7 @@ class Doctor(Base):
     # Связи
     user = relationship("User", back_populates="doctor")
     appointments = relationship("Appointment", back_populates="doctor")
+    schedule = relationship("DoctorSchedule", back_populates="doctor")
 
 
 class Patient(Base):
@@ -67,11 +69,24 @@ class Patient(Base):
 
 class Appointment(Base):
     __tablename__ = "Appointment"
+    __table_args__ = (
+        Index("ix_appointment_doctor_start_ts", "doctor_id", "start_ts"),
+        Index("ix_appointment_patient_start_ts", "patient_id", "start_ts"),
+        Index("ix_appointment_start_ts", "start_ts"),
+        # прошедшие незакрытые приёмы: диапазон только по запланированным, без прохода по завершённым
+        Index("ix_appointment_status_start_ts", "status", "start_ts"),
+        # id не переиспользуются: приём, ушедший в архив, хранит свой id в AppointmentArchive
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     doctor_id = Column(Integer, ForeignKey("Doctor.id", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
     patient_id = Column(Integer, ForeignKey("Patient.id", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
     datetime = Column(DateTime, nullable=False)
+    end_datetime = Column(DateTime, nullable=True)  # заполнено у всех записей, nullable ради миграции
+    # те же начало и конец в секундах от эпохи: диапазоны и сортировка сравнивают целые числа, а не строки
+    start_ts = Column(Integer, nullable=True)
+    end_ts = Column(Integer, nullable=True)
     complaint = Column(String, nullable=True)
     condition = Column(String, nullable=True)
     conclusion = Column(String, nullable=True)
@@ -88,3 +103,125 @@ class Appointment(Base):
     # Связи
     doctor = relationship("Doctor", back_populates="appointments")
     patient = relationship("Patient", back_populates="appointments")
+
+
+class AppointmentArchive(Base):
+    """
+    Завершённые и отменённые приёмы старше горизонта архивации. Строки переносятся из Appointment
+    с тем же id, поэтому ссылки на приём остаются верными
+    """
+    __tablename__ = "AppointmentArchive"
+    __table_args__ = (
+        Index("ix_appointment_archive_doctor_start_ts", "doctor_id", "start_ts"),
+        Index("ix_appointment_archive_patient_start_ts", "patient_id", "start_ts"),
+        # граница архива max(start_ts) для чтений за период
+        Index("ix_appointment_archive_start_ts", "start_ts"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    # без внешних ключей: архив переживает удаление врача или пациента
+    doctor_id = Column(Integer, nullable=False)
+    patient_id = Column(Integer, nullable=False)
+    datetime = Column(DateTime, nullable=False)
+    end_datetime = Column(DateTime, nullable=True)
+    start_ts = Column(Integer, nullable=True)
+    end_ts = Column(Integer, nullable=True)
+    complaint = Column(String, nullable=True)
+    condition = Column(String, nullable=True)
+    conclusion = Column(String, nullable=True)
+    status = Column(
+        Enum(
+            AppointmentStatus,
+            values_callable=lambda x: [e.value for e in x],
+            name="appointment_status",
+        ),
+        nullable=False,
+    )
+    archived_ts = Column(Integer, nullable=False)
+
+
+class AppointmentChange(Base):
+    """
+    Журнал изменений приёмов. id - номер изменения: экран помнит последний увиденный номер
+    и запрашивает только приёмы, изменившиеся после него
+    """
+    __tablename__ = "AppointmentChange"
+    __table_args__ = (
+        Index("ix_appointment_change_doctor", "doctor_id", "id"),
+        Index("ix_appointment_change_patient", "patient_id", "id"),
+        # номера не переиспользуются после очистки журнала
+        {"sqlite_autoincrement": True},
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    # без внешних ключей: запись журнала переживает удаление или перенос приёма
+    appointment_id = Column(Integer, nullable=False)
+    doctor_id = Column(Integer, nullable=False)
+    patient_id = Column(Integer, nullable=False)
+    changed_ts = Column(Integer, nullable=False)
+
+
+class DoctorDailyStats(Base):
+    """
+    Сводка приёмов врача за день. Обновляется в той же транзакции, что и сами приёмы,
+    поэтому статистика читается без прохода по Appointment
+    """
+    __tablename__ = "DoctorDailyStats"
+
+    doctor_id = Column(Integer, primary_key=True, autoincrement=False)
+    # номер дня от 1970-01-01: start_ts // 86400
+    day = Column(Integer, primary_key=True, autoincrement=False)
+    booked = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    cancelled = Column(Integer, nullable=False, default=0)
+
+
+class DoctorSchedule(Base):
+    """Недельный шаблон: часы приёма врача в конкретный день недели"""
+    __tablename__ = "DoctorSchedule"
+    __table_args__ = (
+        Index("ix_doctor_schedule_doctor", "doctor_id", "weekday"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    doctor_id = Column(Integer, ForeignKey("Doctor.id", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    weekday = Column(Integer, nullable=False)  # 0 - понедельник
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    slot_minutes = Column(Integer, nullable=False, default=30)
+
+    # Связи
+    doctor = relationship("Doctor", back_populates="schedule")
+
+
+class ScheduleException(Base):
+    """
+    Исключение из шаблона на конкретную дату: заменяет часы приёма этого дня.
+    Без start_time/end_time означает выходной
+    """
+    __tablename__ = "ScheduleException"
+    __table_args__ = (
+        Index("ix_schedule_exception_doctor_day", "doctor_id", "day"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    doctor_id = Column(Integer, ForeignKey("Doctor.id", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    day = Column(Date, nullable=False)
+    start_time = Column(Time, nullable=True)
+    end_time = Column(Time, nullable=True)
+    slot_minutes = Column(Integer, nullable=True)
+
+
+class Slot(Base):
+    """Заранее нарезанное время приёма. Запись на приём занимает слот"""
+    __tablename__ = "Slot"
+    __table_args__ = (
+        UniqueConstraint("doctor_id", "start", name="uq_slot_doctor_start"),
+        Index("ix_slot_appointment", "appointment_id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    doctor_id = Column(Integer, ForeignKey("Doctor.id", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    start = Column(DateTime, nullable=False)
+    end = Column(DateTime, nullable=False)
+    appointment_id = Column(Integer, ForeignKey("Appointment.id", ondelete="SET NULL"), nullable=True)
@@ -0,0 +1,82 @@
+"""
+Последний загруженный список врачей на диске: экран показывает его сразу,
+а свежий список подгружается в фоне и заменяет снимок
+"""
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+from src.config import get_config
+from src.service.backend import DoctorView, get_doctors
+
+_SNAPSHOT_VERSION = 1
+
+
+@dataclass(slots=True, frozen=True)
+class DirectoryDiff:
+    added: list[DoctorView]
+    removed: list[DoctorView]
+    changed: list[DoctorView]
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def snapshot_path() -> Path:
+    """У каждого филиала свой справочник, поэтому и свой снимок"""
+    conf = get_config()
+    path = conf.directory_snapshot_path
+    if conf.branch_id is not None:
+        path = path.with_name(f"{path.stem}_{conf.branch_id}{path.suffix}")
+    return path
+
+
+def load_doctor_snapshot() -> list[DoctorView] | None:
+    """Снимок с прошлого запуска; None, если его нет или он повреждён"""
+    path = snapshot_path()
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") != _SNAPSHOT_VERSION:
+            return None
+        return [DoctorView(*row) for row in data["doctors"]]
+    except FileNotFoundError:
+        return None
+    except (ValueError, KeyError, TypeError) as e:
+        logging.warning(f"Снимок списка врачей {path} не прочитан: {e}")
+        return None
+
+
+def save_doctor_snapshot(doctors: list[DoctorView]) -> None:
+    path = snapshot_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # строки без имён полей и пробелов: снимок читается при каждом входе
+    data = {
+        "version": _SNAPSHOT_VERSION,
+        "doctors": [[d.id, d.fio, d.specialization, d.branch_id] for d in doctors],
+    }
+    partial = path.with_name(path.name + ".part")
+    partial.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    partial.replace(path)
+
+
+async def revalidate_doctors() -> list[DoctorView]:
+    """Загружает свежий список врачей и сохраняет его снимок"""
+    doctors = await get_doctors()
+    try:
+        await asyncio.to_thread(save_doctor_snapshot, doctors)
+    except OSError as e:
+        # без снимка следующий вход просто дождётся загрузки
+        logging.warning(f"Снимок списка врачей не сохранён: {e}")
+    return doctors
+
+
+def diff_doctors(old: list[DoctorView], new: list[DoctorView]) -> DirectoryDiff:
+    old_by_id = {doctor.id: doctor for doctor in old}
+    new_by_id = {doctor.id: doctor for doctor in new}
+    return DirectoryDiff(
+        added=[doctor for doctor in new if doctor.id not in old_by_id],
+        removed=[doctor for doctor in old if doctor.id not in new_by_id],
+        changed=[doctor for doctor in new if doctor.id in old_by_id and old_by_id[doctor.id] != doctor],
+    )
@@ -0,0 +1,88 @@
+"""
+Фоновое обслуживание базы: задачи запускаются на global_event_loop раз в maintenance_interval
+по очереди во всех филиалах. Каждая задача сама разбивает работу на короткие транзакции,
+поэтому записи пациентов не ждут конца обслуживания
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from src.config import get_config
+from src.service.database.actions import archive_appointments, close_past_due_appointments
+from src.service.database.core.database import branch_ids, use_branch
+from src.service.exeptions import ServiceError
+from src.service.utils.core_logger import get_logger
+
+# возвращает число затронутых строк
+MaintenanceJob = Callable[[], Awaitable[int]]
+
+
+def maintenance_jobs() -> dict[str, MaintenanceJob]:
+    """Задачи, включённые в конфигурации"""
+    conf = get_config()
+    jobs: dict[str, MaintenanceJob] = {}
+    # закрытые приёмы попадают в архивацию того же прохода
+    if conf.past_due_status:
+        jobs["закрытие прошедших приёмов"] = close_past_due_appointments
+    if conf.archive_after_days > 0:
+        jobs["архивация приёмов"] = archive_appointments
+    return jobs
+
+
+async def run_maintenance() -> dict[str, int]:
+    """
+    Один проход всех задач по всем филиалам. Возвращает число затронутых строк по задачам;
+    упавшие задачи в сумму не входят
+    """
+    logger = get_logger(__name__)
+    totals: dict[str, int] = {}
+    for name, job in maintenance_jobs().items():
+        totals[name] = 0
+        for branch_id in branch_ids():
+            # сбой одной задачи в одном филиале не останавливает остальные
+            with use_branch(branch_id):
+                try:
+                    rows = await job()
+                except ServiceError as e:
+                    logger.warning(f"{name}, филиал {branch_id}: {e}")
+                    continue
+                except Exception:
+                    logger.exception(f"{name}, филиал {branch_id}: ошибка")
+                    continue
+            totals[name] += rows
+            if rows:
+                logger.info(f"{name}, филиал {branch_id}: {rows}")
+    return totals
+
+
+class MaintenanceRunner:
+    """Периодический запуск run_maintenance; start и stop вызываются из любого потока"""
+
+    def __init__(self, interval: float | None = None):
+        self.interval = interval if interval is not None else get_config().maintenance_interval
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        loop = get_config().global_event_loop
+        loop.call_soon_threadsafe(self._start_task)
+
+    def stop(self):
+        loop = get_config().global_event_loop
+        loop.call_soon_threadsafe(self._cancel_task)
+
+    def _start_task(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def _cancel_task(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await run_maintenance()
+            except Exception:
+                logging.exception("Ошибка фонового обслуживания базы")
+            await asyncio.sleep(self.interval)
@@ -1,4 +1,5 @@
 from asyncio import AbstractEventLoop
+from datetime import time
 from pathlib import Path
 from typing import Set
 
@@ -9,9 +10,61 @@ class Config(BaseModel):
     media: Path = base / "media"
     log_file: Path = media / "mobile_app.log"
     data_base_path: Path = media / "data_base.sqlite3"
+    export_dir: Path = media / "exports"
+    directory_snapshot_path: Path = media / "doctors_snapshot.json"
 
     global_event_loop: AbstractEventLoop
 
+    sql_echo: bool = True
+    # URL SQLAlchemy с асинхронным драйвером SQLite или PostgreSQL; по умолчанию - файл SQLite data_base_path
+    database_url: str | None = None
+    # id филиала -> URL его базы; пусто - одна база database_url на всю сеть
+    branches: dict[int, str] = {}
+    branch_id: int | None = None  # филиал этого терминала или сервера
+    reader_pool_size: int = 4  # соединения только для чтения (списки, вход)
+    reader_max_overflow: int = 0  # соединения читателей сверх reader_pool_size при пиковой нагрузке
+    pool_timeout: float = 30.0  # сколько секунд ждать свободного соединения из пула
+    pool_recycle: int = -1  # секунды жизни соединения; -1 - без ограничения
+    write_queue_maxsize: int = 0  # 0 - очередь записи без ограничения
+    sqlite_busy_timeout: float = 5.0  # сколько секунд драйвер ждёт снятия блокировки
+    lock_retry_attempts: int = 5
+    lock_retry_base_delay: float = 0.05
+    lock_retry_max_delay: float = 1.0
+    group_commit_window: float = 0.0  # секунды; 0 - групповой коммит выключен
+    group_commit_max_batch: int = 64
+
+    # часы приёма по умолчанию для расчёта свободного времени
+    work_day_start: time = time(9, 0)
+    work_day_end: time = time(18, 0)
+    working_weekdays: Set = (0, 1, 2, 3, 4)
+    slot_minutes: int = 30
+    max_appointment_minutes: int = 240  # ограничивает диапазон поиска пересечений по индексу
+    booking_horizon_days: int = 14
+
+    # local - терминал работает со своей базой, remote - с сервером python -m src.server
+    backend_mode: str = "local"
+    server_url: str = "http://127.0.0.1:8080"
+    server_timeout: float = 10.0
+    server_host: str = "127.0.0.1"
+    server_port: int = 8080
+    server_session_ttl: float = 8 * 3600  # секунды без запросов, после которых сервер забывает сессию; 0 - не забывать
+
+    change_poll_interval: float = 3.0  # секунды между проверками журнала изменений приёмов
+    change_log_retention_days: int = 7
+
+    maintenance_interval: float = 3600.0  # секунды между запусками фоновых задач обслуживания базы
+    archive_after_days: int = 365  # закрытые приёмы старше этого уходят в архив; 0 - не архивировать
+    archive_batch_size: int = 2_000  # приёмов в одной транзакции переноса в архив
+    # статус (значение AppointmentStatus) для запланированных приёмов, которые врач не закрыл; "" - не закрывать.
+    # no_show оставляет время занятым и учитывается аналитикой как неявка
+    past_due_status: str = "no_show"
+    past_due_after_hours: int = 24  # сколько часов после начала приём ещё ждёт отметки врача
+    past_due_batch_size: int = 2_000
+
+    export_chunk_size: int = 5_000  # строк за одно чтение курсора при выгрузке
+    import_batch_size: int = 1_000  # строк импорта в одной транзакции
+    import_hash_workers: int = 0  # потоки для хэширования паролей; 0 - по числу ядер
+
     dark_bg: Set = (0.15, 0.15, 0.15, 1)
     input_dg: Set = (0.25, 0.25, 0.25, 1)
     primary_btn: Set = (0.3, 0.6, 0.9, 1)
@@ -24,6 +77,6 @@ class Config(BaseModel):
     }
 
     @property
-    def sqlite_url(self) -> str:
+    def db_url(self) -> str:
         """Возвращает полный URL для асинхронного подключения SQLAlchemy"""
-        return f"sqlite+aiosqlite:///{self.data_base_path}"
+        return self.database_url or f"sqlite+aiosqlite:///{self.data_base_path}"
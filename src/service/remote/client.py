@@ -0,0 +1,66 @@
+import asyncio
+import json
+import threading
+from typing import Any
+
+import requests
+
+from src.service.database.actions import SessionContext
+from src.service.exeptions import ServiceError
+from src.service.remote.codec import decode, encode
+from src.service.remote.server import BRANCH_HEADER, SESSION_HEADER
+
+
+class RemoteClient:
+    """
+    Вызывает действия на сервере python -m src.server.
+    requests блокирующий, поэтому запрос уходит в поток; у каждого потока своя requests.Session,
+    которая держит соединение с сервером открытым между вызовами
+    """
+
+    def __init__(self, base_url: str, timeout: float, branch_id: int | None = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.branch_id = branch_id
+        # сессия последнего входа: ею подписываются действия администратора
+        self.token: str | None = None
+        self._local = threading.local()
+
+    def _http(self) -> requests.Session:
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = requests.Session()
+            http.headers["Content-Type"] = "application/json; charset=utf-8"
+            if self.branch_id is not None:
+                http.headers[BRANCH_HEADER] = str(self.branch_id)
+        return http
+
+    def _post(self, name: str, body: bytes, token: str | None) -> Any:
+        headers = {SESSION_HEADER: token} if token else {}
+        try:
+            response = self._http().post(f"{self.base_url}/actions/{name}", data=body, headers=headers, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ServiceError("Сервер недоступен, повторите попытку позже") from e
+
+        try:
+            payload = response.json()
+        except ValueError:
+            raise ServiceError(f"Некорректный ответ сервера: {response.status_code}")
+        if response.status_code != 200:
+            raise ServiceError(payload.get("error") or f"Ошибка сервера: {response.status_code}")
+        return decode(payload["result"])
+
+    async def call(self, name: str, *args, **kwargs) -> Any:
+        if name == "end_session" and args and args[0].token == self.token:
+            # после выхода токен больше ничего не подписывает; сам end_session находит сессию по аргументу
+            self.token = None
+        body = json.dumps({"args": encode(args), "kwargs": encode(kwargs)}, ensure_ascii=False).encode("utf-8")
+        result = await asyncio.to_thread(self._post, name, body, self.token)
+        if isinstance(result, SessionContext):
+            self.token = result.token
+        return result
+
+    def close(self):
+        http = getattr(self._local, "http", None)
+        if http is not None:
+            http.close()
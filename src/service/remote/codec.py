@@ -0,0 +1,88 @@
+"""
+Перевод аргументов и результатов действий в JSON и обратно.
+Кроме встроенных типов JSON поддерживаются даты и время, перечисления и view-классы действий
+"""
+import dataclasses
+import enum
+from datetime import date, datetime, time
+from typing import Any, Callable
+
+from src.service.database.actions import (
+    AppointmentDelta,
+    AppointmentSummary,
+    AppointmentView,
+    CalendarDay,
+    DoctorStatsView,
+    DoctorView,
+    ScheduleView,
+    SessionContext,
+)
+from src.service.database.models import AppointmentStatus, StorageStatus
+
+_DATACLASSES = {
+    cls.__name__: cls
+    for cls in (
+        DoctorView,
+        AppointmentSummary,
+        AppointmentView,
+        ScheduleView,
+        AppointmentDelta,
+        DoctorStatsView,
+        CalendarDay,
+    )
+}
+_ENUMS = {cls.__name__: cls for cls in (AppointmentStatus, StorageStatus)}
+
+SessionResolver = Callable[[str | None], SessionContext]
+
+
+def encode(value: Any) -> Any:
+    if isinstance(value, SessionContext):
+        return {"__session__": {field.name: encode(getattr(value, field.name)) for field in dataclasses.fields(value)}}
+    if isinstance(value, enum.Enum):
+        return {"__enum__": type(value).__name__, "value": value.value}
+    # datetime - подкласс date, поэтому проверяется первым
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, time):
+        return {"__time__": value.isoformat()}
+    if dataclasses.is_dataclass(value) and type(value).__name__ in _DATACLASSES:
+        return {
+            "__dataclass__": type(value).__name__,
+            "fields": {field.name: encode(getattr(value, field.name)) for field in dataclasses.fields(value)},
+        }
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    if isinstance(value, dict):
+        return {key: encode(item) for key, item in value.items()}
+    return value
+
+
+def decode(value: Any, resolve_session: SessionResolver | None = None) -> Any:
+    """
+    resolve_session задаёт сервер: сессия клиента заменяется серверной по токену,
+    остальные поля от клиента не принимаются. Без него сессия восстанавливается как есть
+    """
+    if isinstance(value, list):
+        return [decode(item, resolve_session) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    if "__session__" in value:
+        fields = decode(value["__session__"])
+        if resolve_session is not None:
+            return resolve_session(fields.get("token"))
+        return SessionContext(**fields)
+    if "__enum__" in value:
+        return _ENUMS[value["__enum__"]](value["value"])
+    if "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    if "__date__" in value:
+        return date.fromisoformat(value["__date__"])
+    if "__time__" in value:
+        return time.fromisoformat(value["__time__"])
+    if "__dataclass__" in value:
+        return _DATACLASSES[value["__dataclass__"]](**decode(value["fields"], resolve_session))
+    return {key: decode(item, resolve_session) for key, item in value.items()}
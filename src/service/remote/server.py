@@ -0,0 +1,218 @@
+import asyncio
+import json
+import logging
+import secrets
+import time
+from asyncio import AbstractEventLoop
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from src.config import get_config
+from src.service.database import actions
+from src.service.database.actions import SessionContext
+from src.service.database.core.database import use_branch
+from src.service.database.models import StorageStatus
+from src.service.exeptions import ServiceError
+from src.service.remote.codec import decode, encode
+
+# действия без входа в систему
+PUBLIC_ACTIONS = frozenset({
+    "login_user",
+    "register_patient",
+    "get_doctors",
+    "get_free_slots",
+    "get_doctor_schedule",
+    "get_change_seq",
+})
+# действия, которые сами получают сессию первым аргументом и проверяют её
+SESSION_ACTIONS = frozenset({
+    "end_session",
+    "get_patient_appointments",
+    "get_doctor_appointments",
+    "get_appointment_details",
+    "get_appointment_changes",
+    "get_calendar_month",
+    "get_calendar_day",
+    "create_appointment",
+    "update_appointment_by_doctor",
+    "update_appointments_status",
+})
+# действия администратора: сессия передаётся заголовком SESSION_HEADER
+ADMIN_ACTIONS = frozenset({
+    "create_doctor",
+    "update_doctor",
+    "delete_doctor",
+    "get_appointments_by_doctor_id",
+    "set_weekly_schedule",
+    "add_schedule_exception",
+    "materialize_slots",
+    "get_doctors_all_branches",
+    "get_appointments_all_branches",
+    "prune_appointment_changes",
+    "get_doctor_stats_totals",
+    "get_doctor_daily_stats",
+    "rebuild_doctor_stats",
+    "archive_appointments",
+    "close_past_due_appointments",
+})
+REMOTE_ACTIONS = PUBLIC_ACTIONS | SESSION_ACTIONS | ADMIN_ACTIONS
+
+SESSION_HEADER = "X-Session-Token"
+# филиал терминала: в его базе выполняются вход, регистрация и справочные чтения
+BRANCH_HEADER = "X-Branch-Id"
+
+
+class UnknownAction(Exception):
+    pass
+
+
+class BadRequest(Exception):
+    pass
+
+
+class ActionDispatcher:
+    """
+    Выполняет действия на одном event loop и хранит сессии клиентов.
+    Клиент знает только токен сессии: id врача, пациента и роль берутся из серверной копии
+    """
+
+    def __init__(self, session_ttl: float | None = None):
+        self.session_ttl = session_ttl if session_ttl is not None else get_config().server_session_ttl
+        # токен -> сессия и время последнего запроса по time.monotonic
+        self._sessions: dict[str, tuple[SessionContext, float]] = {}
+        self._next_prune = 0.0
+
+    def _resolve(self, token: str | None) -> SessionContext:
+        entry = self._sessions.get(token) if token else None
+        now = time.monotonic()
+        if entry is not None and self._expired(entry[1], now):
+            self._drop(token)
+            entry = None
+        if entry is None:
+            raise ServiceError("Сессия завершена, войдите заново")
+        session = entry[0]
+        self._sessions[token] = (session, now)
+        return session
+
+    def _register(self, session: SessionContext) -> SessionContext:
+        session.token = secrets.token_urlsafe(32)
+        self._sessions[session.token] = (session, time.monotonic())
+        return session
+
+    def _expired(self, last_used: float, now: float) -> bool:
+        return self.session_ttl > 0 and now - last_used > self.session_ttl
+
+    def _drop(self, token: str):
+        entry = self._sessions.pop(token, None)
+        if entry is not None:
+            actions.end_session(entry[0])
+
+    def _prune(self):
+        """Забывает брошенные сессии; проход по всем сессиям - не чаще раза в session_ttl / 10"""
+        now = time.monotonic()
+        if self.session_ttl <= 0 or now < self._next_prune:
+            return
+        self._next_prune = now + self.session_ttl / 10
+        for token in [token for token, (_, last_used) in self._sessions.items() if self._expired(last_used, now)]:
+            self._drop(token)
+
+    @property
+    def session_count(self) -> int:
+        return len(self._sessions)
+
+    async def call(self, name: str, payload: dict, token: str | None, branch_id: int | None = None) -> Any:
+        if name not in REMOTE_ACTIONS:
+            raise UnknownAction(name)
+        self._prune()
+
+        if name in ADMIN_ACTIONS:
+            admin = self._resolve(token)
+            if not admin.active or admin.role != StorageStatus.ADMIN:
+                raise ServiceError("Недостаточно прав")
+            # администратор управляет филиалом, в котором вошёл
+            branch_id = admin.branch_id
+
+        try:
+            args = decode(payload.get("args", []), self._resolve)
+            kwargs = decode(payload.get("kwargs", {}), self._resolve)
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            raise BadRequest(str(e)) from e
+
+        if name == "end_session":
+            session = args[0]
+            self._drop(session.token)
+            return None
+
+        # действия с сессией сами переходят в базу её филиала
+        with use_branch(branch_id):
+            result = await getattr(actions, name)(*args, **kwargs)
+        if isinstance(result, SessionContext):
+            result = self._register(result)
+        return result
+
+
+class _ActionRequestHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1: соединение остаётся открытым между запросами одного клиента
+    protocol_version = "HTTP/1.1"
+    # заголовки и тело уходят отдельными записями: без TCP_NODELAY каждый ответ ждал бы отложенного ACK
+    disable_nagle_algorithm = True
+    server: "ActionServer"
+
+    def do_POST(self):
+        name = self.path.removeprefix("/actions/")
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                raise BadRequest(str(e)) from e
+            if not isinstance(payload, dict):
+                raise BadRequest("ожидается объект JSON")
+            branch_id = self._branch_id()
+            future = asyncio.run_coroutine_threadsafe(
+                self.server.dispatcher.call(name, payload, self.headers.get(SESSION_HEADER), branch_id),
+                self.server.loop,
+            )
+            result = future.result()
+        except ServiceError as e:
+            self._reply(HTTPStatus.UNPROCESSABLE_ENTITY, {"error": str(e)})
+        except UnknownAction:
+            self._reply(HTTPStatus.NOT_FOUND, {"error": "Неизвестное действие"})
+        except BadRequest:
+            self._reply(HTTPStatus.BAD_REQUEST, {"error": "Некорректный запрос"})
+        except Exception:
+            logging.exception(f"Ошибка при выполнении {name}")
+            self._reply(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Внутренняя ошибка сервера"})
+        else:
+            self._reply(HTTPStatus.OK, {"result": encode(result)})
+
+    def _branch_id(self) -> int | None:
+        raw = self.headers.get(BRANCH_HEADER)
+        if not raw:
+            return None
+        try:
+            return int(raw)
+        except ValueError as e:
+            raise BadRequest(str(e)) from e
+
+    def _reply(self, status: HTTPStatus, body: dict):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args):
+        logging.debug(f"{self.address_string()} {format % args}")
+
+
+class ActionServer(ThreadingHTTPServer):
+    """Каждое соединение обслуживается своим потоком, сами действия выполняются на loop"""
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], loop: AbstractEventLoop):
+        super().__init__(address, _ActionRequestHandler)
+        self.loop = loop
+        self.dispatcher = ActionDispatcher()
@@ -0,0 +1,23 @@
+import calendar
+from datetime import date, datetime, timedelta
+
+_EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+
+
+def to_epoch(dt: datetime) -> int:
+    """Наивное время -> целые секунды от 1970-01-01. Часовой пояс не учитывается, как и в колонке datetime"""
+    return calendar.timegm(dt.timetuple())
+
+
+def from_epoch(ts: int) -> datetime:
+    return _EPOCH + timedelta(seconds=ts)
+
+
+def to_epoch_day(day: date) -> int:
+    """Дата -> номер дня от 1970-01-01, тот же, что start_ts // SECONDS_PER_DAY"""
+    return (day - _EPOCH.date()).days
+
+
+def from_epoch_day(number: int) -> date:
+    return _EPOCH.date() + timedelta(days=number)
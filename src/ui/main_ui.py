@@ -6,8 +6,10 @@ from kivy.app import App
 from kivy.uix.screenmanager import FadeTransition
 
 from src.config import get_config
+from src.service.maintenance import MaintenanceRunner
 from src.service.utils.event_loop import start_loop
 from src.ui.screens.auth import AuthScreen, RegisterScreen
+from src.ui.screens.calendar import CalendarScreen
 from src.ui.screens.doctor_directory import DoctorDirectoryScreen
 from src.ui.screens.doctor_placeholder import DoctorPlaceholderScreen
 from src.ui.screens.screen_manager import RootScreenManager
@@ -18,6 +20,7 @@ class AuthApp(App):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.loop: AbstractEventLoop = None
+        self.maintenance: MaintenanceRunner | None = None
 
     def build(self):
         conf = get_config()
@@ -27,12 +30,17 @@ class AuthApp(App):
 
         t = threading.Thread(target=start_loop, args=(conf.global_event_loop,), daemon=True)
         t.start()
+        # в режиме remote базу обслуживает сервер
+        if conf.backend_mode != "remote":
+            self.maintenance = MaintenanceRunner()
+            self.maintenance.start()
 
         sm.add_widget(AuthScreen())
         sm.add_widget(RegisterScreen())
         sm.add_widget(DoctorDirectoryScreen(role=StorageStatus.ADMIN))
         sm.add_widget(DoctorDirectoryScreen(role=StorageStatus.PATIENT))
         sm.add_widget(DoctorPlaceholderScreen())
+        sm.add_widget(CalendarScreen())
 
         sm.current = "auth"
         return sm
@@ -6,7 +6,7 @@ from kivy.uix.boxlayout import BoxLayout
 from kivy.core.window import Window
 
 from src.config import get_config
-from src.service.database.actions import login_user, register_patient
+from src.service.backend import SessionContext, login_user, register_patient
 from src.service.database.models import StorageStatus
 from src.ui.screens.base import DarkScreen
 from src.ui.screens.modal_window.modal_with_ok import show_modal
@@ -70,18 +70,17 @@ class AuthScreen(DarkScreen):
         self.set_message("Выполняется вход...")
         self.run_async(login_user(self.login.text, self.password.text), self._after_login)
 
-    def _after_login(self, payload):
+    def _after_login(self, session: SessionContext):
         sm: RootScreenManager = self.manager
-        sm.current_user_id = payload.user_id
-        sm.current_role = payload.role
+        sm.current_session = session
         self.set_message("Успешный вход")
-        if payload.role == StorageStatus.ADMIN:
+        if session.role == StorageStatus.ADMIN:
             sm.get_screen("admin").refresh()
             sm.safe_switch("admin")
-        elif payload.role == StorageStatus.PATIENT:
+        elif session.role == StorageStatus.PATIENT:
             sm.get_screen("patient").refresh()
             sm.safe_switch("patient")
-        elif payload.role == StorageStatus.DOCTOR:
+        elif session.role == StorageStatus.DOCTOR:
             sm.get_screen("doctor").refresh()
             sm.safe_switch("doctor")
 
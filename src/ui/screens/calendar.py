@@ -0,0 +1,208 @@
+import calendar as month_grid
+from datetime import date
+
+from kivy.clock import Clock
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.label import Label
+from kivy.uix.scrollview import ScrollView
+
+from src.config import get_config
+from src.service.appointment_calendar import AppointmentCalendar, MonthKey, shift_month
+from src.service.backend import AppointmentDelta, AppointmentSummary, get_change_seq
+from src.service.change_feed import ChangeFeed
+from src.ui.screens.base import DarkScreen
+from src.ui.screens.doctor_placeholder import STATUS_LABELS, open_appointment_modal
+
+MONTH_NAMES = (
+    "Январь", "Февраль", "Март", "Апрель", "Май", "Июнь",
+    "Июль", "Август", "Сентябрь", "Октябрь", "Ноябрь", "Декабрь",
+)
+WEEKDAY_NAMES = ("Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс")
+
+
+class CalendarScreen(DarkScreen):
+    """
+    Месяц с числом приёмов по дням. Счётчики месяца приходят одним запросом,
+    список приёмов дня загружается только при нажатии на день
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.name = "calendar"
+        self.conf = get_config()
+        # экран, на который возвращает кнопка "Назад"
+        self.return_screen = "auth"
+        self._calendar: AppointmentCalendar | None = None
+        self._feed: ChangeFeed | None = None
+        today = date.today()
+        self._month: MonthKey = (today.year, today.month)
+        self._selected_day: date | None = None
+
+        layout = BoxLayout(orientation="vertical", padding=20, spacing=10)
+        top = BoxLayout(size_hint_y=None, height=44, spacing=8)
+        top.add_widget(
+            Button(
+                text="Назад",
+                size_hint_x=0.2,
+                background_color=self.conf.secondary_btn,
+                color=self.conf.text_color,
+                on_press=lambda *_: self.manager.safe_switch(self.return_screen),
+            )
+        )
+        top.add_widget(
+            Button(
+                text="<",
+                size_hint_x=0.12,
+                background_color=self.conf.secondary_btn,
+                color=self.conf.text_color,
+                on_press=lambda *_: self._go_month(-1),
+            )
+        )
+        self.title = Label(text="", color=self.conf.text_color, font_size="22sp")
+        top.add_widget(self.title)
+        top.add_widget(
+            Button(
+                text=">",
+                size_hint_x=0.12,
+                background_color=self.conf.secondary_btn,
+                color=self.conf.text_color,
+                on_press=lambda *_: self._go_month(1),
+            )
+        )
+        layout.add_widget(top)
+
+        weekdays = GridLayout(cols=7, size_hint_y=None, height=28)
+        for name in WEEKDAY_NAMES:
+            weekdays.add_widget(Label(text=name, color=self.conf.hint_color))
+        layout.add_widget(weekdays)
+
+        self.days_grid = GridLayout(cols=7, spacing=4, size_hint_y=0.55)
+        layout.add_widget(self.days_grid)
+
+        self.day_title = Label(text="Выберите день", color=self.conf.text_color, size_hint_y=None, height=30)
+        layout.add_widget(self.day_title)
+        scroll = ScrollView(size_hint_y=0.45)
+        self.day_layout = BoxLayout(orientation="vertical", spacing=6, size_hint_y=None)
+        self.day_layout.bind(minimum_height=self.day_layout.setter("height"))
+        scroll.add_widget(self.day_layout)
+        layout.add_widget(scroll)
+
+        self.add_widget(layout)
+
+    def on_pre_enter(self, *_):
+        session = self.manager.current_session
+        if self._calendar is None or self._calendar.session is not session:
+            self._calendar = AppointmentCalendar(session)
+        self._selected_day = None
+        self.day_layout.clear_widgets()
+        self.day_title.text = "Выберите день"
+        self.run_async(get_change_seq(), self._start_feed, lambda msg: self.set_message(msg))
+        self._show_month()
+
+    def on_leave(self, *_):
+        if self._feed is not None:
+            self._feed.stop()
+            self._feed = None
+
+    def _start_feed(self, seq: int):
+        if self.manager.current != self.name:
+            return
+        calendar, feed = self._calendar, ChangeFeed(self.manager.current_session, seq)
+        if self._feed is not None:
+            self._feed.stop()
+        self._feed = feed
+
+        def on_delta(delta: AppointmentDelta):
+            # вызывается в потоке цикла, где живёт кеш календаря
+            calendar.apply_delta(delta)
+            Clock.schedule_once(lambda dt: self._after_delta(feed))
+
+        feed.subscribe(on_delta)
+        feed.start()
+
+    def _after_delta(self, feed: ChangeFeed):
+        if feed is not self._feed:
+            return
+        self._show_month()
+        if self._selected_day is not None:
+            self._open_day(self._selected_day)
+
+    def _go_month(self, delta: int):
+        self._month = shift_month(self._month, delta)
+        self._selected_day = None
+        self.day_layout.clear_widgets()
+        self.day_title.text = "Выберите день"
+        self._show_month()
+
+    def _show_month(self):
+        year, month = key = self._month
+        self.title.text = f"{MONTH_NAMES[month - 1]} {year}"
+        if not self._calendar.is_loaded(year, month):
+            self.set_message("Загрузка месяца...")
+        self.run_async(
+            self._calendar.month(year, month),
+            lambda counts: self._render_month(key, counts),
+            lambda msg: self.set_message(msg),
+        )
+
+    def _render_month(self, key: MonthKey, counts: dict[date, int]):
+        if key != self._month:
+            # пока месяц загружался, пользователь перелистнул дальше
+            return
+        self.days_grid.clear_widgets()
+        for week in month_grid.Calendar().monthdatescalendar(*key):
+            for day in week:
+                if day.month != key[1]:
+                    self.days_grid.add_widget(Label())
+                    continue
+                count = counts.get(day, 0)
+                self.days_grid.add_widget(
+                    Button(
+                        text=f"{day.day}\n{count}" if count else str(day.day),
+                        halign="center",
+                        background_color=self.conf.primary_btn if count else self.conf.secondary_btn,
+                        color=self.conf.text_color,
+                        on_press=lambda _, d=day: self._open_day(d),
+                    )
+                )
+        self.set_message(f"Приёмов за месяц: {sum(counts.values())}")
+
+    def _open_day(self, day: date):
+        self._selected_day = day
+        self.day_title.text = f"Приёмы {day.strftime('%d.%m.%Y')}"
+        self.run_async(
+            self._calendar.day(day),
+            lambda appointments: self._render_day(day, appointments),
+            lambda msg: self.set_message(msg),
+        )
+
+    def _render_day(self, day: date, appointments: list[AppointmentSummary]):
+        if day != self._selected_day:
+            return
+        self.day_layout.clear_widgets()
+        if not appointments:
+            self.day_layout.add_widget(Label(text="Приёмов нет", color=self.conf.hint_color, size_hint_y=None, height=34))
+            return
+
+        role = self.manager.current_session.role
+        for appointment in appointments:
+            status_label = STATUS_LABELS.get(appointment.status, appointment.status.value)
+            self.day_layout.add_widget(
+                Button(
+                    text=(
+                        f"{appointment.dt.strftime('%H:%M')} | {appointment.doctor_fio} | "
+                        f"{appointment.patient_fio} | {status_label}"
+                    ),
+                    size_hint_y=None,
+                    height=48,
+                    background_color=self.conf.secondary_btn,
+                    color=self.conf.text_color,
+                    on_press=lambda _, a=appointment: open_appointment_modal(self, a, role, self._poll_now),
+                )
+            )
+
+    def _poll_now(self):
+        if self._feed is not None:
+            self.run_async(self._feed.poll(), None, lambda msg: self.set_message(msg))
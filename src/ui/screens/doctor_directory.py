@@ -1,4 +1,4 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from kivy.uix.anchorlayout import AnchorLayout
 from kivy.uix.boxlayout import BoxLayout
@@ -10,19 +10,23 @@ from kivy.uix.spinner import Spinner
 from kivy.uix.textinput import TextInput
 
 from src.config import get_config
-from src.service.database.actions import (
-    AppointmentView,
+from src.service.backend import (
+    AppointmentSummary,
+    DoctorStatsView,
     DoctorView,
     create_appointment,
     create_doctor,
     delete_doctor,
+    export_appointments,
     get_appointments_by_doctor_id,
-    get_doctors,
+    get_doctor_daily_stats,
+    get_doctor_stats_totals,
+    get_free_slots,
     get_patient_appointments,
-    parse_datetime,
     update_doctor,
 )
 from src.service.database.models import AppointmentStatus, StorageStatus
+from src.service.directory_snapshot import DirectoryDiff, diff_doctors, load_doctor_snapshot, revalidate_doctors
 from src.ui.screens.base import DarkScreen
 from src.ui.screens.modal_window.modal_with_ok import show_modal
 from src.ui.screens.modal_window.modal_yes_or_no import show_confirm_modal
@@ -31,6 +35,7 @@ STATUS_LABELS = {
     AppointmentStatus.SCHEDULED: "Запланирован",
     AppointmentStatus.COMPLETED: "Завершён",
     AppointmentStatus.CANCELLED: "Отменён",
+    AppointmentStatus.NO_SHOW: "Неявка",
 }
 
 
@@ -42,6 +47,8 @@ class DoctorDirectoryScreen(DarkScreen):
         self._doctors: list[DoctorView] = []
         self.selected_doctor_id: int | None = None
         self._doctor_buttons: dict[int, Button] = {}
+        # карточки по id врача: свежий список меняет только добавленные, удалённые и изменившиеся
+        self._doctor_cards: dict[int, BoxLayout] = {}
         self._card_default_color = self.conf.secondary_btn
         self._card_selected_color = (0.45, 0.45, 0.55, 1)
 
@@ -66,7 +73,7 @@ class DoctorDirectoryScreen(DarkScreen):
             height=36,
             background_color=self.conf.secondary_btn,
             color=self.conf.text_color,
-            on_press=lambda *_: self.manager.safe_switch("auth"),
+            on_press=lambda *_: self.manager.logout(),
         )
         self.refresh_btn = Button(
             text="Обновить",
@@ -114,6 +121,10 @@ class DoctorDirectoryScreen(DarkScreen):
         container.add_widget(self.action_row)
 
     def on_pre_enter(self, *_):
+        cached = load_doctor_snapshot()
+        if cached is not None:
+            # список с прошлого входа показывается сразу, свежий догружается в фоне
+            self._show_doctors(cached)
         self.refresh()
 
     def _build_action_buttons(self):
@@ -149,7 +160,21 @@ class DoctorDirectoryScreen(DarkScreen):
             self.action_row.add_widget(self.btn_add)
             self.action_row.add_widget(self.btn_edit)
             self.action_row.add_widget(self.btn_delete)
+            self.btn_export = Button(
+                text="Выгрузить записи",
+                background_color=self.conf.secondary_btn,
+                color=self.conf.text_color,
+                on_press=lambda *_: self._export_appointments(),
+            )
+            self.btn_stats = Button(
+                text="Статистика",
+                background_color=self.conf.secondary_btn,
+                color=self.conf.text_color,
+                on_press=lambda *_: self._open_stats_modal(),
+            )
             self.action_row.add_widget(self.btn_appointments)
+            self.action_row.add_widget(self.btn_export)
+            self.action_row.add_widget(self.btn_stats)
         else:
             self.btn_book = Button(
                 text="Записаться на приём",
@@ -165,23 +190,74 @@ class DoctorDirectoryScreen(DarkScreen):
                 disabled=False,
                 on_press=lambda *_: self._open_patient_appointments(),
             )
+            self.btn_calendar = Button(
+                text="Календарь",
+                background_color=self.conf.secondary_btn,
+                color=self.conf.text_color,
+                on_press=lambda *_: self._open_calendar(),
+            )
             self.action_row.add_widget(self.btn_book)
             self.action_row.add_widget(self.btn_my_appointments)
+            self.action_row.add_widget(self.btn_calendar)
 
     def refresh(self):
-        self.selected_doctor_id = None
-        self._doctor_buttons = {}
-        self._update_action_buttons_state()
-        self.set_message("Загрузка списка врачей...")
-        self.run_async(get_doctors(), self._after_load, self._load_error)
+        if not self._doctors:
+            self.set_message("Загрузка списка врачей...")
+        self.run_async(revalidate_doctors(), self._after_load, self._load_error)
 
     def _after_load(self, doctors: list[DoctorView]):
+        if not self._doctors:
+            self._show_doctors(doctors)
+            return
+        # снимок обычно совпадает со свежим списком: тогда экран не меняется и выбор врача сохраняется
+        diff = diff_doctors(self._doctors, doctors)
+        if diff:
+            self._apply_diff(doctors, diff)
+        self.set_message(f"Найдено врачей: {len(doctors)}")
+
+    def _show_doctors(self, doctors: list[DoctorView]):
+        selected_id = self.selected_doctor_id
         self._doctors = doctors
-        unique_specs = sorted({doctor.specialization for doctor in doctors})
-        self.specialization_filter.values = tuple(["Все специализации", *unique_specs])
-        self.specialization_filter.text = "Все специализации"
+        self._update_specializations()
         self._render_doctors()
         self.set_message(f"Найдено врачей: {len(doctors)}")
+        if selected_id in self._doctor_buttons:
+            self._select_doctor(selected_id)
+
+    def _update_specializations(self):
+        unique_specs = sorted({doctor.specialization for doctor in self._doctors})
+        self.specialization_filter.values = tuple(["Все специализации", *unique_specs])
+        if self.specialization_filter.text not in self.specialization_filter.values:
+            self.specialization_filter.text = "Все специализации"
+
+    def _apply_diff(self, doctors: list[DoctorView], diff: DirectoryDiff):
+        visible = self._filter_by_specialization(doctors)
+        specializations = {"Все специализации", *(doctor.specialization for doctor in doctors)}
+        if self.specialization_filter.text not in specializations or not self._doctor_cards or not visible:
+            # фильтр сбрасывается или на месте списка надпись "Врачи не найдены": список строится заново
+            self._show_doctors(doctors)
+            return
+        self._doctors = doctors
+        self._update_specializations()
+
+        visible_ids = {doctor.id for doctor in visible}
+        # изменившиеся карточки тоже убираются: после смены ФИО врач может переехать в другое место списка
+        stale = {doctor.id for doctor in diff.removed} | {doctor.id for doctor in diff.changed}
+        for doctor_id in [d_id for d_id in self._doctor_cards if d_id in stale or d_id not in visible_ids]:
+            self.doctors_layout.remove_widget(self._doctor_cards.pop(doctor_id))
+            del self._doctor_buttons[doctor_id]
+
+        for position, doctor in enumerate(visible):
+            if doctor.id in self._doctor_cards:
+                continue
+            card = self._make_card(doctor)
+            # у BoxLayout первый в children - нижний виджет
+            self.doctors_layout.add_widget(card, index=len(self.doctors_layout.children) - position)
+
+        if self.selected_doctor_id not in self._doctor_buttons:
+            self.selected_doctor_id = None
+        self._refresh_button_colors()
+        self._update_action_buttons_state()
 
     def _load_error(self, error_msg: str):
         self.set_message(error_msg)
@@ -204,6 +280,7 @@ class DoctorDirectoryScreen(DarkScreen):
     def _render_doctors(self):
         self.doctors_layout.clear_widgets()
         self._doctor_buttons = {}
+        self._doctor_cards = {}
         self.selected_doctor_id = None
         doctors = self._filter_by_specialization(self._doctors)
 
@@ -215,22 +292,26 @@ class DoctorDirectoryScreen(DarkScreen):
             return
 
         for doctor in doctors:
-            card = BoxLayout(orientation="vertical", spacing=4, padding=10, size_hint_y=None, height=92)
-            select_btn = Button(
-                text=f"ФИО: {doctor.fio}\nСпециализация: {doctor.specialization}",
-                halign="left",
-                valign="middle",
-                background_color=self._card_default_color,
-                color=self.conf.text_color,
-                on_press=lambda _, d_id=doctor.id: self._select_doctor(d_id),
-            )
-            select_btn.bind(size=lambda inst, _: setattr(inst, "text_size", (inst.width - 20, inst.height)))
-            card.add_widget(select_btn)
-            self.doctors_layout.add_widget(card)
-            self._doctor_buttons[doctor.id] = select_btn
+            self.doctors_layout.add_widget(self._make_card(doctor))
 
         self._update_action_buttons_state()
 
+    def _make_card(self, doctor: DoctorView) -> BoxLayout:
+        card = BoxLayout(orientation="vertical", spacing=4, padding=10, size_hint_y=None, height=92)
+        select_btn = Button(
+            text=f"ФИО: {doctor.fio}\nСпециализация: {doctor.specialization}",
+            halign="left",
+            valign="middle",
+            background_color=self._card_default_color,
+            color=self.conf.text_color,
+            on_press=lambda _, d_id=doctor.id: self._select_doctor(d_id),
+        )
+        select_btn.bind(size=lambda inst, _: setattr(inst, "text_size", (inst.width - 20, inst.height)))
+        card.add_widget(select_btn)
+        self._doctor_cards[doctor.id] = card
+        self._doctor_buttons[doctor.id] = select_btn
+        return card
+
     def _select_doctor(self, doctor_id: int):
         self.selected_doctor_id = doctor_id
         self._refresh_button_colors()
@@ -262,29 +343,72 @@ class DoctorDirectoryScreen(DarkScreen):
             show_modal("Выберите врача")
             return
 
-        modal = ModalView(size_hint=(0.75, 0.42), auto_dismiss=False)
+        modal = ModalView(size_hint=(0.75, 0.5), auto_dismiss=False)
         root = BoxLayout(orientation="vertical", padding=16, spacing=10)
         root.add_widget(Label(text=f"Запись к врачу: {doctor.fio}", color=self.conf.text_color, size_hint_y=None, height=32))
-        dt_input = TextInput(
-            hint_text="Дата и время (ГГГГ-ММ-ДД ЧЧ:ММ)",
-            multiline=False,
+        hint = Label(text="Загрузка свободного времени...", color=self.conf.hint_color, size_hint_y=None, height=28)
+        root.add_widget(hint)
+
+        day_spinner = Spinner(
+            text="Дата",
+            values=(),
             size_hint_y=None,
             height=44,
-            text=(datetime.now() + timedelta(hours=1)).strftime("%Y-%m-%d %H:%M"),
+            background_color=self.conf.secondary_btn,
+            color=self.conf.text_color,
+            disabled=True,
+        )
+        time_spinner = Spinner(
+            text="Время",
+            values=(),
+            size_hint_y=None,
+            height=44,
+            background_color=self.conf.secondary_btn,
+            color=self.conf.text_color,
+            disabled=True,
+        )
+        root.add_widget(day_spinner)
+        root.add_widget(time_spinner)
+
+        slots_by_day: dict[str, dict[str, datetime]] = {}
+
+        def on_day(*_):
+            times = slots_by_day.get(day_spinner.text, {})
+            time_spinner.values = tuple(times)
+            time_spinner.text = next(iter(times), "Время")
+            time_spinner.disabled = not times
+
+        def on_slots(slots: list[datetime]):
+            for slot in slots:
+                slots_by_day.setdefault(slot.strftime("%d.%m.%Y"), {})[slot.strftime("%H:%M")] = slot
+            if not slots_by_day:
+                hint.text = "Свободного времени нет"
+                return
+            hint.text = "Выберите дату и время"
+            day_spinner.values = tuple(slots_by_day)
+            day_spinner.disabled = False
+            day_spinner.text = next(iter(slots_by_day))
+            on_day()
+
+        day_spinner.bind(text=on_day)
+
+        today = date.today()
+        self.run_async(
+            get_free_slots(doctor.id, today, today + timedelta(days=self.conf.booking_horizon_days)),
+            on_slots,
+            lambda msg: setattr(hint, "text", msg),
         )
-        root.add_widget(dt_input)
 
         actions = BoxLayout(orientation="horizontal", spacing=8, size_hint_y=None, height=44)
 
         def submit(*_):
-            try:
-                dt = parse_datetime(dt_input.text)
-            except Exception as e:
-                show_modal(f"Ошибка: {e}")
+            dt = slots_by_day.get(day_spinner.text, {}).get(time_spinner.text)
+            if dt is None:
+                show_modal("Выберите дату и время")
                 return
 
             self.run_async(
-                create_appointment(self.manager.current_user_id, doctor.id, dt),
+                create_appointment(self.manager.current_session, doctor.id, dt),
                 lambda *_: self._after_patient_book(modal),
                 lambda msg: show_modal(msg),
             )
@@ -315,11 +439,15 @@ class DoctorDirectoryScreen(DarkScreen):
 
     def _open_patient_appointments(self):
         self.run_async(
-            get_patient_appointments(self.manager.current_user_id),
+            get_patient_appointments(self.manager.current_session, include_archived=True),
             lambda appointments: self._show_appointments_modal(appointments, "Мои приёмы", StorageStatus.PATIENT),
             lambda msg: show_modal(msg),
         )
 
+    def _open_calendar(self):
+        self.manager.get_screen("calendar").return_screen = self.name
+        self.manager.safe_switch("calendar")
+
     def _open_admin_doctor_appointments(self):
         doctor = self._selected_doctor()
         if doctor is None:
@@ -327,7 +455,7 @@ class DoctorDirectoryScreen(DarkScreen):
             return
 
         self.run_async(
-            get_appointments_by_doctor_id(doctor.id),
+            get_appointments_by_doctor_id(doctor.id, include_archived=True),
             lambda appointments: self._show_appointments_modal(
                 appointments,
                 f"Приёмы врача: {doctor.fio}",
@@ -336,7 +464,109 @@ class DoctorDirectoryScreen(DarkScreen):
             lambda msg: show_modal(msg),
         )
 
-    def _show_appointments_modal(self, appointments: list[AppointmentView], title: str, role: StorageStatus):
+    def _export_appointments(self):
+        """Записи выбранного врача, а если врач не выбран - все записи, в CSV в папку выгрузок"""
+        doctor = self._selected_doctor()
+        output = self.conf.export_dir / f"appointments_{datetime.now():%Y%m%d_%H%M%S}.csv"
+        self.run_async(
+            export_appointments(output, doctor_id=doctor.id if doctor else None),
+            lambda written: show_modal(f"Выгружено записей: {written}\n{output}"),
+            lambda msg: show_modal(msg),
+        )
+
+    def _open_stats_modal(self):
+        """Приёмы врачей за период из сводки статистики; нажатие на врача показывает его приёмы по дням"""
+        modal = ModalView(size_hint=(0.9, 0.85), auto_dismiss=False)
+        root = BoxLayout(orientation="vertical", spacing=10, padding=12)
+        title = Label(text="Статистика приёмов", color=self.conf.text_color, size_hint_y=None, height=34, font_size="20sp")
+        root.add_widget(title)
+
+        today = date.today()
+        period_row = BoxLayout(orientation="horizontal", spacing=8, size_hint_y=None, height=44)
+        from_input = TextInput(text=(today - timedelta(days=30)).isoformat(), hint_text="ГГГГ-ММ-ДД", multiline=False)
+        to_input = TextInput(text=today.isoformat(), hint_text="ГГГГ-ММ-ДД", multiline=False)
+        period_row.add_widget(Label(text="С", color=self.conf.text_color, size_hint_x=None, width=30))
+        period_row.add_widget(from_input)
+        period_row.add_widget(Label(text="по", color=self.conf.text_color, size_hint_x=None, width=40))
+        period_row.add_widget(to_input)
+        root.add_widget(period_row)
+
+        scroll = ScrollView()
+        list_layout = BoxLayout(orientation="vertical", spacing=8, size_hint_y=None)
+        list_layout.bind(minimum_height=list_layout.setter("height"))
+        scroll.add_widget(list_layout)
+        root.add_widget(scroll)
+
+        def period() -> tuple[date, date] | None:
+            try:
+                return date.fromisoformat(from_input.text.strip()), date.fromisoformat(to_input.text.strip())
+            except ValueError:
+                show_modal("Формат даты: ГГГГ-ММ-ДД")
+                return None
+
+        def show_rows(rows: list[DoctorStatsView], empty_text: str):
+            list_layout.clear_widgets()
+            if not rows:
+                list_layout.add_widget(Label(text=empty_text, color=self.conf.hint_color, size_hint_y=None, height=34))
+            for row in rows:
+                label = row.doctor_fio if row.day is None else row.day.strftime("%d.%m.%Y")
+                list_layout.add_widget(
+                    Button(
+                        text=f"{label} | записано: {row.booked} | завершено: {row.completed} | отменено: {row.cancelled}",
+                        size_hint_y=None,
+                        height=48,
+                        background_color=self.conf.secondary_btn,
+                        color=self.conf.text_color,
+                        disabled=row.day is not None,
+                        on_press=lambda _, r=row: load_days(r),
+                    )
+                )
+
+        def load_totals(*_):
+            dates = period()
+            if dates is None:
+                return
+            title.text = "Статистика приёмов"
+            self.run_async(
+                get_doctor_stats_totals(*dates),
+                lambda rows: show_rows(rows, "Врачей нет"),
+                lambda msg: show_modal(msg),
+            )
+
+        def load_days(total: DoctorStatsView):
+            dates = period()
+            if dates is None:
+                return
+            title.text = f"Статистика приёмов: {total.doctor_fio}"
+            self.run_async(
+                get_doctor_daily_stats(total.doctor_id, *dates),
+                lambda rows: show_rows(rows, "Приёмов за период нет"),
+                lambda msg: show_modal(msg),
+            )
+
+        actions = BoxLayout(orientation="horizontal", spacing=8, size_hint_y=None, height=44)
+        actions.add_widget(
+            Button(
+                text="Показать",
+                background_color=self.conf.primary_btn,
+                color=self.conf.text_color,
+                on_press=load_totals,
+            )
+        )
+        actions.add_widget(
+            Button(
+                text="Закрыть",
+                background_color=self.conf.secondary_btn,
+                color=self.conf.text_color,
+                on_press=lambda *_: modal.dismiss(),
+            )
+        )
+        root.add_widget(actions)
+        modal.add_widget(root)
+        modal.open()
+        load_totals()
+
+    def _show_appointments_modal(self, appointments: list[AppointmentSummary], title: str, role: StorageStatus):
         modal = ModalView(size_hint=(0.9, 0.85), auto_dismiss=False)
         root = BoxLayout(orientation="vertical", spacing=10, padding=12)
         root.add_widget(Label(text=title, color=self.conf.text_color, size_hint_y=None, height=34, font_size="20sp"))
@@ -483,7 +713,7 @@ class DoctorDirectoryScreen(DarkScreen):
         self.refresh()
         show_modal("Врач удален")
 
-    def _open_appointment_details(self, appointment: AppointmentView, role: StorageStatus):
+    def _open_appointment_details(self, appointment: AppointmentSummary, role: StorageStatus):
         from src.ui.screens.doctor_placeholder import open_appointment_modal
 
         open_appointment_modal(parent=self, appointment=appointment, role=role, on_saved=None)
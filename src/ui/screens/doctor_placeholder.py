@@ -1,7 +1,9 @@
 from datetime import datetime
 
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
+from kivy.uix.checkbox import CheckBox
 from kivy.uix.label import Label
 from kivy.uix.modalview import ModalView
 from kivy.uix.scrollview import ScrollView
@@ -9,7 +11,18 @@ from kivy.uix.spinner import Spinner
 from kivy.uix.textinput import TextInput
 
 from src.config import get_config
-from src.service.database.actions import AppointmentView, get_doctor_appointments, update_appointment_by_doctor
+from src.service.backend import (
+    AppointmentDelta,
+    AppointmentSummary,
+    AppointmentView,
+    SessionContext,
+    get_appointment_details,
+    get_change_seq,
+    get_doctor_appointments,
+    update_appointment_by_doctor,
+    update_appointments_status,
+)
+from src.service.change_feed import ChangeFeed
 from src.service.database.models import AppointmentStatus, StorageStatus
 from src.ui.screens.base import DarkScreen
 from src.ui.screens.modal_window.modal_with_ok import show_modal
@@ -18,6 +31,7 @@ STATUS_LABELS = {
     AppointmentStatus.SCHEDULED: "Запланирован",
     AppointmentStatus.COMPLETED: "Завершён",
     AppointmentStatus.CANCELLED: "Отменён",
+    AppointmentStatus.NO_SHOW: "Неявка",
 }
 LABEL_TO_STATUS = {label: status for status, label in STATUS_LABELS.items()}
 
@@ -27,8 +41,12 @@ class DoctorPlaceholderScreen(DarkScreen):
         super().__init__(**kwargs)
         self.name = "doctor"
         self.conf = get_config()
-        self._appointments: list[AppointmentView] = []
+        self._appointments: list[AppointmentSummary] = []
+        self._selected_ids: set[int] = set()
         self._filter = "future"
+        # строки списка по id приёма: изменения из журнала перерисовывают только свои строки
+        self._rows: dict[int, BoxLayout] = {}
+        self._feed: ChangeFeed | None = None
 
         layout = BoxLayout(orientation="vertical", padding=20, spacing=12)
         top = BoxLayout(size_hint_y=None, height=44, spacing=8)
@@ -38,10 +56,19 @@ class DoctorPlaceholderScreen(DarkScreen):
                 background_color=self.conf.secondary_btn,
                 color=self.conf.text_color,
                 size_hint_x=0.2,
-                on_press=lambda *_: self.manager.safe_switch("auth"),
+                on_press=lambda *_: self.manager.logout(),
             )
         )
         top.add_widget(Label(text="Кабинет врача", color=self.conf.text_color, font_size="22sp"))
+        top.add_widget(
+            Button(
+                text="Календарь",
+                background_color=self.conf.secondary_btn,
+                color=self.conf.text_color,
+                size_hint_x=0.25,
+                on_press=lambda *_: self._open_calendar(),
+            )
+        )
         top.add_widget(
             Button(
                 text="Обновить",
@@ -71,22 +98,108 @@ class DoctorPlaceholderScreen(DarkScreen):
         scroll.add_widget(self.list_layout)
         layout.add_widget(scroll)
 
+        bulk = BoxLayout(size_hint_y=None, height=44, spacing=8)
+        self.btn_complete_selected = Button(
+            text="Завершить выбранные",
+            background_color=self.conf.primary_btn,
+            color=self.conf.text_color,
+            disabled=True,
+            on_press=lambda *_: self._bulk_update(AppointmentStatus.COMPLETED),
+        )
+        self.btn_cancel_selected = Button(
+            text="Отменить выбранные",
+            background_color=(0.7, 0.2, 0.2, 1),
+            color=self.conf.text_color,
+            disabled=True,
+            on_press=lambda *_: self._bulk_update(AppointmentStatus.CANCELLED),
+        )
+        bulk.add_widget(self.btn_complete_selected)
+        bulk.add_widget(self.btn_cancel_selected)
+        layout.add_widget(bulk)
+
         self.add_widget(layout)
 
     def on_pre_enter(self, *_):
         self.refresh()
 
+    def on_leave(self, *_):
+        self._stop_feed()
+
+    def _open_calendar(self):
+        self.manager.get_screen("calendar").return_screen = self.name
+        self.manager.safe_switch("calendar")
+
     def refresh(self):
         self.set_message("Загрузка приёмов...")
         self.run_async(
-            get_doctor_appointments(self.manager.current_user_id),
+            _load_appointments(self.manager.current_session),
             self._after_load,
             lambda msg: self.set_message(msg),
         )
 
-    def _after_load(self, appointments: list[AppointmentView]):
+    def _after_load(self, loaded: tuple[int, list[AppointmentSummary]]):
+        seq, appointments = loaded
         self._appointments = appointments
         self._render_appointments()
+        self._start_feed(seq)
+
+    def _start_feed(self, seq: int):
+        self._stop_feed()
+        feed = self._feed = ChangeFeed(self.manager.current_session, seq)
+        feed.subscribe(lambda delta: Clock.schedule_once(lambda dt: self._apply_delta(feed, delta)))
+        feed.start()
+
+    def _stop_feed(self):
+        if self._feed is not None:
+            self._feed.stop()
+            self._feed = None
+
+    def _poll_now(self):
+        """Свои изменения показываем сразу, не дожидаясь очередного опроса"""
+        if self._feed is None:
+            self.refresh()
+            return
+        self.run_async(self._feed.poll(), None, lambda msg: self.set_message(msg))
+
+    def _apply_delta(self, feed: ChangeFeed, delta: AppointmentDelta):
+        if feed is not self._feed:
+            return
+        if delta.reset:
+            # часть журнала уже очищена: изменения не восстановить, список загружается заново
+            self.refresh()
+            return
+
+        by_id = {item.id: item for item in self._appointments}
+        for item in delta.changed:
+            by_id[item.id] = item
+        for appointment_id in delta.removed:
+            by_id.pop(appointment_id, None)
+        self._appointments = sorted(by_id.values(), key=lambda item: item.dt)
+
+        visible = self._filtered()
+        if not self._rows or not visible:
+            # на месте списка надпись "Приёмов нет"
+            self._render_appointments()
+            return
+
+        visible_ids = {item.id for item in visible}
+        for appointment_id in [a_id for a_id in self._rows if a_id not in visible_ids]:
+            self.list_layout.remove_widget(self._rows.pop(appointment_id))
+
+        changed_ids = {item.id for item in delta.changed}
+        for position, item in enumerate(visible):
+            if item.id not in changed_ids and item.id in self._rows:
+                continue
+            old = self._rows.pop(item.id, None)
+            if old is not None:
+                self.list_layout.remove_widget(old)
+            row = self._rows[item.id] = self._make_row(item)
+            # у BoxLayout первый в children - нижний виджет
+            self.list_layout.add_widget(row, index=len(self.list_layout.children) - position)
+
+        self._selected_ids &= visible_ids
+        self._update_bulk_buttons()
+        self.set_message(f"Найдено приёмов: {len(visible)}")
 
     def _on_filter_change(self):
         mapping = {
@@ -97,20 +210,21 @@ class DoctorPlaceholderScreen(DarkScreen):
         self._filter = mapping.get(self.filter_spinner.text, "future")
         self._render_appointments()
 
-    def _filtered(self) -> list[AppointmentView]:
+    def _filtered(self) -> list[AppointmentSummary]:
         now = datetime.now()
         if self._filter == "all":
             return self._appointments
         if self._filter == "past":
-            return [
-                item for item in self._appointments
-                if item.status == AppointmentStatus.COMPLETED or item.status == AppointmentStatus.CANCELLED
-            ]
+            return [item for item in self._appointments if item.status != AppointmentStatus.SCHEDULED]
         return [item for item in self._appointments if item.status == AppointmentStatus.SCHEDULED]
 
     def _render_appointments(self):
         self.list_layout.clear_widgets()
+        self._rows.clear()
         appointments = self._filtered()
+        # выбранными остаются только видимые приёмы
+        self._selected_ids &= {item.id for item in appointments}
+        self._update_bulk_buttons()
 
         if not appointments:
             self.list_layout.add_widget(Label(text="Приёмов нет", color=self.conf.hint_color, size_hint_y=None, height=40))
@@ -118,33 +232,85 @@ class DoctorPlaceholderScreen(DarkScreen):
             return
 
         for appointment in appointments:
-            status_label = STATUS_LABELS.get(appointment.status, appointment.status.value)
-            btn = Button(
-                text=(
-                    f"{appointment.dt.strftime('%d.%m.%Y %H:%M')}\n"
-                    f"Пациент: {appointment.patient_fio} | Статус: {status_label}"
-                ),
-                size_hint_y=None,
-                height=72,
-                halign="left",
-                valign="middle",
-                background_color=self.conf.secondary_btn,
-                color=self.conf.text_color,
-            )
-            btn.bind(size=lambda inst, _: setattr(inst, "text_size", (inst.width - 20, inst.height)))
-            btn.bind(on_press=lambda _, a=appointment: self._open_details(a))
-            self.list_layout.add_widget(btn)
+            row = self._rows[appointment.id] = self._make_row(appointment)
+            self.list_layout.add_widget(row)
 
         self.set_message(f"Найдено приёмов: {len(appointments)}")
 
-    def _open_details(self, appointment: AppointmentView):
+    def _make_row(self, appointment: AppointmentSummary) -> BoxLayout:
+        status_label = STATUS_LABELS.get(appointment.status, appointment.status.value)
+        row = BoxLayout(size_hint_y=None, height=72, spacing=6)
+        check = CheckBox(size_hint_x=None, width=44, active=appointment.id in self._selected_ids)
+        check.bind(active=lambda _, value, a_id=appointment.id: self._toggle_selected(a_id, value))
+        btn = Button(
+            text=(
+                f"{appointment.dt.strftime('%d.%m.%Y %H:%M')}\n"
+                f"Пациент: {appointment.patient_fio} | Статус: {status_label}"
+            ),
+            size_hint_y=None,
+            height=72,
+            halign="left",
+            valign="middle",
+            background_color=self.conf.secondary_btn,
+            color=self.conf.text_color,
+        )
+        btn.bind(size=lambda inst, _: setattr(inst, "text_size", (inst.width - 20, inst.height)))
+        btn.bind(on_press=lambda _, a=appointment: self._open_details(a))
+        row.add_widget(check)
+        row.add_widget(btn)
+        return row
+
+    def _toggle_selected(self, appointment_id: int, active: bool):
+        if active:
+            self._selected_ids.add(appointment_id)
+        else:
+            self._selected_ids.discard(appointment_id)
+        self._update_bulk_buttons()
+
+    def _update_bulk_buttons(self):
+        nothing_selected = not self._selected_ids
+        self.btn_complete_selected.disabled = nothing_selected
+        self.btn_cancel_selected.disabled = nothing_selected
+
+    def _bulk_update(self, status: AppointmentStatus):
+        if not self._selected_ids:
+            show_modal("Выберите приёмы")
+            return
+
+        self.run_async(
+            update_appointments_status(self.manager.current_session, sorted(self._selected_ids), status),
+            self._after_bulk_update,
+            lambda msg: show_modal(msg),
+        )
+
+    def _after_bulk_update(self, updated: int):
+        self._selected_ids.clear()
+        show_modal(f"Обновлено приёмов: {updated}")
+        self._poll_now()
+
+    def _open_details(self, appointment: AppointmentSummary):
         try:
-            open_appointment_modal(self, appointment, StorageStatus.DOCTOR, self.refresh)
+            open_appointment_modal(self, appointment, StorageStatus.DOCTOR, self._poll_now)
         except Exception as exc:
             show_modal(f"Ошибка при открытии приёма: {exc}")
 
 
-def open_appointment_modal(parent, appointment: AppointmentView, role: StorageStatus, on_saved=None):
+async def _load_appointments(session: SessionContext) -> tuple[int, list[AppointmentSummary]]:
+    # номер берётся до списка: изменение между двумя запросами придёт повторно, но не потеряется
+    seq = await get_change_seq()
+    return seq, await get_doctor_appointments(session, include_archived=True)
+
+
+def open_appointment_modal(parent, appointment: AppointmentSummary, role: StorageStatus, on_saved=None):
+    """Заметки в списке не загружаются: перед показом окна подгружаем приём целиком"""
+    parent.run_async(
+        get_appointment_details(parent.manager.current_session, appointment.id),
+        lambda details: _show_appointment_modal(parent, details, role, on_saved),
+        lambda msg: show_modal(msg),
+    )
+
+
+def _show_appointment_modal(parent, appointment: AppointmentView, role: StorageStatus, on_saved=None):
     conf = get_config()
     modal = ModalView(size_hint=(0.88, 0.9), auto_dismiss=False)
     root = BoxLayout(orientation="vertical", spacing=8, padding=12)
@@ -167,7 +333,8 @@ def open_appointment_modal(parent, appointment: AppointmentView, role: StorageSt
         height=44,
     )
 
-    can_edit = role == StorageStatus.DOCTOR
+    # архивный приём только для просмотра
+    can_edit = role == StorageStatus.DOCTOR and not appointment.archived
     complaint.disabled = not can_edit
     condition.disabled = not can_edit
     conclusion.disabled = not can_edit
@@ -194,7 +361,7 @@ def open_appointment_modal(parent, appointment: AppointmentView, role: StorageSt
 
             parent.run_async(
                 update_appointment_by_doctor(
-                    parent.manager.current_user_id,
+                    parent.manager.current_session,
                     appointment.id,
                     complaint.text,
                     condition.text,
@@ -2,6 +2,7 @@ from kivy.clock import Clock
 from kivy.graphics import Color, Rectangle
 from kivy.uix.screenmanager import ScreenManager
 
+from src.service.backend import SessionContext, end_session
 from src.service.database.models import StorageStatus
 
 
@@ -14,8 +15,21 @@ class RootScreenManager(ScreenManager):
             self.bg = Rectangle(size=self.size, pos=self.pos)
 
         self.bind(size=self._update_bg, pos=self._update_bg)
-        self.current_user_id: int | None = None
-        self.current_role: StorageStatus | None = None
+        self.current_session: SessionContext | None = None
+
+    @property
+    def current_user_id(self) -> int | None:
+        return self.current_session.user_id if self.current_session else None
+
+    @property
+    def current_role(self) -> StorageStatus | None:
+        return self.current_session.role if self.current_session else None
+
+    def logout(self):
+        if self.current_session is not None:
+            end_session(self.current_session)
+            self.current_session = None
+        self.safe_switch("auth")
 
     def _update_bg(self, *args):
         self.bg.size = self.size
@@ -0,0 +1,37 @@
+"""Каждый тест работает с отдельной базой SQLite во временной папке и на своём event loop"""
+import asyncio
+
+import pytest
+
+from src.config import set_config
+from src.service.database.core.database import dispose_engines
+from src.service.database.core.filling import filling_db
+from src.service.models.conf_model import Config
+
+
+@pytest.fixture
+def run_db(tmp_path):
+    """
+    run_db(make, **overrides) создаёт пустую базу, выполняет await make() и закрывает движки.
+    overrides - поля Config поверх значений по умолчанию
+    """
+
+    def run(make, **overrides):
+        async def main():
+            set_config(
+                Config(
+                    global_event_loop=asyncio.get_running_loop(),
+                    data_base_path=tmp_path / "test.sqlite3",
+                    sql_echo=False,
+                    **overrides,
+                )
+            )
+            await filling_db()
+            try:
+                return await make()
+            finally:
+                await dispose_engines()
+
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,49 @@
+"""Кеш аналитики: отчёт пересчитывается после изменения врачей и расписаний и не переходит между базами"""
+from datetime import date, datetime, time
+
+import numpy as np
+
+from src.service.analytics import compute_analytics
+from src.service.database.actions import (
+    ScheduleView,
+    create_appointment,
+    create_doctor,
+    login_user,
+    register_patient,
+    set_weekly_schedule,
+)
+
+DATE_FROM, DATE_TO = date(2020, 3, 1), date(2020, 3, 31)
+
+
+def test_schedule_and_doctor_changes_refresh_report(run_db):
+    async def scenario():
+        await create_doctor("doctor", "pass", "Врач", "Терапевт")
+        doctor_id = (await login_user("doctor", "pass")).doctor_id
+        patient = await register_patient("patient", "pass", "Пациент", "+79000000000")
+        await create_appointment(patient, doctor_id, datetime(2020, 3, 2, 9, 0))
+        # 22 рабочих дня по 9 часов
+        report = await compute_analytics(DATE_FROM, DATE_TO)
+        assert report.doctor_ids == [doctor_id]
+        assert np.allclose(report.utilization, 0.5 / (22 * 9))
+
+        # пять понедельников по часу
+        await set_weekly_schedule(doctor_id, [ScheduleView(0, time(9, 0), time(10, 0), 30)])
+        assert np.allclose((await compute_analytics(DATE_FROM, DATE_TO)).utilization, 0.5 / 5)
+
+        await create_doctor("doctor2", "pass", "Врач 2", "Хирург")
+        assert len((await compute_analytics(DATE_FROM, DATE_TO)).doctor_ids) == 2
+
+    run_db(scenario)
+
+
+def test_cache_is_per_database(run_db, tmp_path):
+    async def first():
+        await create_doctor("doctor", "pass", "Врач", "Терапевт")
+        assert len((await compute_analytics(DATE_FROM, DATE_TO)).doctor_ids) == 1
+
+    async def second():
+        assert (await compute_analytics(DATE_FROM, DATE_TO)).doctor_ids == []
+
+    run_db(first)
+    run_db(second, database_url=f"sqlite+aiosqlite:///{tmp_path / 'other.sqlite3'}")
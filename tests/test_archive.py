@@ -0,0 +1,123 @@
+"""Архив приёмов: перенесённые приёмы не теряются для истории, выгрузки и аналитики"""
+from datetime import date, datetime
+
+from sqlalchemy import func, select, update
+
+from src.service.analytics import compute_analytics
+from src.service.database.actions import (
+    archive_appointments,
+    create_appointment,
+    create_doctor,
+    export_appointments,
+    fetch_appointment_columns,
+    get_appointment_changes,
+    get_calendar_day,
+    get_calendar_month,
+    get_appointment_details,
+    get_appointments_all_branches,
+    get_patient_appointments,
+    login_user,
+    register_patient,
+)
+from src.service.database.core.database import get_db, get_read_db, use_branch
+from src.service.database.models import Appointment, AppointmentArchive, AppointmentStatus
+
+OLD = datetime(2020, 3, 2, 10, 0)
+RECENT = datetime(2030, 3, 4, 10, 0)
+
+
+async def _two_appointments():
+    """Старый завершённый приём и будущий; старый уходит в архив"""
+    await create_doctor("doctor", "pass", "Врач", "Терапевт")
+    doctor = await login_user("doctor", "pass")
+    patient = await register_patient("patient", "pass", "Пациент", "+79000000000")
+    await create_appointment(patient, doctor.doctor_id, OLD)
+    async with get_db() as db:
+        await db.execute(update(Appointment).values(status=AppointmentStatus.COMPLETED))
+        await db.commit()
+    await create_appointment(patient, doctor.doctor_id, RECENT)
+    assert await archive_appointments() == 1
+    return doctor, patient
+
+
+def test_archived_appointment_keeps_unique_id(run_db):
+    async def scenario():
+        _, patient = await _two_appointments()
+        history = await get_patient_appointments(patient, include_archived=True)
+        assert [item.dt for item in history] == [OLD, RECENT]
+        assert len({item.id for item in history}) == 2
+        assert (await get_appointment_details(patient, history[0].id)).archived
+        assert await archive_appointments() == 0
+
+    run_db(scenario)
+
+
+def test_export_and_columns_include_archive(run_db, tmp_path):
+    async def scenario():
+        await _two_appointments()
+        async with get_read_db() as db:
+            assert (await db.execute(select(func.count()).select_from(AppointmentArchive))).scalar_one() == 1
+
+        columns = await fetch_appointment_columns()
+        assert [columns.summary(i).dt for i in range(len(columns))] == [OLD, RECENT]
+        assert await export_appointments(tmp_path / "all.csv") == 2
+        assert await export_appointments(tmp_path / "old.csv", date_from=datetime(2020, 1, 1), date_to=datetime(2021, 1, 1)) == 1
+        assert await export_appointments(tmp_path / "recent.csv", date_from=datetime(2030, 1, 1)) == 1
+
+    run_db(scenario)
+
+
+def test_analytics_counts_archived_appointments(run_db):
+    async def scenario():
+        await _two_appointments()
+        report = await compute_analytics(date(2020, 3, 1), date(2020, 3, 31))
+        assert report.booked.tolist() == [1]
+
+    run_db(scenario)
+
+
+def test_manual_archive_below_configured_horizon_stays_visible(run_db, tmp_path):
+    async def scenario():
+        await create_doctor("doctor", "pass", "Врач", "Терапевт")
+        doctor = await login_user("doctor", "pass")
+        patient = await register_patient("patient", "pass", "Пациент", "+79000000000")
+        await create_appointment(patient, doctor.doctor_id, RECENT)
+        async with get_db() as db:
+            await db.execute(update(Appointment).values(status=AppointmentStatus.COMPLETED))
+            await db.commit()
+        # как manage archive-appointments --days с горизонтом короче archive_after_days
+        assert await archive_appointments(datetime(2031, 1, 1)) == 1
+
+        month = await get_calendar_month(doctor, RECENT.year, RECENT.month)
+        assert [(item.day, item.count) for item in month] == [(RECENT.date(), 1)]
+        assert [item.dt for item in await get_calendar_day(doctor, RECENT.date())] == [RECENT]
+        assert await export_appointments(tmp_path / "recent.csv", date_from=datetime(2030, 1, 1)) == 1
+
+    run_db(scenario)
+
+
+def test_all_branches_range_includes_archive(run_db, tmp_path):
+    async def scenario():
+        for branch_id in (1, 2):
+            with use_branch(branch_id):
+                await _two_appointments()
+
+        history = await get_appointments_all_branches(datetime(2020, 1, 1), datetime(2031, 1, 1))
+        assert [(item.dt, item.branch_id) for item in history] == [(OLD, 1), (OLD, 2), (RECENT, 1), (RECENT, 2)]
+        old = await get_appointments_all_branches(datetime(2020, 1, 1), datetime(2021, 1, 1))
+        assert {item.branch_id for item in old} == {1, 2}
+        assert all(item.status == AppointmentStatus.COMPLETED for item in old)
+
+    branches = {branch_id: f"sqlite+aiosqlite:///{tmp_path / f'branch_{branch_id}.sqlite3'}" for branch_id in (1, 2)}
+    run_db(scenario, branches=branches, branch_id=1)
+
+
+def test_change_feed_reports_archived_as_changed(run_db):
+    async def scenario():
+        doctor, patient = await _two_appointments()
+        for session in (doctor, patient):
+            delta = await get_appointment_changes(session, 0)
+            assert sorted(item.dt for item in delta.changed) == [OLD, RECENT]
+            assert delta.removed == []
+
+    run_db(scenario)
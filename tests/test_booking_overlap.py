@@ -0,0 +1,150 @@
+"""
+Свойство записи на приём: у врача никогда нет двух неотменённых приёмов, пересекающихся по времени.
+Случайные записи, отмены и возвраты отменённых приёмов генерируются из фиксированного seed
+и сверяются с простой моделью расписания в памяти
+"""
+import asyncio
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from src.service.database.actions import (
+    create_appointment,
+    create_doctor,
+    login_user,
+    register_patient,
+    update_appointment_by_doctor,
+    update_appointments_status,
+)
+from src.service.database.core.database import get_read_db
+from src.service.database.models import Appointment, AppointmentStatus
+from src.service.exeptions import ServiceError
+from src.service.utils.epoch import to_epoch
+
+DAY = datetime(2030, 3, 4, 9, 0)
+ACTIVE = tuple(status for status in AppointmentStatus if status != AppointmentStatus.CANCELLED)
+
+
+async def _people(doctors: int, patients: int):
+    for i in range(doctors):
+        await create_doctor(f"doctor_{i}", "pass", f"Врач {i}", "Терапевт")
+    doctor_sessions = [await login_user(f"doctor_{i}", "pass") for i in range(doctors)]
+    patient_sessions = [
+        await register_patient(f"patient_{i}", "pass", f"Пациент {i}", f"+7900000{i:04d}") for i in range(patients)
+    ]
+    return doctor_sessions, patient_sessions
+
+
+def _random_booking(rnd: random.Random) -> tuple[datetime, int]:
+    # короткое окно в один день: почти каждая новая запись пересекается с какой-то из прежних
+    return DAY + timedelta(minutes=15 * rnd.randrange(16)), rnd.choice((15, 30, 45, 60, 90))
+
+
+async def _appointments() -> list[tuple[int, int, int, int, AppointmentStatus]]:
+    async with get_read_db() as db:
+        result = await db.execute(
+            select(Appointment.id, Appointment.doctor_id, Appointment.start_ts, Appointment.end_ts, Appointment.status)
+        )
+        return [tuple(row) for row in result.all()]
+
+
+def _overlaps(rows) -> list[tuple[int, int]]:
+    """Пары пересекающихся неотменённых приёмов одного врача"""
+    found = []
+    active = sorted((row for row in rows if row[4] in ACTIVE), key=lambda row: (row[1], row[2]))
+    for index, (app_id, doctor_id, start_ts, end_ts, _) in enumerate(active):
+        for other_id, other_doctor, other_start, _, _ in active[index + 1:]:
+            if other_doctor != doctor_id or other_start >= end_ts:
+                break
+            found.append((app_id, other_id))
+    return found
+
+
+def _fits(model: dict[int, tuple[int, int, int, AppointmentStatus]], doctor_id: int, start_ts: int, end_ts: int) -> bool:
+    return not any(
+        doctor == doctor_id and status in ACTIVE and start < end_ts and end > start_ts
+        for doctor, start, end, status in model.values()
+    )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_operations_match_model_without_overlaps(run_db, seed):
+    async def scenario():
+        rnd = random.Random(seed)
+        doctors, patients = await _people(2, 4)
+        # id приёма -> (id врача, start_ts, end_ts, статус)
+        model: dict[int, tuple[int, int, int, AppointmentStatus]] = {}
+
+        for _ in range(150):
+            operation = rnd.random()
+            if operation < 0.5 or not model:
+                doctor = rnd.choice(doctors)
+                start, minutes = _random_booking(rnd)
+                start_ts, end_ts = to_epoch(start), to_epoch(start + timedelta(minutes=minutes))
+                expected = _fits(model, doctor.doctor_id, start_ts, end_ts)
+                try:
+                    await create_appointment(rnd.choice(patients), doctor.doctor_id, start, minutes)
+                    booked = True
+                except ServiceError:
+                    booked = False
+                assert booked == expected, f"запись {start} на {minutes} мин"
+                if booked:
+                    new_id = max(row[0] for row in await _appointments())
+                    model[new_id] = (doctor.doctor_id, start_ts, end_ts, AppointmentStatus.SCHEDULED)
+                continue
+
+            app_id = rnd.choice(list(model))
+            doctor_id, start_ts, end_ts, status = model[app_id]
+            doctor = next(session for session in doctors if session.doctor_id == doctor_id)
+            target = rnd.choice(list(AppointmentStatus))
+            others = {key: value for key, value in model.items() if key != app_id}
+            allowed = status != AppointmentStatus.CANCELLED or target == status or _fits(others, doctor_id, start_ts, end_ts)
+
+            if rnd.random() < 0.5:
+                changed = await update_appointments_status(doctor, [app_id], target)
+                assert changed == (1 if allowed and target != status else 0)
+            else:
+                try:
+                    await update_appointment_by_doctor(doctor, app_id, "", "", "", target)
+                    updated = True
+                except ServiceError:
+                    updated = False
+                assert updated == allowed
+            if allowed:
+                model[app_id] = (doctor_id, start_ts, end_ts, target)
+
+        rows = await _appointments()
+        assert _overlaps(rows) == []
+        assert {row[0]: row[4] for row in rows} == {app_id: value[3] for app_id, value in model.items()}
+
+    run_db(scenario)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_concurrent_bookings_never_overlap(run_db, seed):
+    async def scenario():
+        rnd = random.Random(seed)
+        doctors, patients = await _people(1, 8)
+        doctor_id = doctors[0].doctor_id
+
+        async def book():
+            start, minutes = _random_booking(rnd)
+            try:
+                await create_appointment(rnd.choice(patients), doctor_id, start, minutes)
+            except ServiceError:
+                pass
+
+        # записи конкурируют в очереди записи, а отмена и возврат идут между волнами
+        for _ in range(5):
+            await asyncio.gather(*(book() for _ in range(30)))
+            ids = [row[0] for row in await _appointments()]
+            await update_appointments_status(doctors[0], rnd.sample(ids, len(ids) // 3), AppointmentStatus.CANCELLED)
+            await update_appointments_status(doctors[0], rnd.sample(ids, len(ids) // 2), AppointmentStatus.SCHEDULED)
+
+        rows = await _appointments()
+        assert any(row[4] in ACTIVE for row in rows)
+        assert _overlaps(rows) == []
+
+    run_db(scenario)
@@ -0,0 +1,34 @@
+"""Движки базы привязаны к event loop: на новом цикле старые закрываются, а не брошены"""
+import asyncio
+
+from sqlalchemy import text
+
+from src.config import set_config
+from src.service.database.core import database
+from src.service.database.core.database import dispose_engines, get_handle, get_read_db
+from src.service.database.core.filling import filling_db
+from src.service.models.conf_model import Config
+
+
+def test_stale_handle_is_disposed(tmp_path):
+    async def first():
+        set_config(
+            Config(global_event_loop=asyncio.get_running_loop(), data_base_path=tmp_path / "test.sqlite3", sql_echo=False)
+        )
+        await filling_db()
+        async with get_read_db() as db:
+            await db.execute(text("SELECT 1"))
+        return get_handle()
+
+    async def second(stale):
+        pools = [stale.writer_engine.sync_engine.pool, stale.reader_engine.sync_engine.pool]
+        assert [pool.checkedin() for pool in pools] == [1, 1]
+
+        async with get_read_db():
+            pass
+        assert get_handle() is not stale
+        await dispose_engines()
+        assert [pool.checkedin() for pool in pools] == [0, 0]
+        assert not database._retiring
+
+    asyncio.run(second(asyncio.run(first())))
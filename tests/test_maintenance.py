@@ -0,0 +1,20 @@
+"""Фоновое обслуживание: сбой одной задачи не отменяет остальные задачи прохода"""
+from src.service import maintenance
+
+
+def test_failed_job_does_not_stop_the_pass(run_db, monkeypatch):
+    calls = []
+
+    async def broken() -> int:
+        calls.append("broken")
+        raise RuntimeError("сбой")
+
+    async def working() -> int:
+        calls.append("working")
+        return 3
+
+    monkeypatch.setattr(maintenance, "maintenance_jobs", lambda: {"сломанная": broken, "рабочая": working})
+
+    totals = run_db(maintenance.run_maintenance)
+    assert calls == ["broken", "working"]
+    assert totals == {"сломанная": 0, "рабочая": 3}
@@ -0,0 +1,34 @@
+"""Хэширование паролей не останавливает event loop, на котором сервер обслуживает всех клиентов"""
+import asyncio
+import time
+
+from src.service.database.actions import create_doctor, login_user
+from src.service.database.actions.actions import hash_password
+
+
+def test_login_does_not_block_event_loop(run_db):
+    async def scenario():
+        await create_doctor("doctor", "pass", "Врач", "Терапевт")
+        started = time.perf_counter()
+        hash_password("pass")
+        hash_seconds = time.perf_counter() - started
+
+        gaps = []
+
+        async def ticker(done: asyncio.Event):
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.001)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        done = asyncio.Event()
+        ticking = asyncio.create_task(ticker(done))
+        await asyncio.gather(*(login_user("doctor", "pass") for _ in range(4)))
+        done.set()
+        await ticking
+        # проверка пароля на самом цикле остановила бы его на всё время хэширования
+        assert max(gaps) < hash_seconds / 2
+
+    run_db(scenario)
@@ -0,0 +1,55 @@
+"""Закрытие прошедших приёмов: неявка остаётся неявкой для аналитики и не освобождает время"""
+from datetime import date, datetime
+
+import pytest
+
+from src.service.analytics import compute_analytics
+from src.service.database.actions import (
+    close_past_due_appointments,
+    create_appointment,
+    create_doctor,
+    get_doctor_appointments,
+    login_user,
+    register_patient,
+)
+from src.service.database.models import AppointmentStatus
+from src.service.exeptions import ServiceError
+
+PAST = datetime(2020, 3, 2, 10, 0)
+FUTURE = datetime(2030, 3, 4, 10, 0)
+
+
+async def _book_past_and_future():
+    await create_doctor("doctor", "pass", "Врач", "Терапевт")
+    doctor = await login_user("doctor", "pass")
+    patient = await register_patient("patient", "pass", "Пациент", "+79000000000")
+    await create_appointment(patient, doctor.doctor_id, PAST)
+    await create_appointment(patient, doctor.doctor_id, FUTURE)
+    return doctor, patient
+
+
+def test_past_due_become_no_show(run_db):
+    async def scenario():
+        doctor, patient = await _book_past_and_future()
+        assert await close_past_due_appointments() == 1
+        assert await close_past_due_appointments() == 0
+        statuses = {item.dt: item.status for item in await get_doctor_appointments(doctor)}
+        assert statuses == {PAST: AppointmentStatus.NO_SHOW, FUTURE: AppointmentStatus.SCHEDULED}
+
+        # время неявки остаётся занятым
+        with pytest.raises(ServiceError):
+            await create_appointment(patient, doctor.doctor_id, PAST)
+
+        report = await compute_analytics(date(2020, 3, 1), date(2020, 3, 31))
+        assert report.no_show.tolist() == [1]
+        assert report.cancelled.tolist() == [0]
+
+    run_db(scenario)
+
+
+def test_disabled_by_empty_status(run_db):
+    async def scenario():
+        await _book_past_and_future()
+        assert await close_past_due_appointments() == 0
+
+    run_db(scenario, past_due_status="")
@@ -0,0 +1,97 @@
+"""Режим remote: сессии сервера и вызовы действий через HTTP"""
+import asyncio
+import threading
+
+import pytest
+
+from src.service import backend
+from src.config import get_config
+from src.service.database.actions import create_doctor
+from src.service.exeptions import ServiceError
+from src.service.remote.codec import encode
+from src.service.remote.server import ActionDispatcher, ActionServer
+
+
+def test_idle_session_expires(run_db):
+    async def scenario():
+        await create_doctor("doctor", "pass", "Врач", "Терапевт")
+        dispatcher = ActionDispatcher(session_ttl=0.2)
+        session = await dispatcher.call("login_user", {"args": ["doctor", "pass"]}, None)
+        payload = {"args": encode([session])}
+
+        # запросы продлевают сессию
+        for _ in range(3):
+            await asyncio.sleep(0.1)
+            assert await dispatcher.call("get_doctor_appointments", payload, session.token) == []
+
+        await asyncio.sleep(0.3)
+        with pytest.raises(ServiceError):
+            await dispatcher.call("get_doctor_appointments", payload, session.token)
+        assert dispatcher.session_count == 0
+
+    run_db(scenario)
+
+
+def test_abandoned_sessions_are_pruned(run_db):
+    async def scenario():
+        await create_doctor("doctor", "pass", "Врач", "Терапевт")
+        dispatcher = ActionDispatcher(session_ttl=0.2)
+        for _ in range(3):
+            await dispatcher.call("login_user", {"args": ["doctor", "pass"]}, None)
+        assert dispatcher.session_count == 3
+
+        await asyncio.sleep(0.3)
+        await dispatcher.call("get_doctors", {}, None)
+        assert dispatcher.session_count == 0
+
+    run_db(scenario)
+
+
+@pytest.fixture
+def remote_server(monkeypatch):
+    """Сервер на свободном порту того же loop, что и клиент; backend переключается в режим remote"""
+    servers = []
+
+    async def start():
+        server = ActionServer(("127.0.0.1", 0), asyncio.get_running_loop())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        conf = get_config()
+        conf.backend_mode = "remote"
+        conf.server_url = f"http://127.0.0.1:{server.server_address[1]}"
+        monkeypatch.setattr(backend, "_client", None)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_backend_over_http(run_db, remote_server):
+    async def scenario():
+        await create_doctor("doctor", "pass", "Врач", "Терапевт")
+        server = await remote_server()
+
+        session = await backend.login_user("doctor", "pass")
+        assert session.token and session.doctor_id is not None
+        assert await backend.get_doctor_appointments(session) == []
+        assert [doctor.fio for doctor in await backend.get_doctors()] == ["Врач"]
+
+        patient = await backend.register_patient("patient", "pass", "Пациент", "+70000000000")
+        with pytest.raises(ServiceError, match="Недостаточно прав"):
+            await backend.create_doctor("doctor2", "pass", "Врач 2", "Хирург")
+        assert [doctor.fio for doctor in await backend.get_doctors()] == ["Врач"]
+
+        assert server.dispatcher.session_count == 2
+        backend.end_session(patient)
+        for _ in range(50):
+            if server.dispatcher.session_count == 1:
+                break
+            await asyncio.sleep(0.02)
+        assert server.dispatcher.session_count == 1
+        assert backend.get_client().token is None
+        with pytest.raises(ServiceError):
+            await backend.get_patient_appointments(patient)
+
+    run_db(scenario)
@@ -0,0 +1,73 @@
+"""Свободные слоты: нарезанные дни и дни без нарезки дают одно и то же расписание"""
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import select
+
+from src.service.database.actions import (
+    ScheduleView,
+    add_schedule_exception,
+    create_appointment,
+    create_doctor,
+    get_free_slots,
+    login_user,
+    materialize_slots,
+    register_patient,
+    set_weekly_schedule,
+)
+from src.service.database.core.database import get_read_db
+from src.service.database.models import Slot
+
+MONDAY = date(2030, 3, 4)
+SUNDAY = MONDAY + timedelta(days=13)
+
+
+def test_partially_materialized_range(run_db):
+    async def scenario():
+        await create_doctor("doctor", "pass", "Врач", "Терапевт")
+        doctor = await login_user("doctor", "pass")
+        patient = await register_patient("patient", "pass", "Пациент", "+79000000000")
+        doctor_id = doctor.doctor_id
+
+        # запись в каждой из двух недель и выходной во второй
+        first = datetime.combine(MONDAY, time(10, 0))
+        second = datetime.combine(MONDAY + timedelta(days=8), time(11, 30))
+        await create_appointment(patient, doctor_id, first)
+        await create_appointment(patient, doctor_id, second)
+        await add_schedule_exception(doctor_id, MONDAY + timedelta(days=9))
+        computed = await get_free_slots(doctor_id, MONDAY, SUNDAY)
+
+        assert await materialize_slots(1, MONDAY) > 0
+        assert await get_free_slots(doctor_id, MONDAY, SUNDAY) == computed
+
+        assert first not in computed and second not in computed
+        days = {slot.date() for slot in computed}
+        assert MONDAY + timedelta(days=7) in days
+        assert MONDAY + timedelta(days=9) not in days
+        assert len(days) == 9
+
+    run_db(scenario)
+
+
+def test_schedule_change_drops_stale_slots(run_db):
+    async def scenario():
+        await create_doctor("doctor", "pass", "Врач", "Терапевт")
+        doctor = await login_user("doctor", "pass")
+        patient = await register_patient("patient", "pass", "Пациент", "+79000000000")
+        doctor_id = doctor.doctor_id
+        friday = MONDAY + timedelta(days=4)
+        booked = datetime.combine(friday, time(12, 0))
+
+        assert await materialize_slots(1, MONDAY) == 90
+        await create_appointment(patient, doctor_id, booked)
+        await set_weekly_schedule(doctor_id, [ScheduleView(0, time(9, 0), time(10, 0), 30)])
+        assert await materialize_slots(1, MONDAY) == 2
+
+        expected = [datetime.combine(MONDAY, time(9, 0)), datetime.combine(MONDAY, time(9, 30))]
+        assert await get_free_slots(doctor_id, MONDAY, friday) == expected
+
+        # занятый слот пережил смену шаблона и освобождается вместе с записью
+        async with get_read_db() as db:
+            starts = (await db.execute(select(Slot.start).where(Slot.doctor_id == doctor_id))).scalars().all()
+        assert sorted(starts) == [*expected, booked]
+
+    run_db(scenario)